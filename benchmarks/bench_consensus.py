@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+Benchmarks for summarising tree posteriors with split counts.
+
+Generates a BEAST-style posterior of translated, annotated trees and times
+counting the splits in every tree (exactly, and with bounded memory) and
+building majority-rule and greedy consensus trees from the counts.
+
+Usage (with python-nexus installed, or from the repository root with
+PYTHONPATH=.):
+
+    python benchmarks/bench_consensus.py [-t ntaxa] [-n ntrees]
+"""
+import timeit
+
+from bench_detranslate import make_handler
+
+
+def bench(label, func, repeat=3):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print("%-50s %8.3fs" % (label, best))
+
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-t", "--ntaxa", dest="ntaxa", type="int", default=500)
+    parser.add_option("-n", "--ntrees", dest="ntrees", type="int", default=2000)
+    options, args = parser.parse_args()
+
+    handler = make_handler(options.ntaxa, options.ntrees)
+    label = "%d trees x %d taxa" % (options.ntrees, options.ntaxa)
+    bench("count_splits %s" % label, handler.count_splits)
+    bench("count_splits(error=0.01) %s" % label,
+          lambda: handler.count_splits(error=0.01))
+
+    counter = handler.count_splits()
+    print("%-50s %9d" % ("distinct splits", len(counter.counts)))
+    bench("majority-rule consensus", counter.consensus)
+    bench("greedy consensus", lambda: counter.consensus(greedy=True))
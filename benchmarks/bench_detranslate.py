@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Benchmarks for detranslating tree posteriors.
+
+Generates a BEAST-style posterior of translated, annotated trees and times
+how long it takes to expand the taxa ids in every tree with
+`TreeHandler.detranslate()` and read the detranslated trees.
+
+Usage (with python-nexus installed, or from the repository root with
+PYTHONPATH=.):
+
+    python benchmarks/bench_detranslate.py [-t ntaxa] [-n ntrees]
+"""
+import random
+import timeit
+
+from nexus.handlers.tree import TreeHandler
+
+
+def make_handler(ntaxa, ntrees, seed=1234):
+    """
+    Returns a `TreeHandler` holding `ntrees` translated trees of `ntaxa`
+    tips, with rate comments and branch lengths on every node.
+    """
+    rng = random.Random(seed)
+    handler = TreeHandler()
+    handler.was_translated = True
+    handler.translators = dict(
+        ("%d" % taxon, "taxon%d" % taxon) for taxon in range(1, ntaxa + 1)
+    )
+    for i in range(ntrees):
+        nodes = ["%d:[&rate=%.4f]%.4f" % (t, rng.random(), rng.random())
+                 for t in range(1, ntaxa + 1)]
+        rng.shuffle(nodes)
+        while len(nodes) > 1:
+            a, b = nodes.pop(), nodes.pop()
+            nodes.insert(0, "(%s,%s):[&rate=%.4f]%.4f" % (
+                a, b, rng.random(), rng.random()
+            ))
+        handler.trees.append(
+            "tree STATE_%d [&lnP=-%.3f] = [&R] %s;" % (i, rng.random() * 1000, nodes[0])
+        )
+    return handler
+
+
+def bench(label, handler, repeat=3):
+    def detranslate():
+        # a fresh handler each time, as detranslate() only runs once
+        fresh = TreeHandler()
+        fresh.was_translated = True
+        fresh.translators = handler.translators
+        fresh.trees = handler.trees
+        fresh.detranslate()
+        return list(fresh.trees)  # (trees are detranslated as they're read)
+
+    best = min(timeit.repeat(detranslate, number=1, repeat=repeat))
+    print("%-50s %8.3fs" % (label, best))
+
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-t", "--ntaxa", dest="ntaxa", type="int", default=1000)
+    parser.add_option("-n", "--ntrees", dest="ntrees", type="int", default=10000)
+    options, args = parser.parse_args()
+
+    bench(
+        "detranslate %d trees x %d taxa" % (options.ntrees, options.ntaxa),
+        make_handler(options.ntaxa, options.ntrees)
+    )
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Benchmarks for reading nexus files.
+
+Generates a large data matrix and a large (BEAST-style) tree posterior and
+times how long `NexusReader` takes to scan them into blocks, and to fully
+parse them.
+
+Usage (with python-nexus installed, or from the repository root with
+PYTHONPATH=.):
+
+    python benchmarks/bench_reader.py [-t ntaxa] [-c nchar] [-n ntrees]
+"""
+import random
+import timeit
+
+try:  # pragma: no cover
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from nexus import NexusReader
+
+
+def make_matrix(ntaxa, nchar, seed=1234):
+    """Returns a nexus string with a `ntaxa` x `nchar` binary data matrix"""
+    rng = random.Random(seed)
+    out = [
+        "#NEXUS",
+        "[a large matrix]",
+        "begin data;",
+        "\tdimensions ntax=%d nchar=%d;" % (ntaxa, nchar),
+        '\tformat datatype=standard symbols="01" gap=- missing=?;',
+        "matrix",
+    ]
+    row = ''.join(rng.choice('01') for _ in range(nchar))
+    for taxon in range(ntaxa):
+        out.append("taxon%-10d %s" % (taxon, row[taxon:] + row[:taxon]))
+    out.extend([";", "end;"])
+    return "\n".join(out)
+
+
+def make_trees(ntaxa, ntrees, seed=1234):
+    """Returns a nexus string with `ntrees` annotated trees of `ntaxa` tips"""
+    rng = random.Random(seed)
+    out = ["#NEXUS", "begin trees;", "\ttranslate"]
+    for taxon in range(1, ntaxa + 1):
+        out.append("\t\t%d taxon%d%s" % (taxon, taxon, ',' if taxon < ntaxa else ';'))
+    for i in range(ntrees):
+        nodes = ["%d[&rate=%.4f]:%.4f" % (t, rng.random(), rng.random())
+                 for t in range(1, ntaxa + 1)]
+        while len(nodes) > 1:
+            a, b = nodes.pop(), nodes.pop()
+            nodes.insert(0, "(%s,%s)[&rate=%.4f]:%.4f" % (a, b, rng.random(), rng.random()))
+        out.append("tree STATE_%d [&lnP=-%.3f] = [&R] %s;" % (i, rng.random() * 1000, nodes[0]))
+    out.append("end;")
+    return "\n".join(out)
+
+
+def bench(label, contents, repeat=3):
+    def scan():
+        for block, line in NexusReader()._scan(StringIO(contents)):
+            pass
+
+    def parse():
+        NexusReader().read_string(contents)
+
+    for name, func in [('scan', scan), ('parse', parse)]:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        print("%-40s %-6s %8.3fs" % (label, name, best))
+
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-t", "--ntaxa", dest="ntaxa", type="int", default=20000)
+    parser.add_option("-c", "--nchar", dest="nchar", type="int", default=100)
+    parser.add_option("-n", "--ntrees", dest="ntrees", type="int", default=5000)
+    options, args = parser.parse_args()
+
+    bench(
+        "matrix: %d taxa x %d chars" % (options.ntaxa, options.nchar),
+        make_matrix(options.ntaxa, options.nchar)
+    )
+    bench(
+        "trees: %d trees x 50 taxa" % options.ntrees,
+        make_trees(50, options.ntrees)
+    )
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Benchmarks for Robinson-Foulds distance matrices.
+
+Generates posterior-like tree sets (a random tree with a few tips swapped in
+each sample, so the trees share most of their splits) and times
+`TreeHandler.rf_matrix()` on one run, and against a second run streamed from
+an iterator.
+
+Usage (with python-nexus installed, or from the repository root with
+PYTHONPATH=.):
+
+    python benchmarks/bench_rf.py [-t ntaxa] [-n ntrees] [-p processes]
+"""
+import random
+import timeit
+
+from nexus.handlers.tree import TreeHandler
+
+
+def make_handler(ntaxa, ntrees, swaps=3, seed=1234):
+    """
+    Returns a `TreeHandler` holding `ntrees` translated trees of `ntaxa`
+    tips, each a copy of one random tree with `swaps` pairs of tips
+    swapped.
+    """
+    rng = random.Random(seed)
+    handler = TreeHandler()
+    handler.was_translated = True
+    handler.translators = dict(
+        ("%d" % taxon, "taxon%d" % taxon) for taxon in range(1, ntaxa + 1)
+    )
+    nodes = ["{%d}:%.4f" % (t, rng.random()) for t in range(ntaxa)]
+    rng.shuffle(nodes)
+    while len(nodes) > 1:
+        a, b = nodes.pop(), nodes.pop()
+        nodes.insert(0, "(%s,%s):%.4f" % (a, b, rng.random()))
+    template = nodes[0]
+    for i in range(ntrees):
+        tips = list(range(1, ntaxa + 1))
+        for _ in range(swaps):
+            a, b = rng.randrange(ntaxa), rng.randrange(ntaxa)
+            tips[a], tips[b] = tips[b], tips[a]
+        handler.trees.append(
+            "tree STATE_%d = [&R] %s;" % (i, template.format(*tips))
+        )
+    return handler
+
+
+def bench(label, func, repeat=3):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print("%-50s %8.3fs" % (label, best))
+
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-t", "--ntaxa", dest="ntaxa", type="int", default=200)
+    parser.add_option("-n", "--ntrees", dest="ntrees", type="int", default=2000)
+    parser.add_option("-p", "--processes", dest="processes", type="int",
+                      default=None)
+    options, args = parser.parse_args()
+
+    run1 = make_handler(options.ntaxa, options.ntrees, seed=1)
+    run2 = make_handler(options.ntaxa, options.ntrees, seed=2)
+    label = "%d trees x %d taxa" % (options.ntrees, options.ntaxa)
+    bench("rf_matrix %s (1 process)" % label,
+          lambda: run1.rf_matrix(processes=1))
+    bench("rf_matrix %s (%s processes)" % (label, options.processes or "all"),
+          lambda: run1.rf_matrix(processes=options.processes))
+    bench("rf_matrix %s, streamed other run" % label,
+          lambda: run1.rf_matrix(
+              processes=options.processes, other=iter(run2.trees)
+          ))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Benchmarks for parsing the sites of data matrix rows.
+
+Times `DataHandler._parse_sites` on long rows where a given fraction of
+the sites are polymorphic or multistate (e.g. `(12)`, `(1,2)` or `{12}`).
+Every row is different, so the site cache never helps.
+
+Usage (with python-nexus installed, or from the repository root with
+PYTHONPATH=.):
+
+    python benchmarks/bench_sites.py [-r nrows] [-c nchar]
+"""
+import random
+import timeit
+
+from nexus.handlers.data import DataHandler
+
+
+def make_rows(nrows, nchar, polymorphic, seed=1234):
+    """
+    Returns `nrows` rows of `nchar` sites where a fraction `polymorphic` of
+    the sites are bracketed groups.
+    """
+    rng = random.Random(seed)
+    groups = ['(12)', '(0,1)', '(0 2)', '{01}', '{012}']
+    rows = []
+    for _ in range(nrows):
+        rows.append(''.join(
+            rng.choice(groups) if rng.random() < polymorphic else rng.choice('012?')
+            for _ in range(nchar)
+        ))
+    return rows
+
+
+def bench(label, rows, repeat=3):
+    def parse():
+        handler = DataHandler()
+        for row in rows:
+            handler._parse_sites(row)
+
+    best = min(timeit.repeat(parse, number=1, repeat=repeat))
+    print("%-50s %8.3fs" % (label, best))
+
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-r", "--nrows", dest="nrows", type="int", default=100)
+    parser.add_option("-c", "--nchar", dest="nchar", type="int", default=20000)
+    options, args = parser.parse_args()
+
+    for polymorphic in (0.0, 0.01, 0.1, 0.5):
+        bench(
+            "%d rows x %d sites, %d%% polymorphic" % (
+                options.nrows, options.nchar, polymorphic * 100
+            ),
+            make_rows(options.nrows, options.nchar, polymorphic)
+        )
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""
+Benchmarks for grouping posterior trees by topology.
+
+Times `TreeHandler.unique_topologies()` on a posterior-like tree set (see
+`bench_rf.make_handler`), the first time (when every tree is hashed) and
+again (when the cached hashes are used).
+
+Usage (with python-nexus installed, or from the repository root with
+PYTHONPATH=.):
+
+    python benchmarks/bench_topologies.py [-t ntaxa] [-n ntrees] [-p processes]
+"""
+import timeit
+
+from bench_rf import make_handler
+
+
+def bench(label, func, repeat=1):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print("%-50s %8.3fs" % (label, best))
+
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("-t", "--ntaxa", dest="ntaxa", type="int", default=50)
+    parser.add_option("-n", "--ntrees", dest="ntrees", type="int", default=100000)
+    parser.add_option("-p", "--processes", dest="processes", type="int",
+                      default=None)
+    options, args = parser.parse_args()
+
+    handler = make_handler(options.ntaxa, options.ntrees, swaps=1)
+    label = "%d trees x %d taxa" % (options.ntrees, options.ntaxa)
+    bench("unique_topologies %s" % label,
+          lambda: handler.unique_topologies(processes=options.processes))
+    bench("unique_topologies %s (cached)" % label,
+          lambda: handler.unique_topologies(processes=options.processes),
+          repeat=3)
+    topologies = handler.unique_topologies(0.95)
+    print("%-50s %9d" % ("topologies", len(topologies)))
+    print("%-50s %9d" % (
+        "in the 95% credible set", sum(t.credible for t in topologies)
+    ))
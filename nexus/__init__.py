@@ -130,9 +130,15 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from nexus.reader import NexusReader
 from nexus.writer import NexusWriter
+from nexus.follower import TreeFollower
+from nexus.batch import read_many
 from nexus import handlers
 from nexus.exceptions import NexusFormatException
 from nexus import bin
 from nexus import tools
 
-__all__ = ["NexusReader", "NexusWriter", "NexusFormatException", "handlers", "tools", "bin"]
+__all__ = [
+    "NexusReader", "NexusWriter", "TreeFollower", "read_many",
+    "NexusFormatException",
+    "handlers", "tools", "bin"
+]
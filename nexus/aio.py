@@ -0,0 +1,85 @@
+"""
+Tools for reading nexus files from asyncio code.
+
+This module needs Python 3.5 or later (for `async def`), and can't be
+imported on older versions.
+
+>>> from nexus import aio
+>>> nex = await aio.read_file('example.nex')  # doctest: +SKIP
+>>> nexuslist = await aio.read_many(['a.nex', 'b.nex'])  # doctest: +SKIP
+"""
+import functools
+import asyncio
+
+from nexus.reader import NexusReader
+
+
+async def read_file(filename, executor=None, **kwargs):
+    """
+    Reads and parses a nexus file without blocking the event loop.
+
+    The file is read and parsed in `executor` by a `NexusReader`, which
+    streams it (decompressing it if needed) a line at a time rather than
+    loading it all into memory first. Parsing is CPU-bound, so pass a
+    `concurrent.futures.ProcessPoolExecutor` to parse big files in
+    parallel with other requests. If the coroutine is cancelled before
+    the file is read, reading it is cancelled too.
+
+    :param filename: filename of a nexus file
+    :type filename: string
+
+    :param executor: the executor to read in (default: the loop's default
+        executor)
+    :type executor: concurrent.futures.Executor
+
+    :param kwargs: any other arguments are passed on to `NexusReader`
+
+    :return: A NexusReader
+    :raises IOError: If file reading fails.
+    :raises NexusFormatException: If the file is not a valid nexus.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(NexusReader, filename, **kwargs)
+    )
+
+
+async def read_many(filenames, executor=None, limit=None,
+                    capture_errors=False, **kwargs):
+    """
+    Reads and parses many nexus files concurrently.
+
+    :param filenames: A list of nexus filenames
+    :type filenames: List
+
+    :param executor: the executor to read in (default: the loop's default
+        executor)
+    :type executor: concurrent.futures.Executor
+
+    :param limit: the maximum number of files to read at the same time
+        (default: no limit)
+    :type limit: int
+
+    :param capture_errors: if True, return the error raised while reading
+        a file in its place instead of raising it.
+    :type capture_errors: Boolean
+
+    :param kwargs: any other arguments are passed on to `read_file`
+
+    :return: A list of NexusReader instances (or errors, if
+        `capture_errors` is set) in the same order as `filenames`
+    :raises IOError: If file reading fails.
+    :raises NexusFormatException: If a file is not a valid nexus.
+    """
+    semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def _read_one(filename):
+        if semaphore is None:
+            return await read_file(filename, executor, **kwargs)
+        async with semaphore:
+            return await read_file(filename, executor, **kwargs)
+
+    return await asyncio.gather(
+        *[_read_one(filename) for filename in filenames],
+        return_exceptions=capture_errors
+    )
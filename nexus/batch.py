@@ -0,0 +1,65 @@
+"""
+Tools for reading many nexus files at once
+"""
+import multiprocessing
+
+from nexus.reader import NexusReader
+
+
+def _read_one(args):
+    """Reads one nexus file, returning any error instead of raising it"""
+    filename, kwargs = args
+    try:
+        return NexusReader(filename, **kwargs)
+    except Exception as error:
+        return error
+
+
+def read_many(filenames, processes=None, capture_errors=False, **kwargs):
+    """
+    Reads a list of nexus files in parallel using a pool of processes.
+
+    >>> read_many(['a.nex', 'b.nex'], processes=4)  # doctest: +SKIP
+    [<nexus.reader.NexusReader object ...>, <nexus.reader.NexusReader ...>]
+
+    :param filenames: A list of nexus filenames
+    :type filenames: List
+
+    :param processes: number of processes to use (default: the number of
+        CPUs). If 1, the files are read one after another in this process.
+    :type processes: int
+
+    :param capture_errors: if True, return the error raised while reading
+        a file in its place instead of raising it.
+    :type capture_errors: Boolean
+
+    :param kwargs: any other arguments are passed on to `NexusReader`
+
+    :return: A list of NexusReader instances (or errors, if
+        `capture_errors` is set) in the same order as `filenames`
+    :raises IOError: If file reading fails.
+    :raises NexusFormatException: If a file is not a valid nexus.
+    :raises ValueError: If `mmap` is requested, as memory-maps can't be
+        shared between processes.
+    """
+    if kwargs.get('mmap'):
+        raise ValueError("Unable to read memory-mapped files in parallel")
+
+    jobs = [(filename, kwargs) for filename in filenames]
+    if processes == 1 or len(jobs) <= 1:
+        results = [_read_one(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_read_one, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    if not capture_errors:
+        for filename, result in zip(filenames, results):
+            if isinstance(result, Exception):
+                if not getattr(result, 'filename', None):
+                    result.filename = filename
+                raise result
+    return results
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 import sys
-from nexus import NexusReader, VERSION
+from nexus import read_many, VERSION
 from nexus.tools import multistatise, combine_nexuses
 
 __author__ = 'Simon Greenhill <simon@simon.net.nz>'
@@ -30,8 +30,7 @@ if __name__ == '__main__':
         outfile = 'multistate.nex'
 
     nexuslist2 = []
-    for nfile in nexuslist:
-        n = NexusReader(nfile)
+    for n in read_many(nexuslist):
         n = multistatise.multistatise(n)
         nexuslist2.append(n)
 
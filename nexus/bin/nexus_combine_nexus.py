@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 import sys
-from nexus import NexusReader, VERSION
+from nexus import read_many, VERSION
 from nexus.tools import combine_nexuses
 
 __author__ = 'Simon Greenhill <simon@simon.net.nz>'
@@ -19,7 +19,7 @@ if __name__ == '__main__':  # pragma: no cover
         parser.print_help()
         sys.exit()
         
-    nexuslist = [NexusReader(n) for n in nexuslist]
+    nexuslist = read_many(nexuslist)
     out = combine_nexuses(nexuslist)
     out.write_to_file('combined.nex', charblock=False, interleave=False)
     print("Written to combined.nex")
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 import sys
 from random import sample
+from multiprocessing import cpu_count
 
 from nexus import NexusReader, VERSION
+from nexus.handlers.tree import remove_comments
 from nexus.tools import check_for_valid_NexusReader
 
 
@@ -26,6 +28,12 @@ Remove translate block:
 
 Remove comments:
     nexus_treemanip.py -c old.trees new.trees
+
+Keep one tree per topology (in the 95% credible set, using 4 processes):
+    nexus_treemanip.py -u --credible 0.95 -p 4 old.trees new.trees
+
+For -c, -t and -u, `-p 1` (the default) works in this process without a
+process pool, and `-p 0` uses one process per CPU.
 """
 
 def parse_deltree(dstring):
@@ -75,19 +83,20 @@ def run_deltree(deltree, nexus_obj, do_print=False):
     """
     check_for_valid_NexusReader(nexus_obj, required_blocks=['trees'])
 
-    new = []
-    delitems = parse_deltree(deltree)
+    keep = []
+    delitems = set(parse_deltree(deltree))
 
     if do_print:  # pragma: no cover
         print('Deleting: %d trees' % len(delitems))
 
-    for index, tree in enumerate(nexus_obj.trees, 1):
+    # select the trees by index, so they're not detranslated or copied
+    for index in range(1, nexus_obj.trees.ntrees + 1):
         if index in delitems:
             if do_print:  # pragma: no cover
                 print('Deleting tree %d' % index)
         else:
-            new.append(tree)
-    nexus_obj.trees.trees = new
+            keep.append(index - 1)
+    nexus_obj.trees.select(keep)
     return nexus_obj
 
 
@@ -111,7 +120,7 @@ def run_resample(resample, nexus_obj, do_print=False):
     """
     check_for_valid_NexusReader(nexus_obj, required_blocks=['trees'])
 
-    new = []
+    keep = []
     try:
         every = int(resample)
     except TypeError:
@@ -123,19 +132,19 @@ def run_resample(resample, nexus_obj, do_print=False):
         print('Resampling ever %d trees' % every)
 
     ignore_count = 0
-    for index, tree in enumerate(nexus_obj.trees, 1):
+    for index in range(1, nexus_obj.trees.ntrees + 1):
         if index % every == 0:
-            new.append(tree)
+            keep.append(index - 1)
         else:
             ignore_count += 1
 
     if do_print:  # pragma: no cover
         print("Ignored %d trees" % ignore_count)
 
-    nexus_obj.trees.trees = new
+    nexus_obj.trees.select(keep)
     return nexus_obj
 
-def run_removecomments(nexus_obj, do_print=False):
+def run_removecomments(nexus_obj, do_print=False, processes=1):
     """
     Removes comments from the trees in a nexus
 
@@ -145,6 +154,9 @@ def run_removecomments(nexus_obj, do_print=False):
     :param do_print: flag to print() logging information or not
     :type do_print: Boolean
 
+    :param processes: number of processes to use (None for one per CPU)
+    :type processes: int
+
     :return: A NexusReader instance with the comments removed.
 
     :raises AssertionError: if nexus_obj is not a nexus
@@ -152,9 +164,7 @@ def run_removecomments(nexus_obj, do_print=False):
     """
     check_for_valid_NexusReader(nexus_obj, required_blocks=['trees'])
 
-    new = []
-    for tree in nexus_obj.trees:
-        new.append(nexus_obj.trees.remove_comments(tree))
+    new = nexus_obj.trees.map(remove_comments, processes)
 
     if do_print:  # pragma: no cover
         print("Removed comments")
@@ -162,20 +172,61 @@ def run_removecomments(nexus_obj, do_print=False):
     nexus_obj.trees.trees = new
     return nexus_obj
 
-def run_detranslate(nexus_obj):
+def run_detranslate(nexus_obj, processes=1):
     """
-    Removes comments from the trees in a nexus
+    Detranslates the trees in a nexus. With one process, each tree is
+    detranslated when it is next used (e.g. when the nexus is written),
+    and with more they are all detranslated at once in a process pool.
 
     :param nexus_obj: A `NexusReader` instance
     :type nexus_obj: NexusReader
 
+    :param processes: number of processes to use (None for one per CPU)
+    :type processes: int
+
     :return: A NexusReader instance with the comments removed.
 
     :raises AssertionError: if nexus_obj is not a nexus
     :raises NexusFormatException: if nexus_obj does not have a `trees` block
     """
     check_for_valid_NexusReader(nexus_obj, required_blocks=['trees'])
-    nexus_obj.trees.detranslate()
+    if processes == 1:
+        nexus_obj.trees.detranslate()
+    else:
+        # (`TreeHandler.detranslate` takes None to mean "lazily")
+        nexus_obj.trees.detranslate(processes=processes or cpu_count())
+    return nexus_obj
+
+def run_unique(nexus_obj, credible=None, do_print=False, processes=1):
+    """
+    Keeps one tree of each topology in a nexus, from the most to the least
+    common topology.
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :param credible: if given, only keep the topologies in this credible set
+        (e.g. 0.95)
+    :type credible: float
+
+    :param do_print: flag to print() logging information or not
+    :type do_print: Boolean
+
+    :param processes: number of processes to use (None for one per CPU)
+    :type processes: int
+
+    :return: A NexusReader instance with one tree per topology.
+
+    :raises AssertionError: if nexus_obj is not a nexus
+    :raises NexusFormatException: if nexus_obj does not have a `trees` block
+    """
+    check_for_valid_NexusReader(nexus_obj, required_blocks=['trees'])
+    ntrees = nexus_obj.trees.ntrees
+    topologies = nexus_obj.trees.select_unique(credible, processes=processes)
+    if do_print:  # pragma: no cover
+        print("%d unique topologies kept from %d trees" % (
+            len(topologies), ntrees
+        ))
     return nexus_obj
 
 def run_random(num_trees, nexus_obj, do_print=False):
@@ -214,7 +265,7 @@ def run_random(num_trees, nexus_obj, do_print=False):
                 "%d trees read. Sampling %d" %
                 (nexus_obj.trees.ntrees, num_trees)
             )
-        nexus_obj.trees.trees = sample(nexus_obj.trees.trees, num_trees)
+        nexus_obj.trees.select(sample(range(nexus_obj.trees.ntrees), num_trees))
     return nexus_obj
 
 
@@ -237,10 +288,21 @@ if __name__ == '__main__':  # pragma: no cover
     parser.add_option("-t", "--detranslate", dest="detranslate",
             action="store_true", default=False,
             help="Remove taxa translation block from the trees")
+    parser.add_option("-u", "--unique", dest="unique",
+            action="store_true", default=False,
+            help="Keep one tree of each topology")
+    parser.add_option("--credible", dest="credible",
+            action="store", type="float", default=None,
+            help="With -u, only keep the topologies in this credible set")
+    parser.add_option("-p", "--processes", dest="processes",
+            action="store", type="int", default=1,
+            help="Number of processes to use for -c, -t and -u "
+                 "(default 1, i.e. no process pool; 0 for one per CPU)")
     parser.add_option("-q", "--quiet", dest="quiet",
             action="store_true", default=False,
             help="Be quiet (no logging information displayed)")
     options, args = parser.parse_args()
+    processes = options.processes or None  # (None is one per CPU)
 
     try:
         nexusname = args[0]
@@ -278,13 +340,19 @@ if __name__ == '__main__':  # pragma: no cover
     if options.random:
         nexus = run_random(options.random, nexus, options.quiet)
 
+    # keep unique topologies
+    if options.unique:
+        nexus = run_unique(
+            nexus, options.credible, not options.quiet, processes
+        )
+
     # remove comments
     if options.removecomments:
-        nexus = run_removecomments(nexus, options.quiet)
+        nexus = run_removecomments(nexus, options.quiet, processes)
 
     # detranslate
     if options.detranslate:
-        nexus = run_detranslate(nexus)
+        nexus = run_detranslate(nexus, processes)
 
     if newnexus is not None:
         nexus.write_to_file(newnexus)
@@ -0,0 +1,221 @@
+"""
+Tools for caching parsed nexus files
+"""
+import os
+import zlib
+import hashlib
+
+try:  # pragma: no cover
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from nexus.handlers import GenericHandler
+
+ENTRY_SUFFIX = '.nxc'
+POINTER_SUFFIX = '.path'
+CACHE_VERSION = 3
+
+
+def _digest_file(filename, blocksize=1024 * 1024):
+    """Returns the sha1 hexdigest of the contents of `filename`"""
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(blocksize), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(filename, content):
+    """Writes `content` to `filename` so that no-one sees a partial file"""
+    tmpname = "%s.%d.tmp" % (filename, os.getpid())
+    with open(tmpname, 'wb') as handle:
+        handle.write(content)
+    getattr(os, 'replace', os.rename)(tmpname, filename)
+
+
+class NexusCache(object):
+    """
+    A persistent on-disk cache of parsed nexus files.
+
+    Entries are keyed by the sha1 of the file contents, so copies of a file
+    share an entry and edited files are never served stale. To avoid
+    hashing a file every time it is opened, the digest is remembered
+    alongside the file's size and mtime, and only recomputed if either
+    changes.
+
+    Each entry is a zlib compressed pickle of the state of each parsed
+    block (e.g. `DataHandler.matrix` and `charlabels`, `TaxaHandler.taxa`,
+    `TreeHandler.trees` and `translators`). The raw lines of known blocks
+    are not stored, so `raw_blocks` and `.block` are empty for files loaded
+    from the cache.
+
+    When the entries take up more than `max_size` bytes, the least recently
+    used entries are removed.
+
+    :param directory: directory to store the cache in
+    :type directory: string
+
+    :param max_size: maximum size of the cache in bytes
+    :type max_size: int
+    """
+    def __init__(self, directory, max_size=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _pointer(self, filename):
+        """Returns the filename of the digest pointer for `filename`"""
+        path = os.path.abspath(filename).encode('utf-8')
+        return os.path.join(
+            self.directory, hashlib.sha1(path).hexdigest() + POINTER_SUFFIX
+        )
+
+    def _entry(self, digest):
+        """Returns the filename of the cache entry for `digest`"""
+        return os.path.join(self.directory, digest + ENTRY_SUFFIX)
+
+    def digest(self, filename):
+        """
+        Returns the content digest of `filename`, rehashing the file only
+        if its size or mtime have changed since it was last seen.
+        """
+        stat = os.stat(filename)
+        key = "%d %r" % (stat.st_size, stat.st_mtime)
+        pointer = self._pointer(filename)
+        try:
+            with open(pointer, 'r') as handle:
+                seen, digest = handle.read().rsplit(' ', 1)
+            if seen == key:
+                return digest
+        except (IOError, OSError, ValueError):
+            pass
+        digest = _digest_file(filename)
+        digest = hashlib.sha1(
+            ("%s %d" % (digest, CACHE_VERSION)).encode('utf-8')
+        ).hexdigest()
+        _atomic_write(pointer, ("%s %s" % (key, digest)).encode('utf-8'))
+        return digest
+
+    def get(self, filename):
+        """
+        Returns the cached block states for `filename`, or None.
+
+        :param filename: filename of a nexus file
+        :type filename: string
+
+        :return: A dictionary of block name -> (handler state dictionary)
+        """
+        entry = self._entry(self.digest(filename))
+        try:
+            with open(entry, 'rb') as handle:
+                blocks = pickle.loads(zlib.decompress(handle.read()))
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+        except Exception:  # corrupt or incompatible entry, so replace it.
+            self.misses += 1
+            return None
+        try:
+            os.utime(entry, None)  # mark as recently used.
+        except OSError:  # pragma: no cover
+            pass
+        self.hits += 1
+        return blocks
+
+    def put(self, filename, blocks):
+        """
+        Stores the block states for `filename` in the cache.
+
+        :param filename: filename of a nexus file
+        :type filename: string
+
+        :param blocks: A dictionary of block name -> (handler state dictionary)
+        :type blocks: dict
+
+        :return: None
+        """
+        content = zlib.compress(pickle.dumps(blocks, pickle.HIGHEST_PROTOCOL))
+        entry = self._entry(self.digest(filename))
+        _atomic_write(entry, content)
+        self.evict(keep=os.path.basename(entry))
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the cache fits.
+
+        :param keep: name of an entry that should never be removed
+        :type keep: string
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX) and name != keep:
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(e[1] for e in entries)
+        if keep is not None:
+            total += os.path.getsize(os.path.join(self.directory, keep))
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:  # pragma: no cover
+                continue  # removed by someone else.
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Removes all entries from the cache"""
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX) or name.endswith(POINTER_SUFFIX):
+                os.unlink(os.path.join(self.directory, name))
+
+    @property
+    def size(self):
+        """Total size of the cache entries in bytes"""
+        return sum(
+            os.path.getsize(os.path.join(self.directory, name))
+            for name in os.listdir(self.directory)
+            if name.endswith(ENTRY_SUFFIX)
+        )
+
+    @staticmethod
+    def dump_blocks(blocks):
+        """
+        Returns a dictionary of the state of each parsed handler in `blocks`
+        """
+        out = {}
+        for name, handler in blocks.items():
+            if name == 'data' and handler is blocks.get('characters'):
+                continue  # restored as an alias.
+            state = dict(handler.__getstate__()) \
+                if hasattr(handler, '__getstate__') else dict(handler.__dict__)
+            if type(handler) is not GenericHandler:
+                state['block'] = []
+            out[name] = state
+        return out
+
+    @staticmethod
+    def load_blocks(states, handlers):
+        """
+        Returns a dictionary of handlers restored from `states`, using the
+        block name -> handler class mapping `handlers`.
+        """
+        blocks = {}
+        for name, state in states.items():
+            handler = handlers.get(name, GenericHandler)()
+            handler.__dict__.update(state)
+            blocks[name] = handler
+        if 'characters' in blocks and 'data' not in blocks:
+            blocks['data'] = blocks['characters']
+        return blocks
+
+    def __repr__(self):
+        return "<NexusCache: %s, %d hits, %d misses, %d evictions>" % (
+            self.directory, self.hits, self.misses, self.evictions
+        )
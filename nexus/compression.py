@@ -0,0 +1,189 @@
+"""
+Tools for reading and writing compressed nexus files
+"""
+import io
+import os
+import bz2
+import gzip
+
+try:  # pragma: no cover
+    import lzma
+except ImportError:  # pragma: no cover
+    lzma = None
+
+try:  # pragma: no cover
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+GZIP = 'gzip'
+BZ2 = 'bz2'
+XZ = 'xz'
+ZSTD = 'zstd'
+
+# the magic bytes each compressed format starts with
+MAGIC = (
+    (b'\x1f\x8b', GZIP),
+    (b'BZh', BZ2),
+    (b'\xfd7zXZ\x00', XZ),
+    (b'\x28\xb5\x2f\xfd', ZSTD),
+)
+MAGIC_SIZE = max(len(magic) for magic, codec in MAGIC)
+
+EXTENSIONS = {
+    '.gz': GZIP,
+    '.bz2': BZ2,
+    '.xz': XZ,
+    '.zst': ZSTD,
+}
+
+
+def sniff(data):
+    """
+    Returns the compression format of the bytes `data` (the start of a
+    file), or None if it isn't compressed.
+    """
+    data = bytes(data[:MAGIC_SIZE])
+    for magic, codec in MAGIC:
+        if data.startswith(magic):
+            return codec
+    return None
+
+
+def detect_codec(filename):
+    """
+    Returns the compression format of `filename` from its magic bytes, or
+    None if it isn't compressed.
+
+    :raises IOError: If file reading fails.
+    """
+    with open(filename, 'rb') as handle:
+        return sniff(handle.read(MAGIC_SIZE))
+
+
+def codec_for_filename(filename):
+    """
+    Returns the compression format implied by the extension of `filename`
+    (e.g. `gzip` for `.gz`), or None.
+    """
+    return EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def _check_codec(codec):
+    if codec not in EXTENSIONS.values():
+        raise ValueError("Unknown compression format %r" % codec)
+    if codec == XZ and lzma is None:  # pragma: no cover
+        raise ValueError("xz compression needs the `lzma` module")
+    if codec == ZSTD and zstandard is None:
+        raise ValueError("zstd compression needs the `zstandard` module")
+
+
+def _open_binary(filename, mode, codec):
+    """Opens a binary stream that (de)compresses as it reads or writes"""
+    _check_codec(codec)
+    if codec == GZIP:
+        return gzip.GzipFile(filename, mode)
+    elif codec == BZ2:
+        return bz2.BZ2File(filename, mode)
+    elif codec == XZ:
+        return lzma.LZMAFile(filename, mode)
+    elif mode == 'rb':  # zstd
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(
+                open(filename, 'rb'), closefd=True
+            )
+        )
+    return zstandard.ZstdCompressor().stream_writer(
+        open(filename, 'wb'), closefd=True
+    )
+
+
+class _TextWriter(object):
+    """
+    Wraps a binary stream so that strings written to it are utf-8 encoded.
+
+    (`io.TextIOWrapper` would do, but on python 2 it only takes unicode
+    and can't wrap a `bz2.BZ2File`)
+    """
+    def __init__(self, handle):
+        self.handle = handle
+
+    def write(self, text):
+        if not isinstance(text, bytes):
+            text = text.encode('utf-8')
+        self.handle.write(text)
+
+    def close(self):
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_file(filename, mode='r', compression=None):
+    """
+    Opens a (possibly compressed) nexus file for reading or writing.
+
+    When reading, the compression format is detected from the file's magic
+    bytes, whatever its name, and the contents are decompressed a chunk at
+    a time as they are read. Compressed files are opened in binary mode,
+    so iterating over them gives utf-8 encoded lines.
+
+    When writing, the compression format is `compression` if given, or
+    else taken from the extension of `filename` (`.gz`, `.bz2`, `.xz` or
+    `.zst`). The returned handle accepts strings and compresses them as
+    they are written.
+
+    :param filename: filename of a nexus file
+    :type filename: string
+
+    :param mode: 'r' to read or 'w' to write
+    :type mode: string
+
+    :param compression: the compression format to write (`gzip`, `bz2`,
+        `xz` or `zstd`), or False to never compress
+    :type compression: string
+
+    :return: A file handle
+    :raises IOError: If file reading fails.
+    :raises ValueError: If the compression format is unknown or needs a
+        module that isn't installed.
+    """
+    if mode == 'r':
+        if not os.path.isfile(filename):
+            raise IOError("Unable To Read File %s" % filename)
+        codec = detect_codec(filename)
+        if codec is None:
+            return open(filename, 'r')
+        return _open_binary(filename, 'rb', codec)
+    elif mode == 'w':
+        if compression is None:
+            codec = codec_for_filename(filename)
+        else:
+            codec = compression or None
+        if codec is None:
+            return open(filename, 'w')
+        return _TextWriter(_open_binary(filename, 'wb', codec))
+    raise ValueError("Unknown mode %r" % mode)
+
+
+def decompress(data):
+    """
+    Decompresses the bytes `data` if they are compressed.
+
+    :return: bytes
+    """
+    codec = sniff(data)
+    if codec is None:
+        return data
+    _check_codec(codec)
+    if codec == GZIP:
+        return gzip.GzipFile(fileobj=io.BytesIO(data)).read()
+    elif codec == BZ2:
+        return bz2.decompress(data)
+    elif codec == XZ:
+        return lzma.decompress(data)
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
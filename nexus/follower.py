@@ -0,0 +1,106 @@
+"""
+Tools for following a growing nexus tree file
+"""
+import os
+
+from nexus.handlers.tree import TreeHandler
+from nexus.tokenizer import NexusTokenizer
+
+
+class TreeFollower(object):
+    """
+    Follows a tree file that is still being written to (e.g. the `.trees`
+    log of a running BEAST or MrBayes analysis).
+
+    The follower remembers the byte offset it has read up to, and the
+    translate table, so each call to `poll` only reads and parses the trees
+    appended since the last call. Incomplete lines at the end of the file
+    are left for the next poll. If the file shrinks (e.g. the analysis was
+    restarted) the follower starts again from the beginning.
+
+    >>> follower = TreeFollower('run1.trees')  # doctest: +SKIP
+    >>> new_trees = follower.poll()  # doctest: +SKIP
+
+    :param filename: filename of the tree file to follow
+    :type filename: string
+
+    :param detranslate: expand translated taxa labels in each tree
+    :type detranslate: Boolean
+
+    :param store: keep all trees read so far in `self.trees.trees`
+    :type store: Boolean
+
+    :param chunksize: number of bytes to read at a time
+    :type chunksize: int
+    """
+    def __init__(self, filename, detranslate=False, store=False,
+                 chunksize=1024 * 1024):
+        self.filename = filename
+        self.detranslate = detranslate
+        self.store = store
+        self.chunksize = chunksize
+        self.reset()
+
+    def reset(self):
+        """Forgets everything read so far"""
+        self.offset = 0
+        self.ntrees = 0
+        self.trees = TreeHandler()
+        self._tokenizer = NexusTokenizer(blocks=set(['trees']))
+
+    def _iter_lines(self, handle):
+        """
+        Yields complete lines from `handle`, moving `self.offset` past each
+        line before it is yielded, so that stopping early doesn't re-read
+        lines that have already been parsed.
+        """
+        pending = b''
+        while True:
+            chunk = handle.read(self.chunksize)
+            if not chunk:
+                return
+            chunk = pending + chunk
+            end = chunk.rfind(b'\n') + 1
+            pending = chunk[end:]
+            for line in chunk[:end].splitlines(True):
+                self.offset += len(line)
+                yield line
+
+    def iter_new(self):
+        """
+        Iterates over the trees appended to the file since the last poll.
+
+        :return: A generator of tree strings
+        """
+        try:
+            size = os.path.getsize(self.filename)
+        except OSError:
+            return  # not created yet, or moved away.
+        if size < self.offset:
+            self.reset()
+        if size == self.offset:
+            return
+
+        with open(self.filename, 'rb') as handle:
+            handle.seek(self.offset)
+            lines = (
+                line for event, block, line in
+                self._tokenizer.tokenize(self._iter_lines(handle))
+                if line is not None
+            )
+            for tree in self.trees.iterparse(lines, self.detranslate):
+                self.ntrees += 1
+                if self.store:
+                    self.trees.trees.append(tree)
+                yield tree
+
+    def poll(self):
+        """
+        Reads the trees appended to the file since the last poll.
+
+        :return: A list of tree strings
+        """
+        return list(self.iter_new())
+
+    def __repr__(self):
+        return "<TreeFollower: %s, %d trees>" % (self.filename, self.ntrees)
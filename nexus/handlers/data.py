@@ -1,16 +1,142 @@
 import re
 import warnings
-from collections import defaultdict
+from array import array
+from collections import namedtuple
 from nexus.handlers import GenericHandler
 from nexus.handlers import QUOTED_PATTERN, WHITESPACE_PATTERN, BEGIN_PATTERN, END_PATTERN
+from nexus.handlers.matrix import CompactMatrix, ListMatrix, MatrixView
+from nexus.lrucache import LRUCache
 from nexus.exceptions import NexusFormatException
 
+try:  # pragma: no cover
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
+
+try:  # pragma: no cover
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 NTAX_PATTERN = re.compile(r"""ntax=(\d+)""", re.IGNORECASE)
 NCHAR_PATTERN = re.compile(r"""nchar=(\d+)""", re.IGNORECASE)
 
 
+class SitePatterns(namedtuple('SitePatterns', 'taxa patterns weights sites')):
+    """
+    The unique site patterns of a matrix, as returned by
+    `DataHandler.site_patterns()`:
+
+    - `taxa`: the taxa, in the order of the states in each pattern
+    - `patterns`: a list of the unique columns, as tuples of states
+    - `weights`: the number of sites that have each pattern
+    - `sites`: the index of the pattern of each site
+    """
+    __slots__ = ()
+
+    def expand(self, selected):
+        """
+        Returns the sites that have one of the patterns in `selected`
+
+        :param selected: pattern indices
+        :type selected: iterable
+
+        :return: A sorted list of site positions.
+        """
+        selected = set(selected)
+        return [site for site, p in enumerate(self.sites) if p in selected]
+
+
+class CharacterView(Mapping):
+    """
+    A read-only view of the columns of a `DataHandler` matrix, mapping each
+    character label (or site index, if there are no labels) to a dictionary
+    of taxon -> state.
+
+    Nothing is copied up front: each column is read from the matrix when it
+    is looked up, so `view[label]` costs one pass over the taxa whatever the
+    number of sites, and a fresh dictionary is returned every time. The
+    label -> site lookup table is rebuilt whenever the handler's version
+    changes (i.e. after `add_taxon`, `del_taxon` or parsing), or the matrix
+    is replaced or changes width.
+
+    :param handler: the data handler to view
+    :type handler: DataHandler
+    """
+    def __init__(self, handler):
+        self._handler = handler
+        self._matrix = None  # the matrix the lookup table was built for
+        self._stamp = None
+        self._index = {}  # label -> site
+
+    def _sites(self):
+        """Returns the up to date label -> site lookup table"""
+        handler = self._handler
+        width = max([len(row) for row in handler.matrix.values()] or [0])
+        stamp = (handler._version, width, len(handler.charlabels))
+        if self._matrix is not handler.matrix or self._stamp != stamp:
+            self._index = {}
+            for site in range(width):
+                self._index.setdefault(handler.charlabels.get(site, site), site)
+            self._matrix, self._stamp = handler.matrix, stamp
+        return self._index
+
+    def __getitem__(self, label):
+        site = self._sites()[label]
+        return dict(
+            (taxon, row[site]) for taxon, row in self._handler.matrix.items()
+            if site < len(row)
+        )
+
+    def __iter__(self):
+        return iter(list(self._sites()))
+
+    def __len__(self):
+        return len(self._sites())
+
+    def __contains__(self, label):
+        return label in self._sites()
+
+    def items(self):
+        """Iterates over (label, column) pairs, reading all columns at once"""
+        sites = self._sites()
+        taxa = self._handler.taxa
+        rows = [self._handler.matrix[taxon] for taxon in taxa]
+        if len(set(len(row) for row in rows)) != 1:
+            return [(label, self[label]) for label in sites]
+        columns = list(zip(*rows))  # transpose all rows in one go.
+        return [
+            (label, dict(zip(taxa, columns[site])))
+            for label, site in sites.items()
+        ]
+
+    def values(self):
+        return [column for label, column in self.items()]
+
+    def __repr__(self):
+        return "<CharacterView: %d characters from %d taxa>" % (
+            len(self), self._handler.ntaxa
+        )
+
+
 class DataHandler(GenericHandler):
-    """Handler for data matrices"""
+    """
+    Handler for data matrices
+
+    :param compact: store the matrix as a `CompactMatrix` (one byte per
+        site) rather than as lists of states
+    :type compact: Boolean
+
+    :param sitecache_size: number of parsed rows to cache (default:
+        `SITECACHE_SIZE`, 0 to disable the cache)
+    :type sitecache_size: int
+    """
+    # identical rows are only parsed once while they're in the site cache,
+    # but the cache is bypassed if fewer than SITECACHE_MIN_HIT_RATE of the
+    # first SITECACHE_WARMUP rows were repeats.
+    SITECACHE_SIZE = 1024
+    SITECACHE_MIN_HIT_RATE = 0.1
+    SITECACHE_WARMUP = 256
 
     _character_block_pattern = re.compile(
         r"""charstatelabels(.*?);""",
@@ -20,21 +146,94 @@ class DataHandler(GenericHandler):
         r"""format\b(.*?);""",
         re.IGNORECASE | re.DOTALL | re.MULTILINE
     )
+    _bracket_pattern = re.compile(r"""[(){}]""")
+    _brackets_pattern = re.compile(r"""(?:\(\)|\{\})*$""")
     
-    def __init__(self):
+    def __init__(self, compact=False, sitecache_size=None):
         self.charlabels = {}
         self.attributes = []
         self.format = {}
         self.gaps = None
         self.missing = None
-        self.matrix = defaultdict(list)
-        self._sitecache = {}  # cache for site patterns to parsed sites
-        self._characters = None  # cache for characters list
-        self._symbols = None  # cache for symbols list
+        self.matrix = CompactMatrix() if compact else ListMatrix()
+        self.sitecache_size = sitecache_size
+        self._sitecache = self._make_sitecache()  # row string -> parsed sites
+        self._characters = None  # CharacterView of the matrix
+        self._symbols = None  # cache for (version, symbols set)
+        self._version = 0  # changed whenever taxa are added or removed
+        self._taxa = None  # cache for (matrix, matrix edits, ordered taxa)
         super(DataHandler, self).__init__()
 
     def __getitem__(self, index):
-        return (self.taxa[index], self.matrix.get(self.taxa[index]))
+        taxon = self._taxon_index()[index]
+        return (taxon, self.matrix.get(taxon))
+
+    def __iter__(self):
+        for taxon in list(self._taxon_index()):
+            yield (taxon, self.matrix.get(taxon))
+
+    def __getstate__(self):
+        # don't pickle the caches
+        state = dict(self.__dict__)
+        state.pop('_sitecache', None)
+        state.update({'_characters': None, '_symbols': None, '_taxa': None})
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._sitecache = self._make_sitecache()
+
+    def _make_sitecache(self):
+        """Returns an empty site cache"""
+        size = self.SITECACHE_SIZE if self.sitecache_size is None \
+            else self.sitecache_size
+        return LRUCache(
+            size, self.SITECACHE_MIN_HIT_RATE, self.SITECACHE_WARMUP
+        )
+
+    @property
+    def sitecache(self):
+        """The cache of parsed rows (see `LRUCache` for its counters)"""
+        return self._sitecache
+
+    @property
+    def compact(self):
+        """True if the matrix is stored as a `CompactMatrix`"""
+        return isinstance(self.matrix, CompactMatrix)
+
+    @compact.setter
+    def compact(self, compact):
+        if compact and not self.compact:
+            self.matrix = CompactMatrix(self.matrix)
+        elif not compact and self.compact:
+            self.matrix = ListMatrix(
+                [(t, list(r)) for t, r in self.matrix.items()]
+            )
+
+    def _taxon_index(self):
+        """
+        Returns the ordered list of taxa in the matrix. The list is kept
+        up to date by `add_taxon` and `del_taxon`, and rebuilt if the
+        matrix is replaced or its taxa are changed directly (which the
+        matrix counts, see `TrackedTaxa`). A matrix that doesn't count its
+        edits, e.g. a plain dict assigned to `matrix`, is read every time.
+        """
+        matrix = self.matrix
+        edits = getattr(matrix, 'edits', None)
+        if edits is None:
+            return list(matrix.keys())
+        if self._taxa is None or self._taxa[0] is not matrix or \
+                self._taxa[1] != edits:
+            self._taxa = (matrix, edits, list(matrix.keys()))
+        return self._taxa[2]
+
+    def _edited_taxa(self, taxa):
+        """
+        Marks the index `taxa` (from `_taxon_index` before an edit, and
+        updated by the caller) as matching the edited matrix.
+        """
+        if self._taxa is not None and self._taxa[2] is taxa:
+            self._taxa = (self.matrix, self.matrix.edits, taxa)
 
     @property
     def ntaxa(self):
@@ -44,31 +243,132 @@ class DataHandler(GenericHandler):
     @property
     def nchar(self):
         """Number of Characters"""
-        return len(self.matrix[list(self.matrix.keys())[0]])
+        # rows can be edited in place, so always look at the first row
+        for row in self.matrix.values():
+            return len(row)
+        return 0
     
     @property
     def taxa(self):
         """Taxa list"""
-        return list(self.matrix.keys())
+        return list(self._taxon_index())
     
     @property
     def symbols(self):
         """Distinct symbols in matrix"""
-        if not self._symbols:
-            self._symbols = set()
-            [self._symbols.update(vals) for vals in self.matrix.values()]
-        return self._symbols
+        if not self._symbols or self._symbols[0] != self._version:
+            symbols = set()
+            [symbols.update(vals) for vals in self.matrix.values()]
+            self._symbols = (self._version, symbols)
+        return self._symbols[1]
     
     @property
     def characters(self):
-        if not self._characters:
-            self._characters = defaultdict(dict)
-            for taxon in self.taxa:
-                for index, _ in enumerate(self.matrix[taxon]):
-                    label = self.charlabels.get(index, index)
-                    self._characters[label][taxon] = self.matrix[taxon][index]
+        """A `CharacterView` of label -> {taxon: state} for each site"""
+        if self._characters is None:
+            self._characters = CharacterView(self)
         return self._characters
     
+    def to_numpy(self):
+        """
+        Returns the matrix as an integer-coded numpy array with one row per
+        taxon (in the order of `self.taxa`) and one column per site, and
+        the alphabet of states so that `alphabet[code]` is the state of a
+        cell. The alphabet is sorted, and the array uses the smallest
+        unsigned integer type that fits it.
+
+        :return: A tuple of (array, alphabet)
+        :raises ImportError: If numpy is not installed.
+        :raises NexusFormatException: If the rows have different lengths.
+        """
+        if numpy is None:  # pragma: no cover
+            raise ImportError("DataHandler.to_numpy needs numpy")
+
+        rows = [self.matrix[taxon] for taxon in self.taxa]
+        if len(set(len(row) for row in rows)) > 1:
+            raise NexusFormatException("Rows have different lengths")
+        if not rows:
+            return numpy.zeros((0, 0), dtype=numpy.uint8), []
+
+        if self.compact:
+            # recode the symbol table codes rather than re-reading each state
+            codes = numpy.vstack([
+                numpy.frombuffer(row.codes, dtype=row.codes.typecode)
+                for row in rows
+            ])
+            symbols = self.matrix.table.symbols
+            used = numpy.unique(codes)
+            alphabet = sorted(symbols[code] for code in used)
+            lookup = numpy.zeros(len(symbols), dtype=numpy.intp)
+            lookup[used] = [alphabet.index(symbols[code]) for code in used]
+            codes = lookup[codes]
+        else:
+            alphabet = sorted(set().union(*rows))
+            index = dict((state, code) for code, state in enumerate(alphabet))
+            codes = numpy.array(
+                [[index[state] for state in row] for row in rows],
+                dtype=numpy.intp
+            ).reshape(len(rows), -1)
+        dtype = numpy.min_scalar_type(max(len(alphabet) - 1, 0))
+        return codes.astype(dtype), alphabet
+
+    def site_patterns(self):
+        """
+        Compresses the matrix into its unique site patterns by hashing its
+        columns, so that tools can work on each distinct column once and
+        weight the results by the number of sites that share it.
+
+        >>> d = DataHandler()
+        >>> d.add_taxon('A', '0110')
+        >>> d.add_taxon('B', '0100')
+        >>> d.site_patterns()
+        SitePatterns(taxa=['A', 'B'], patterns=[('0', '0'), ('1', '1'), ('1', '0')], weights=[2, 1, 1], sites=[0, 1, 2, 0])
+
+        :return: A `SitePatterns` tuple of (taxa, patterns, weights, sites)
+        :raises NexusFormatException: If the rows have different lengths.
+        """
+        taxa = self.taxa
+        rows = [self.matrix[taxon] for taxon in taxa]
+        if len(set(len(row) for row in rows)) > 1:
+            raise NexusFormatException("Rows have different lengths")
+        if self.compact:
+            # hash the columns of state codes, and only decode the patterns
+            columns = zip(*[row.codes for row in rows])
+        else:
+            columns = zip(*rows)
+
+        index, weights, sites = {}, [], []
+        for column in columns:
+            p = index.setdefault(column, len(index))
+            if p == len(weights):
+                weights.append(0)
+            weights[p] += 1
+            sites.append(p)
+
+        patterns = sorted(index, key=index.get)
+        if self.compact:
+            symbols = self.matrix.table.symbols
+            patterns = [tuple(symbols[c] for c in p) for p in patterns]
+        return SitePatterns(taxa, patterns, weights, sites)
+
+    def view(self, taxa=None, sites=None):
+        """
+        Returns a `DataView` of some of the taxa and/or sites of the matrix,
+        which shares this handler's rows instead of copying them.
+
+        :param taxa: the taxa to include, in order (default: all taxa)
+        :type taxa: list
+
+        :param sites: the site positions to include, in order (default:
+            all sites)
+        :type sites: list
+
+        :return: A `DataView`
+        :raises KeyError: If a taxon is not in the matrix.
+        :raises IndexError: If a site is out of range.
+        """
+        return DataView(self, taxa, sites)
+
     def is_missing_or_gap(self, state):
         return True if state in ('-', '?') else False
     
@@ -104,6 +404,11 @@ class DataHandler(GenericHandler):
         """
         Parses a string of sites and returns a list of site values
 
+        Polymorphic or multistate sites are given in brackets, e.g. `(12)`,
+        `(1,2)` or `{12}`, and are returned as a single value. Spaces are
+        ignored, and commas between sites are ignored in rows that contain
+        brackets.
+
         >>> DataHandler()._parse_sites('123')
         ['1', '2', '3']
         >>> DataHandler()._parse_sites('1(12)')
@@ -111,7 +416,9 @@ class DataHandler(GenericHandler):
         >>> DataHandler()._parse_sites('123(4,5)56')
         ['1', '2', '3', '4,5', '5', '6']
         >>> DataHandler()._parse_sites('123(4 5)56')
-        ['1', '2', '3', '4 5', '5', '6']
+        ['1', '2', '3', '45', '5', '6']
+        >>> DataHandler()._parse_sites('1{23}4')
+        ['1', '23', '4']
         >>> DataHandler()._parse_sites("ACGTU?")
         ['A', 'C', 'G', 'T', 'U', '?']
 
@@ -122,31 +429,34 @@ class DataHandler(GenericHandler):
         :raises NexusFormatException: If data matrix contains incomplete
             multistate values
         """
-        remove_values = [' ', ';']
-        parsed = [s for s in sites if s not in remove_values]
-        if sites not in self._sitecache:
-            # Slow parser for multistate
-            if '(' in parsed:
-                multistate = False
-                todo, parsed = parsed, []  # switch places.
-                while todo:
-                    site = todo.pop(0)
-                    if site == ',':
-                        continue
-                    elif site == '(':
-                        # read-ahead
-                        site = ''  # discard open bracket
-                        multistate = True
-                        while multistate:
-                            nextchar = todo.pop(0)
-                            if nextchar == ')':
-                                multistate = False
-                            else:
-                                site += nextchar
-                    parsed.append(site)
-                # end slow parser
+        parsed = self._sitecache.get(sites)
+        if parsed is not None:
+            return parsed
+
+        if ' ' in sites or ';' in sites:
+            code = sites.replace(' ', '').replace(';', '')
+        else:
+            code = sites
+
+        if '(' not in code and '{' not in code:
+            if ')' in code or '}' in code:
+                raise NexusFormatException("Unmatched bracket in %s" % sites)
+            parsed = list(code)
+        else:
+            # the brackets must pair up without nesting, and then splitting
+            # on them gives alternating runs of single sites and groups.
+            brackets = ''.join(self._bracket_pattern.findall(code))
+            if not self._brackets_pattern.match(brackets):
+                raise NexusFormatException("Unmatched bracket in %s" % sites)
+            parts = self._bracket_pattern.split(code)
+            parsed = []
+            for index in range(0, len(parts) - 1, 2):
+                parsed.extend(parts[index].replace(',', ''))
+                parsed.append(parts[index + 1])
+            parsed.extend(parts[-1].replace(',', ''))
+
         self._sitecache[sites] = parsed
-        return self._sitecache[sites]
+        return parsed
 
     def add_taxon(self, taxon, site_values=None):
         """
@@ -160,7 +470,12 @@ class DataHandler(GenericHandler):
 
         :return: None
         """
+        taxa = self._taxon_index()
+        if taxon not in self.matrix:
+            taxa.append(taxon)
         self.matrix[taxon].extend(site_values)
+        self._edited_taxa(taxa)
+        self._version += 1
 
     def del_taxon(self, taxon):
         """
@@ -171,7 +486,11 @@ class DataHandler(GenericHandler):
 
         :return: None
         """
+        taxa = self._taxon_index()
         del(self.matrix[taxon])
+        taxa.remove(taxon)
+        self._edited_taxa(taxa)
+        self._version += 1
 
     def parse(self, data):
         """
@@ -322,5 +641,120 @@ class DataHandler(GenericHandler):
             (self.nchar, self.ntaxa)
 
 
+class DataView(DataHandler):
+    """
+    A subset of the taxa and/or sites of a `DataHandler` that reads
+    through to the parent's rows rather than copying them, so making a
+    view costs next to nothing whatever the size of the matrix. Views
+    can be iterated over, written and used like any other data handler,
+    and edits made to the parent's rows show through.
+
+    The first time the view is edited (e.g. with `add_taxon`,
+    `del_taxon`, or by changing a row) it is materialized: the selected
+    cells are copied into a matrix of its own, and the edit is applied
+    to the copy, leaving the parent untouched.
+
+    :param parent: the data handler to view
+    :type parent: DataHandler
+
+    :param taxa: the taxa to include, in order (default: all taxa)
+    :type taxa: list
+
+    :param sites: the site positions to include, in order (default: all
+        sites)
+    :type sites: list
+    """
+    def __init__(self, parent, taxa=None, sites=None):
+        super(DataView, self).__init__(sitecache_size=0)
+        taxa = parent.taxa if taxa is None else list(taxa)
+        for taxon in taxa:
+            if taxon not in parent.matrix:
+                raise KeyError(taxon)
+        if sites is not None:
+            try:
+                sites = array('L', sites)
+            except OverflowError:
+                raise IndexError("Negative site positions are not allowed")
+            if sites and max(sites) >= parent.nchar:
+                raise IndexError("Site %d is out of range" % max(sites))
+            self.charlabels = dict(
+                (i, parent.charlabels[site]) for i, site in enumerate(sites)
+                if site in parent.charlabels
+            )
+        else:
+            self.charlabels = dict(parent.charlabels)
+        self.parent = parent
+        self.sites = sites
+        self.attributes = list(parent.attributes)
+        self.format = dict(parent.format or {})
+        self.gaps = parent.gaps
+        self.missing = parent.missing
+        self.matrix = MatrixView(parent.matrix, taxa, sites, self._copy)
+
+    def __setstate__(self, state):
+        super(DataView, self).__setstate__(state)
+        if not self.materialized:
+            self.matrix._materialize = self._copy
+
+    @property
+    def materialized(self):
+        """True once the view has copied its cells into its own matrix"""
+        return not isinstance(self.matrix, MatrixView)
+
+    def _copy(self):
+        """Copies the viewed cells into a new matrix, and switches to it"""
+        rows = [(taxon, list(row)) for taxon, row in self.matrix.items()]
+        if self.parent.compact:
+            self.matrix = CompactMatrix(dict(rows))
+        else:
+            self.matrix = ListMatrix(rows)
+        self._version += 1
+        return self.matrix
+
+    def materialize(self):
+        """
+        Copies the viewed cells into the view's own matrix, so that it no
+        longer shares (or sees changes to) the parent's rows.
+
+        :return: None
+        """
+        if not self.materialized:
+            self.matrix.materialize()
+
+    @DataHandler.compact.setter
+    def compact(self, compact):
+        self.materialize()
+        DataHandler.compact.fset(self, compact)
+
+    def view(self, taxa=None, sites=None):
+        # views of views read straight from the parent
+        if self.materialized:
+            return DataView(self, taxa, sites)
+        taxa = self.taxa if taxa is None else list(taxa)
+        for taxon in taxa:
+            if taxon not in self.matrix:
+                raise KeyError(taxon)
+        if sites is not None and self.sites is not None:
+            sites = [self.sites[site] for site in sites]
+        elif sites is None:
+            sites = self.sites
+        return DataView(self.parent, taxa, sites)
+
+    def add_taxon(self, taxon, site_values=None):
+        self.materialize()
+        super(DataView, self).add_taxon(taxon, site_values)
+
+    def del_taxon(self, taxon):
+        self.materialize()
+        super(DataView, self).del_taxon(taxon)
+
+    def parse(self, data):
+        raise TypeError("DataView can not parse data")
+
+    def __repr__(self):
+        return "<NexusDataView: %d characters from %d taxa>" % \
+            (self.nchar, self.ntaxa)
+
+
 class CharacterHandler(DataHandler):
     pass
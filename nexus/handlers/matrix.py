@@ -0,0 +1,462 @@
+"""
+Compact storage for data matrices
+"""
+from array import array
+from collections import defaultdict
+from operator import itemgetter
+
+try:  # pragma: no cover
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
+
+try:  # pragma: no cover
+    from itertools import imap
+except ImportError:  # pragma: no cover
+    imap = map
+
+# array typecodes, from smallest to largest, used as the symbol table grows
+TYPECODES = ('B', 'H', 'L')
+
+
+class SymbolTable(object):
+    """
+    Maps each distinct state in a matrix (e.g. '0', 'A', '?' or a
+    polymorphic state like '12') to a small integer code and back.
+    """
+    def __init__(self):
+        self.symbols = []  # code -> state
+        self.codes = {}  # state -> code
+
+    def encode(self, state):
+        """Returns the code for `state`, adding it to the table if needed"""
+        try:
+            return self.codes[state]
+        except KeyError:
+            code = self.codes[state] = len(self.symbols)
+            self.symbols.append(state)
+            return code
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __repr__(self):
+        return "<SymbolTable: %d symbols>" % len(self)
+
+
+class CompactRow(object):
+    """
+    A row of a `CompactMatrix`, storing one state code per site in an
+    `array` (one byte per site for up to 256 distinct states).
+
+    Rows read like the lists of states they replace, e.g. `row[0]`,
+    `row[2:5]`, `len(row)` and `''.join(row)`.
+    """
+    __slots__ = ('codes', 'table')
+
+    def __init__(self, table, values=None):
+        self.codes = array(TYPECODES[0])
+        self.table = table
+        if values is not None:
+            self.extend(values)
+
+    def _store(self, method, *args):
+        """Calls `method` on the codes, widening the array if it overflows"""
+        while True:
+            try:
+                return getattr(self.codes, method)(*args)
+            except OverflowError:
+                typecode = TYPECODES[TYPECODES.index(self.codes.typecode) + 1]
+                self.codes = array(typecode, self.codes)
+
+    def extend(self, values):
+        try:  # fast path, all states are already in the table.
+            codes = list(map(self.table.codes.__getitem__, values))
+        except KeyError:
+            codes = list(map(self.table.encode, values))
+        # no code is larger than the table, so widen the row to fit it first.
+        for typecode in TYPECODES[TYPECODES.index(self.codes.typecode):]:
+            if len(self.table) <= 256 ** array(typecode).itemsize:
+                break
+        if typecode != self.codes.typecode:
+            self.codes = array(typecode, self.codes)
+        self.codes.extend(array(typecode, codes))
+
+    def append(self, value):
+        self._store('append', self.table.encode(value))
+
+    def insert(self, index, value):
+        self._store('insert', index, self.table.encode(value))
+
+    def pop(self, index=-1):
+        return self.table.symbols[self.codes.pop(index)]
+
+    def index(self, value):
+        code = self.table.codes.get(value)
+        if code is None:
+            raise ValueError("%r is not in row" % value)
+        return self.codes.index(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.table.symbols[c] for c in self.codes[index]]
+        return self.table.symbols[self.codes[index]]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            raise TypeError("CompactRow does not support slice assignment")
+        self._store('__setitem__', index, self.table.encode(value))
+
+    def __delitem__(self, index):
+        del self.codes[index]
+
+    def __iter__(self):
+        return imap(self.table.symbols.__getitem__, self.codes)
+
+    def __contains__(self, value):
+        code = self.table.codes.get(value)
+        return code is not None and code in self.codes
+
+    def count(self, value):
+        code = self.table.codes.get(value)
+        return 0 if code is None else self.codes.count(code)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactRow) and other.table is self.table:
+            return self.codes == other.codes
+        try:
+            return len(self) == len(other) and list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return (self.codes, self.table)
+
+    def __setstate__(self, state):
+        self.codes, self.table = state
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class TrackedTaxa(object):
+    """
+    Mixin for a taxon -> row dictionary that counts the changes to its
+    set of taxa in `edits`, so that a handler can tell cheaply whether an
+    index of the taxa is still up to date. (Replacing the row of a taxon
+    that is already there doesn't count.)
+    """
+    edits = 0
+
+    def __setitem__(self, taxon, row):
+        if taxon not in self:
+            self.edits += 1
+        super(TrackedTaxa, self).__setitem__(taxon, row)
+
+    def __delitem__(self, taxon):
+        super(TrackedTaxa, self).__delitem__(taxon)
+        self.edits += 1
+
+    def pop(self, taxon, *default):
+        self.edits += 1
+        return super(TrackedTaxa, self).pop(taxon, *default)
+
+    def popitem(self):
+        self.edits += 1
+        return super(TrackedTaxa, self).popitem()
+
+    def clear(self):
+        self.edits += 1
+        super(TrackedTaxa, self).clear()
+
+    # (dict's own versions of these don't go through __setitem__)
+    def update(self, *args, **kwargs):
+        for taxon, row in dict(*args, **kwargs).items():
+            self[taxon] = row
+
+    def setdefault(self, taxon, row=None):
+        if taxon not in self:
+            self[taxon] = row
+        return self[taxon]
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
+class ListMatrix(TrackedTaxa, defaultdict):
+    """
+    The default matrix: a `defaultdict(list)` of taxon -> list of states
+    that counts the changes to its taxa (see `TrackedTaxa`).
+
+    :param rows: taxon -> list of states to fill the matrix with
+    :type rows: dict
+    """
+    def __init__(self, rows=()):
+        super(ListMatrix, self).__init__(list, rows)
+
+    def copy(self):
+        return self.__class__(self)
+
+    def __reduce__(self):
+        return (self.__class__, (list(self.items()),))
+
+
+class CompactMatrix(TrackedTaxa, dict):
+    """
+    A taxon -> row dictionary that stores each row as a `CompactRow` of
+    state codes instead of a list of one-character strings, using a single
+    `SymbolTable` shared by all rows.
+
+    A list costs a pointer (8 bytes) per site, whereas a `CompactRow`
+    costs one byte per site while there are fewer than 256 distinct
+    states, so large matrices take about a tenth of the memory.
+
+    Like the `defaultdict(list)` it replaces, looking up a missing taxon
+    adds an empty row, and any sequence of states assigned to a taxon is
+    stored as a `CompactRow`.
+
+    :param rows: taxon -> sequence of states to fill the matrix with
+    :type rows: dict
+
+    :param table: the symbol table to use (default: a new one)
+    :type table: SymbolTable
+    """
+    def __init__(self, rows=None, table=None):
+        super(CompactMatrix, self).__init__()
+        self.table = table if table is not None else SymbolTable()
+        if rows is not None:
+            self.update(rows)
+
+    def __missing__(self, taxon):
+        row = CompactRow(self.table)
+        super(CompactMatrix, self).__setitem__(taxon, row)
+        return row
+
+    def __setitem__(self, taxon, values):
+        if not (isinstance(values, CompactRow) and values.table is self.table):
+            values = CompactRow(self.table, values)
+        super(CompactMatrix, self).__setitem__(taxon, values)
+
+    def update(self, *args, **kwargs):
+        for taxon, values in dict(*args, **kwargs).items():
+            self[taxon] = values
+
+    def setdefault(self, taxon, values=None):
+        if taxon not in self:
+            self[taxon] = values or []
+        return self[taxon]
+
+    def copy(self):
+        matrix = self.__class__(table=self.table)
+        for taxon, row in self.items():
+            matrix[taxon].codes = array(row.codes.typecode, row.codes)
+        return matrix
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self.items()), self.table))
+
+    @property
+    def nbytes(self):
+        """Number of bytes used to store the state codes"""
+        return sum(r.codes.itemsize * len(r.codes) for r in self.values())
+
+
+class RowView(object):
+    """
+    A read-through view of some of the sites of a matrix row, as found in
+    a `MatrixView`. Nothing is copied: `view[i]` is `row[sites[i]]`.
+
+    Editing the row asks the `MatrixView` to materialize its handler first
+    (see `DataView.materialize`), after which the row view forwards
+    everything to the handler's own copy of the row.
+    """
+    __slots__ = ('row', 'sites', 'owner')
+
+    def __init__(self, row, sites=None, owner=None):
+        self.row = row
+        self.sites = sites  # None for all sites
+        self.owner = owner
+
+    def _write(self):
+        """Returns the row to edit, materializing the view first"""
+        if self.owner is not None:
+            self.owner.materialize()
+        return self.row
+
+    def __len__(self):
+        return len(self.row) if self.sites is None else len(self.sites)
+
+    def __getitem__(self, index):
+        if self.sites is None:
+            return self.row[index]
+        elif isinstance(index, slice):
+            return [self.row[site] for site in self.sites[index]]
+        return self.row[self.sites[index]]
+
+    def __iter__(self):
+        if self.sites is None:
+            return iter(self.row)
+        getter = self.owner.getter()
+        if getter is None:
+            return imap(self.row.__getitem__, self.sites)
+        elif isinstance(self.row, CompactRow):
+            # look up the codes in one go and only then decode them
+            return imap(
+                self.row.table.symbols.__getitem__, getter(self.row.codes)
+            )
+        return iter(getter(self.row))
+
+    def __contains__(self, value):
+        return value in iter(self)
+
+    def count(self, value):
+        return list(self).count(value)
+
+    def index(self, value):
+        return list(self).index(value)
+
+    def __setitem__(self, index, value):
+        self._write()[index] = value
+
+    def __delitem__(self, index):
+        del self._write()[index]
+
+    def append(self, value):
+        self._write().append(value)
+
+    def extend(self, values):
+        self._write().extend(values)
+
+    def insert(self, index, value):
+        self._write().insert(index, value)
+
+    def pop(self, index=-1):
+        return self._write().pop(index)
+
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class MatrixView(Mapping):
+    """
+    A read-through taxon -> `RowView` mapping over some of the taxa and
+    sites of another matrix, sharing its rows.
+
+    Assigning or deleting a row, or editing one in place, calls
+    `materialize` to replace the view with a real copy of the selected
+    cells, and is then applied to that copy. From then on the view (and
+    any row views it handed out) reads and writes the copy.
+
+    :param matrix: the matrix to view
+    :type matrix: dict
+
+    :param taxa: the taxa to include, in order
+    :type taxa: list
+
+    :param sites: the site positions to include, in order, or None for all
+    :type sites: array
+
+    :param materialize: function that copies the view into a real matrix
+        and returns it
+    :type materialize: callable
+    """
+    edits = 0  # the viewed taxa never change (see `TrackedTaxa`)
+
+    def __init__(self, matrix, taxa, sites=None, materialize=None):
+        self._matrix = matrix
+        self._taxa = taxa
+        self._taxonset = set(taxa)
+        self._sites = sites
+        self._materialize = materialize
+        self._rows = {}  # taxon -> RowView, so they can be rebound
+        self._getter = None
+        self._copy = None  # the materialized matrix
+
+    def __getstate__(self):
+        # the row views and getter are rebuilt when needed, and the owner
+        # hands over `materialize` again when it is unpickled (bound
+        # methods and itemgetters can't be pickled on python 2)
+        state = dict(self.__dict__)
+        state.update({'_rows': {}, '_getter': None, '_materialize': None})
+        return state
+
+    def getter(self):
+        """
+        Returns a function that picks the viewed sites out of a row (or its
+        codes) in one call, or None if no sites are viewed.
+        """
+        if self._getter is None and self._sites:
+            sites = self._sites
+            if sites[-1] - sites[0] == len(sites) - 1 and \
+                    all(b > a for a, b in zip(sites, sites[1:])):
+                self._getter = itemgetter(slice(sites[0], sites[-1] + 1))
+            elif len(sites) > 1:
+                self._getter = itemgetter(*sites)
+        return self._getter
+
+    def materialize(self):
+        """
+        Materializes the view and points all row views at the copied rows.
+
+        :return: the copied matrix
+        """
+        if self._copy is None:
+            self._copy = self._materialize()
+            for taxon, row in self._rows.items():
+                row.row, row.sites, row.owner = self._copy[taxon], None, None
+            self._rows = {}
+        return self._copy
+
+    def __getitem__(self, taxon):
+        if self._copy is not None:
+            return self._copy[taxon]
+        elif taxon not in self._taxonset:
+            raise KeyError(taxon)
+        row = self._rows.get(taxon)
+        if row is None:
+            row = self._rows[taxon] = RowView(
+                self._matrix[taxon], self._sites, self
+            )
+        return row
+
+    def __iter__(self):
+        return iter(self._taxa if self._copy is None else self._copy)
+
+    def __len__(self):
+        return len(self._taxa if self._copy is None else self._copy)
+
+    def __contains__(self, taxon):
+        if self._copy is not None:
+            return taxon in self._copy
+        return taxon in self._taxonset
+
+    def __setitem__(self, taxon, values):
+        self.materialize()[taxon] = values
+
+    def __delitem__(self, taxon):
+        del self.materialize()[taxon]
+
+    def __repr__(self):
+        return "<MatrixView: %d taxa>" % len(self)
@@ -1,12 +1,219 @@
 import re
-from nexus.handlers import GenericHandler
+import multiprocessing
+from collections import namedtuple
+from itertools import islice
+
+from nexus.handlers import GenericHandler, COMMENT_PATTERN
 from nexus.exceptions import NexusFormatException
+from nexus.lrucache import LRUCache
+from nexus.trees.newick import parse_tree
+from nexus.trees.splits import (
+    SplitCounter, TopologyHash, TreeSplits, taxa_index
+)
+from nexus.trees.distance import SplitIndex, rf_matrix
+
+try:  # pragma: no cover
+    from collections.abc import Sequence
+except ImportError:  # pragma: no cover
+    from collections import Sequence
+
+try:  # pragma: no cover
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# the tokens detranslation looks at: comments, which are left as they are,
+# and the labels at the start of each node (i.e. after `(` or `,`)
+DETRANSLATE_PATTERN = re.compile(r"""
+    (?=[\[(,])               # (quickly skip anything else)
+    (?:
+        (\[[^\]]*\])        # comment
+        |([(,]\s*)           # boundary
+        ([^\s(),:;\[\]]+)    # taxa-id
+    )
+""", re.VERBOSE)
+
+
+def detranslate_tree(tree, translators):
+    """
+    Takes a `tree` and expands the short format tree with translated
+    taxa labels from `translators` into a full format tree.
+
+    The tree is read once from left to right and rebuilt as it goes,
+    so each taxon is replaced exactly where it is found, and labels
+    inside comments are never touched.
+
+    :param tree: String containing newick tree
+    :type tree: String
+
+    :param translators: Mapping of taxa id -> taxa names
+    :type translators: Dict
+
+    :return: String of detranslated tree
+    """
+    # splitting gives [text, comment, boundary, taxon, text, ...], with
+    # None for the groups that didn't match.
+    parts = DETRANSLATE_PATTERN.split(tree)
+    taxa = parts[3::4]
+    parts[3::4] = map(translators.get, taxa, taxa)
+    return ''.join(filter(None, parts))
+
+
+def remove_comments(tree, translators=None):
+    """
+    Removes the comments from `tree`. (`translators` is ignored, but lets
+    this be used with `TreeHandler.map`)
+
+    :param tree: String containing newick tree
+    :type tree: String
+
+    :return: String of the tree without comments
+    """
+    return COMMENT_PATTERN.sub('', tree)
+
+
+# the function and translate table used by each `TreeHandler.map` worker
+_worker = {}
+
+
+def _init_worker(func, translators, detranslate):
+    """Sets up a `TreeHandler.map` worker process"""
+    _worker.update(func=func, translators=translators, detranslate=detranslate)
+
+
+def _apply(tree):
+    """Applies the worker's function to `tree`"""
+    if _worker['detranslate']:
+        tree = detranslate_tree(tree, _worker['translators'])
+    return _worker['func'](tree, _worker['translators'])
+
+
+class Topology(namedtuple('Topology', 'hash trees ntrees frequency credible')):
+    """
+    A tree topology, as returned by `TreeHandler.unique_topologies()`:
+
+    - `hash`: the topology's hash (see `nexus.trees.splits.topology_hash`)
+    - `trees`: the indices of the trees with this topology
+    - `ntrees`: the number of trees with this topology
+    - `frequency`: the fraction of the trees with this topology
+    - `credible`: whether the topology is in the credible set
+    """
+    __slots__ = ()
+
+
+def _imap(func, trees, translators=None, detranslate=False, processes=None,
+          chunksize=None):
+    """
+    Like `TreeHandler.map`, but takes any iterable of trees and yields the
+    results in order as they are ready, so the trees never all need to be
+    in memory at once.
+    """
+    if processes == 1 or (isinstance(trees, list) and len(trees) <= 1):
+        for tree in trees:
+            if detranslate:
+                tree = detranslate_tree(tree, translators)
+            yield func(tree, translators)
+        return
+
+    pool = multiprocessing.Pool(
+        processes, _init_worker, (func, translators, detranslate)
+    )
+    try:
+        for result in pool.imap(_apply, trees, chunksize or 64):
+            yield result
+        pool.close()
+        pool.join()
+    finally:
+        pool.terminate()
+
+
+class DetranslatedTrees(Sequence):
+    """
+    The trees of a `TreeHandler` after `detranslate()` has been called.
+
+    Reads like the list of detranslated tree strings, but each tree is only
+    detranslated when it is looked up, iterated over or written, and the
+    most recently used results are kept in the handler's bounded cache.
+
+    Changing the list (e.g. `append` or assigning to an item) detranslates
+    all the trees first, and then makes the change to the plain list.
+
+    :param handler: the tree handler
+    :type handler: TreeHandler
+    """
+    def __init__(self, handler):
+        self._handler = handler
+
+    def __len__(self):
+        return len(self._handler._trees)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._handler._detranslated(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._handler._detranslated(index)
+
+    def _writable(self):
+        """Detranslates all trees, and returns the handler's plain list"""
+        handler = self._handler
+        handler.trees = [
+            handler._detranslate_tree(tree, handler.translators)
+            for tree in handler._trees
+        ]
+        return handler.trees
+
+    def __setitem__(self, index, tree):
+        self._writable()[index] = tree
+
+    def __delitem__(self, index):
+        del self._writable()[index]
+
+    def append(self, tree):
+        self._writable().append(tree)
+
+    def extend(self, trees):
+        self._writable().extend(trees)
+
+    def insert(self, index, tree):
+        self._writable().insert(index, tree)
+
+    def pop(self, index=-1):
+        return self._writable().pop(index)
+
+    def remove(self, tree):
+        self._writable().remove(tree)
+
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "<DetranslatedTrees: %d trees>" % len(self)
 
 
 class TreeHandler(GenericHandler):
     """Handler for `trees` blocks"""
+    # number of detranslated trees to keep after `detranslate()`
+    DETRANSLATE_CACHE_SIZE = 1024
+    # number of trees from `rf_matrix(other=...)` to compare at a time
+    RF_CHUNK_SIZE = 256
+
     is_tree = re.compile(r"""tree .*=.*;""", re.IGNORECASE)
 
+    # `translate_regex` and `_findall_chunks` are no longer used to
+    # detranslate trees (see `detranslate_tree`), but are kept for code
+    # that still uses them.
     translate_regex = re.compile(r"""
         ([,(])              # boundary
         ([A-Z0-9_\-\.]+)    # taxa-id
@@ -21,21 +228,82 @@ class TreeHandler(GenericHandler):
         self.was_translated = False
         # has detranslate been called?
         self._been_detranslated = False
+        # are we inside the translate block?
+        self._lost_in_translation = False
         self.translators = {}
         self.attributes = []
+        self._pending = False  # are trees detranslated when accessed?
+        self._cache = LRUCache(self.DETRANSLATE_CACHE_SIZE)
+        self._topologies = {}  # rooted -> tree string -> topology hash
         self.trees = []
         super(TreeHandler, self).__init__()
 
     def __getitem__(self, index):
         return self.trees[index]
 
+    def __getstate__(self):
+        # don't pickle the caches of detranslated trees and topologies
+        state = dict(self.__dict__)
+        state.pop('_cache', None)
+        state.pop('_topologies', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache = LRUCache(self.DETRANSLATE_CACHE_SIZE)
+        self._topologies = {}
+
+    @property
+    def trees(self):
+        """
+        The list of tree strings, or after `detranslate()` a
+        `DetranslatedTrees` list that detranslates each tree on access.
+        """
+        if self._pending:
+            return DetranslatedTrees(self)
+        return self._trees
+
+    @trees.setter
+    def trees(self, trees):
+        # new trees are taken as they are
+        self._trees = trees if isinstance(trees, list) else list(trees)
+        self._pending = False
+        self._cache.reset()
+        self._topologies = {}
+
+    def _detranslated(self, index):
+        """Returns tree number `index`, detranslated"""
+        ntrees = len(self._trees)
+        if index < 0:
+            index += ntrees
+        if not 0 <= index < ntrees:
+            raise IndexError("tree index out of range")
+        tree = self._cache.get(index)
+        if tree is None:
+            tree = self._detranslate_tree(self._trees[index], self.translators)
+            self._cache[index] = tree
+        return tree
+
+    def select(self, indices):
+        """
+        Keeps only the trees at positions `indices` (in that order), without
+        detranslating any of them.
+
+        :param indices: tree indices (zero-indexed)
+        :type indices: iterable
+
+        :return: None
+        """
+        self._trees = [self._trees[index] for index in indices]
+        self._cache.reset()
+
     @property
     def taxa(self):
         return self.translators.values()
 
     @property
     def ntrees(self):
-        return len(self.trees)
+        return len(self._trees)
 
     def parse(self, data):
         """
@@ -47,21 +315,39 @@ class TreeHandler(GenericHandler):
         :return: None
         """
         super(TreeHandler, self).parse(data)
+        self._trees.extend(self.iterparse(data))
+
+    def iterparse(self, data, detranslate=False):
+        """
+        Parses a `tree` nexus block from `data`, yielding each tree as it is
+        found instead of storing it in `self.trees`.
+
+        The translate block (if any) is stored in `self.translators` as it is
+        read, so `data` can be any iterable of lines, e.g. a file being read
+        lazily. Parsing state is kept between calls, so a block can also be
+        parsed in several pieces.
 
+        :param data: nexus block data
+        :type data: iterable of strings
+
+        :param detranslate: expand translated taxa labels in each tree
+        :type detranslate: Boolean
+
+        :return: A generator of tree strings
+        """
         translate_start = re.compile(r"""^translate$""", re.IGNORECASE)
         translation_pattern = re.compile(r"""(\d+)\s(['"\w\d\.\_\-]+)[,;]?""")
 
-        lost_in_translation = False
         for line in data:
             # look for translation start, and turn on lost_in_translation
             if translate_start.match(line):
-                lost_in_translation = True
+                self._lost_in_translation = True
                 self.was_translated = True
             elif self.is_mesquite_attribute(line):
                 self.attributes.append(line)
 
             # if we're in a translate block
-            elif lost_in_translation:
+            elif self._lost_in_translation:
                 if translation_pattern.match(line):
                     taxon_id, taxon = translation_pattern.findall(line)[0]
                     taxon = taxon.strip("'")
@@ -76,27 +362,392 @@ class TreeHandler(GenericHandler):
                         
                     self.translators[taxon_id] = taxon
                 if line.endswith(';'):
-                    lost_in_translation = False
+                    self._lost_in_translation = False
 
             elif self.is_tree.search(line):
-                self.trees.append(line)
+                # get taxa if not translated.
+                if not self.translators:
+                    taxa = re.findall(r"""[(),](\w+)[:),]""", line)
+                    for taxon_id, t in enumerate(taxa, 1):
+                        self.translators[taxon_id] = t
+                if detranslate:
+                    line = self._detranslate_tree(line, self.translators)
+                yield line
+
+    def parse_tree(self, index):
+        """
+        Parses tree number `index` into a `nexus.trees.Tree`, which stores
+        the tree's structure, branch lengths, labels and comments in flat
+        arrays rather than as a string.
+
+        :param index: the index of the tree
+        :type index: int
+
+        :return: A `Tree`
+        :raises NexusFormatException: If the tree is malformed.
+        """
+        return parse_tree(self.trees[index])
+
+    def iter_parsed(self):
+        """
+        Iterates over the trees, parsing each one into a `nexus.trees.Tree`
+        as it is reached.
+
+        :return: A generator of `Tree` instances
+        :raises NexusFormatException: If a tree is malformed.
+        """
+        for tree in self.trees:
+            yield parse_tree(tree)
+
+    def count_splits(self, error=None):
+        """
+        Counts the splits (bipartitions) in the trees in a single pass,
+        parsing one tree at a time. The splits are bitsets over the taxa
+        in the order of the translate block (or, without one, the sorted
+        tip labels of the first tree). Trees are read as they are stored,
+        so translated trees don't need to be detranslated first.
+
+        :param error: if given, count with lossy counting so that memory
+            is bounded, allowing each count to be up to `error * ntrees`
+            too low (see `nexus.trees.splits.SplitCounter`)
+        :type error: float
+
+        :return: A `nexus.trees.splits.SplitCounter`
+        :raises NexusFormatException: If a tree is malformed.
+        """
+        # without a translate block, `translators` only holds the labels
+        # that the tree regex could find, so take the taxa from the trees.
+        taxa = self._translated_taxa() if self.was_translated else None
+        counter = SplitCounter(taxa, self._stored_translators(), error)
+        counter.update(self._trees)
+        return counter
+
+    def consensus(self, threshold=None, greedy=False, error=None):
+        """
+        Builds a majority-rule (or greedy) consensus tree of the trees,
+        with the support of each split as the label of its node.
+
+        >>> tree = handler.consensus()  # doctest: +SKIP
+        >>> tree.newick()  # doctest: +SKIP
+        '(Bruce,Chris,(David,Tom)1);'
+
+        :param threshold: the support a split needs to be included
+            (default: 0.5, or 0 for a greedy consensus)
+        :type threshold: float
+
+        :param greedy: build a greedy consensus
+        :type greedy: Boolean
+
+        :param error: see `count_splits`
+        :type error: float
+
+        :return: A `nexus.trees.Tree`
+        :raises NexusFormatException: If a tree is malformed.
+        :raises ValueError: If there are no trees.
+        """
+        tree = self.count_splits(error).consensus(threshold, greedy)
+        tree.name = 'consensus'
+        return tree
+
+    def _taxa_index(self, taxa=None):
+        """
+        Returns the taxa (by default those of the translate block, or the
+        sorted tip labels of the first tree) and a mapping of the tip
+        labels in the trees as stored to their taxon number.
+        """
+        if taxa is None:
+            if self.was_translated:
+                taxa = self._translated_taxa()
+            elif self._trees:
+                taxa = sorted(parse_tree(self._trees[0]).tip_labels)
+            else:
+                taxa = []
+        return taxa, taxa_index(taxa, self._stored_translators())
+
+    def _translated_taxa(self):
+        """Returns the taxa in the order of the translate block"""
+        return [
+            self.translators[taxon_id]
+            for taxon_id in sorted(self.translators, key=int)
+        ]
+
+    def _stored_translators(self):
+        """
+        Returns the translate block if the trees (as stored) still use its
+        taxa ids, or else None.
+        """
+        if not self.was_translated:
+            return None
+        if self._pending or not self._been_detranslated:
+            return self.translators
+        return None
+
+    def _sample(self, sample):
+        """
+        Returns the trees (as stored) picked by `sample`: all of them if it
+        is None, that many evenly spaced trees if it is an int, or else the
+        trees at the indices in `sample`.
+        """
+        if sample is None:
+            return self._trees
+        elif isinstance(sample, int):
+            if sample < 1:
+                raise ValueError("Sample size should be at least 1")
+            ntrees = len(self._trees)
+            sample = min(sample, ntrees)
+            return [self._trees[i * ntrees // sample] for i in range(sample)]
+        return [self._trees[i] for i in sample]
+
+    def rf_matrix(self, sample=None, processes=None, other=None,
+                  chunksize=None):
+        """
+        Returns the Robinson-Foulds distances between the trees.
+
+        The splits of each tree are found once, using a pool of processes
+        as in `map`, and the distances between all the trees are then
+        calculated at once with numpy (see `nexus.trees.distance`).
+
+        To compare two runs, pass the other run as `other`, either as a
+        `TreeHandler` (which is sampled in the same way) or as any iterable
+        of tree strings, such as
+        `NexusReader().iter_trees('run2.trees', detranslate=True)`.
+        The other trees are streamed: only a chunk of them is held in
+        memory at a time. Their tip labels should be taxa names, or ids
+        from this handler's translate block, so detranslate trees from a
+        file with its own translate block (otherwise its ids are silently
+        read as this handler's ids).
+
+        >>> handler.rf_matrix(sample=1000, processes=4)  # doctest: +SKIP
+        array([[ 0, 12,  8, ...
+
+        :param sample: the trees to compare: None for all of them, an int
+            for that many evenly spaced trees, or a list of tree indices
+        :type sample: None, int, or list
+
+        :param processes: number of processes to find the splits with
+            (default: the number of CPUs)
+        :type processes: int
+
+        :param other: trees to compare these trees to
+        :type other: TreeHandler or iterable
+
+        :param chunksize: number of trees to send to a process at a time
+        :type chunksize: int
+
+        :return: An integer numpy array with a row for each tree and a
+            column for each tree (or each tree in `other`)
+        :raises ImportError: If numpy is not installed.
+        :raises NexusFormatException: If a tree is malformed or has a taxon
+            that isn't in the translate block.
+        """
+        taxa, index = self._taxa_index()
+        splits = list(_imap(
+            TreeSplits(index), self._sample(sample),
+            processes=processes, chunksize=chunksize
+        ))
+        if other is None:
+            return rf_matrix(splits)
+
+        reference = SplitIndex(splits)
+        if isinstance(other, TreeHandler):
+            func = TreeSplits(other._taxa_index(taxa)[1])
+            other = other._sample(sample)
+        else:
+            func = TreeSplits(index)
+        stream = _imap(func, other, processes=processes, chunksize=chunksize)
+        blocks = []
+        while not blocks or len(chunk) == self.RF_CHUNK_SIZE:
+            chunk = list(islice(stream, self.RF_CHUNK_SIZE))
+            blocks.append(reference.distances(chunk).T)
+        return numpy.hstack(blocks)
+
+    def topology_hashes(self, rooted=False, processes=None, chunksize=None):
+        """
+        Returns a hash of the topology of each tree, which is the same for
+        trees with the same topology however their nodes are ordered and
+        whatever their branch lengths (see
+        `nexus.trees.splits.topology_hash`).
+
+        The hashes are found using a pool of processes as in `map`, and
+        are cached, so each tree is only ever hashed once.
+
+        :param rooted: compare the trees as rooted trees, so that trees
+            that only differ in where they are rooted have different
+            topologies
+        :type rooted: Boolean
+
+        :param processes: number of processes to use (default: the number
+            of CPUs)
+        :type processes: int
+
+        :param chunksize: number of trees to send to a process at a time
+        :type chunksize: int
 
-        # get taxa if not translated.
-        if not self.translators:
-            taxa = re.findall(r"""[(),](\w+)[:),]""", self.trees[0])
-            for taxon_id, t in enumerate(taxa, 1):
-                self.translators[taxon_id] = t
+        :return: A list of hashes
+        :raises NexusFormatException: If a tree is malformed or has a taxon
+            that isn't in the translate block.
+        """
+        cache = self._topologies.setdefault(rooted, {})
+        missing = [tree for tree in set(self._trees) if tree not in cache]
+        if missing:
+            func = TopologyHash(self._taxa_index()[1], rooted)
+            cache.update(zip(missing, _imap(
+                func, missing, processes=processes, chunksize=chunksize
+            )))
+        return [cache[tree] for tree in self._trees]
+
+    def unique_topologies(self, credible=0.95, rooted=False, processes=None):
+        """
+        Groups the trees by their topology.
+
+        The topologies are returned from most to least common (and, among
+        equally common ones, in the order they first appear). The
+        `credible` set is the smallest set of the most common topologies
+        that together hold at least `credible` of the trees.
+
+        >>> for topology in handler.unique_topologies():  # doctest: +SKIP
+        ...     print(topology.ntrees, topology.frequency, topology.credible)
+        6 0.6 True
+        3 0.3 True
+        1 0.1 False
+
+        :param credible: the size of the credible set
+        :type credible: float
+
+        :param rooted: see `topology_hashes`
+        :type rooted: Boolean
+
+        :param processes: see `topology_hashes`
+        :type processes: int
+
+        :return: A list of `Topology` tuples of (hash, trees, ntrees,
+            frequency, credible)
+        :raises NexusFormatException: If a tree is malformed.
+        """
+        groups = {}
+        order = []
+        for tree, topology in enumerate(self.topology_hashes(rooted, processes)):
+            if topology not in groups:
+                groups[topology] = []
+                order.append(topology)
+            groups[topology].append(tree)
+        order.sort(key=lambda topology: -len(groups[topology]))  # (stable)
+
+        topologies = []
+        covered = 0  # trees in the more common topologies
+        for topology in order:
+            trees = groups[topology]
+            topologies.append(Topology(
+                topology, trees, len(trees),
+                float(len(trees)) / len(self._trees),
+                covered < credible * len(self._trees)
+            ))
+            covered += len(trees)
+        return topologies
+
+    def select_unique(self, credible=None, rooted=False, processes=None):
+        """
+        Keeps only one tree (the first) of each topology, from the most
+        to the least common topology, e.g. to write out the distinct
+        topologies of a posterior.
+
+        :param credible: if given, only keep the topologies in this
+            credible set (see `unique_topologies`)
+        :type credible: float
+
+        :param rooted: see `topology_hashes`
+        :type rooted: Boolean
+
+        :param processes: see `topology_hashes`
+        :type processes: int
+
+        :return: The `Topology` tuples of the topologies kept
+        :raises NexusFormatException: If a tree is malformed.
+        """
+        topologies = self.unique_topologies(
+            1.0 if credible is None else credible, rooted, processes
+        )
+        if credible is not None:
+            topologies = [t for t in topologies if t.credible]
+        self.select([topology.trees[0] for topology in topologies])
+        return topologies
+
+    def detranslate(self, processes=None, chunksize=None):
+        """
+        Detranslates all trees in the file.
 
-    def detranslate(self):
-        """Detranslates all trees in the file"""
+        By default the trees are not rewritten straight away: from now on
+        `trees` detranslates each tree when it is accessed, iterated over
+        or written, so trees that are never used are never detranslated.
+
+        If `processes` is given, all the trees are detranslated at once
+        with `map` instead.
+
+        :param processes: number of processes to detranslate with
+        :type processes: int
+
+        :param chunksize: number of trees to send to a process at a time
+        :type chunksize: int
+
+        :return: None
+        """
         if self._been_detranslated:
             return
-        for idx, tree in enumerate(self.trees):
-            self.trees[idx] = self._detranslate_tree(tree, self.translators)
+        if processes is None:
+            self._pending = True
+            self._cache.reset()
+        else:
+            self.trees = self.map(detranslate_tree, processes, chunksize)
         self._been_detranslated = True
 
+    def map(self, func, processes=None, chunksize=None):
+        """
+        Calls `func(tree, translators)` for each tree using a pool of
+        processes, and returns the results in the order of the trees.
+
+        The translate table is sent to each process once, and the trees
+        are sent in chunks of `chunksize`. `func` has to be picklable, i.e.
+        defined at the top level of a module (e.g. `detranslate_tree` or
+        `remove_comments` from this module). After `detranslate()` the
+        trees are detranslated in the worker processes before `func` is
+        called.
+
+        >>> handler.map(remove_comments, processes=4)  # doctest: +SKIP
+        ['tree one = (A,B);', 'tree two = (A,B);']
+
+        :param func: function taking a tree string and the translate table
+        :type func: callable
+
+        :param processes: number of processes to use (default: the number
+            of CPUs). If 1, the trees are processed in this process.
+        :type processes: int
+
+        :param chunksize: number of trees to send to a process at a time
+            (default: chosen by `multiprocessing.Pool.map`)
+        :type chunksize: int
+
+        :return: A list of results
+        """
+        args = (func, self.translators, self._pending)
+        if processes == 1 or len(self._trees) <= 1:
+            _init_worker(*args)
+            try:
+                return [_apply(tree) for tree in self._trees]
+            finally:
+                _worker.clear()
+
+        pool = multiprocessing.Pool(processes, _init_worker, args)
+        try:
+            return pool.map(_apply, self._trees, chunksize)
+        finally:
+            pool.close()
+            pool.join()
+
     def _findall_chunks(self, tree):
-        """Helper function to find groups used by detranslate."""
+        """
+        Helper function to find the groups matched by `translate_regex`.
+        (Not used by `detranslate` any more)
+        """
         matches = []
         index = 0
         while True:
@@ -125,25 +776,7 @@ class TreeHandler(GenericHandler):
 
         :return: String of detranslated tree
         """
-        for found in self._findall_chunks(tree):
-            if found['taxon'] in translatetable:
-                taxon = translatetable[found['taxon']]
-                if found['comment'] and found['branch']:
-                    # comment and branch
-                    sub = "%s:%s%s" % \
-                        (taxon, found['comment'], found['branch'])
-                elif found['comment']:
-                    # comment only
-                    sub = "%s%s" % (taxon, found['comment'])
-                elif found['branch']:
-                    # branch only
-                    sub = "%s:%s" % (taxon, found['branch'])
-                else:
-                    # taxon only
-                    sub = taxon
-                sub = "%s%s%s" % (found['start'], sub, found['end'])
-                tree = tree.replace(found['match'], sub)
-        return tree
+        return detranslate_tree(tree, translatetable)
 
     def write(self):
         """
@@ -151,21 +784,27 @@ class TreeHandler(GenericHandler):
 
         :return: String
         """
-        out = ['begin trees;']
+        return "\n".join(self._iter_write())
+
+    def _iter_write(self):
+        """Yields the lines of the trees block that `write` joins"""
+        yield 'begin trees;'
         for attr in self.attributes:
-            out.append("\t" + attr)
+            yield "\t" + attr
         if self.was_translated and not self._been_detranslated:
-            out.append('\ttranslate')
-            for index in sorted([int(k) for k in self.translators.keys()]):
-                out.append("\t%d %s," % (index, self.translators[str(index)]))
+            yield '\ttranslate'
+            indices = sorted([int(k) for k in self.translators.keys()])
+            for index in indices[:-1]:
+                yield "\t%d %s," % (index, self.translators[str(index)])
             # handle last taxa label in translate block
-            out[-1] = out[-1].replace(',', '')
+            for index in indices[-1:]:
+                taxon = self.translators[str(index)].replace(',', '')
+                yield "\t%d %s" % (index, taxon)
             # work around bug https://github.com/CompEvol/beast2/issues/713
-            out.append(';')
+            yield ';'
         for tree in self.trees:
-            out.append("\t" + tree)
-        out.append('end;\n')
-        return "\n".join(out)
+            yield "\t" + tree
+        yield 'end;\n'
 
     def __repr__(self):
         return "<NexusTreeBlock: %d trees>" % self.ntrees
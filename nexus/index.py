@@ -0,0 +1,199 @@
+"""
+Tools for indexing the contents of a nexus file
+"""
+import os
+import json
+import mmap
+
+from nexus.handlers import COMMENT_PATTERN, QUOTED_PATTERN, WHITESPACE_PATTERN
+from nexus.handlers.tree import TreeHandler
+from nexus.tokenizer import NexusTokenizer, BEGIN, END
+
+INDEX_SUFFIX = '.nxi'
+MATRIX_BLOCKS = ('data', 'characters')
+
+
+def map_file(filename):
+    """
+    Memory-maps `filename` read-only.
+
+    :param filename: filename of a nexus file
+    :type filename: string
+
+    :return: A mmap (or an empty bytestring for empty files)
+    :raises IOError: If file reading fails.
+    """
+    if not os.path.isfile(filename):
+        raise IOError("Unable To Read File %s" % filename)
+    with open(filename, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_lines(buffer, offsets):
+    """
+    Yields each line in `buffer`, storing the (start, end) byte offsets of
+    the line last yielded in the list `offsets`.
+    """
+    start, size = 0, len(buffer)
+    while start < size:
+        end = buffer.find(b'\n', start)
+        end = size if end == -1 else end + 1
+        offsets[:] = [start, end]
+        yield buffer[start:end]
+        start = end
+
+
+def parse_row(line):
+    """
+    Splits a matrix row into (taxon, sites) the same way as
+    `DataHandler.parse`, or returns None if the line isn't a row.
+    """
+    line = COMMENT_PATTERN.sub('', line).strip()
+    try:
+        taxon, sites = WHITESPACE_PATTERN.split(line, 1)
+    except ValueError:
+        return None
+    return QUOTED_PATTERN.sub('\\1', taxon.strip()), sites.strip()
+
+
+class NexusIndex(object):
+    """
+    An index of the byte offsets of each block, each matrix row (by taxon)
+    and each tree in a nexus file.
+
+    Offsets are stored as [start, end] pairs spanning whole lines, so the
+    original text can be read straight from the file (or a mmap of it).
+    Interleaved matrices have one span per row for each taxon.
+    """
+    VERSION = 1
+
+    def __init__(self, size=None, mtime=None):
+        self.size = size
+        self.mtime = mtime
+        self.blocks = {}  # block -> [start, end]
+        self.rows = {}  # block -> taxon -> [[start, end], ...]
+        self.trees = []  # [[start, end], ...]
+
+    @classmethod
+    def build(cls, buffer, size=None, mtime=None):
+        """
+        Builds an index by scanning `buffer` once.
+
+        :param buffer: the contents of a nexus file
+        :type buffer: bytes or mmap
+
+        :return: A NexusIndex
+        """
+        index = cls(size, mtime)
+        offsets = [0, 0]
+        in_matrix = False
+        tokens = NexusTokenizer().tokenize(iter_lines(buffer, offsets))
+        for event, block, line in tokens:
+            start, end = offsets
+            if event == BEGIN:
+                index.blocks[block] = [start, end]
+                in_matrix = False
+                continue
+
+            index.blocks[block][1] = end
+            if event == END or line is None:
+                continue
+            elif block in MATRIX_BLOCKS:
+                if not in_matrix:
+                    in_matrix = line.lower().startswith('matrix')
+                elif line.startswith(';'):
+                    in_matrix = False
+                else:
+                    row = parse_row(line)
+                    if row:
+                        index.rows.setdefault(block, {}).setdefault(
+                            row[0], []
+                        ).append([start, end])
+            elif block == 'trees' and TreeHandler.is_tree.search(line):
+                index.trees.append([start, end])
+        return index
+
+    @classmethod
+    def for_file(cls, filename, buffer=None, save=True):
+        """
+        Returns the index for `filename`, loading it from the sidecar file
+        (`filename` + '.nxi') if that is up to date, or building it and
+        saving it to the sidecar file otherwise.
+
+        :param filename: filename of a nexus file
+        :type filename: string
+
+        :param buffer: the contents of `filename` if already read or mapped
+        :type buffer: bytes or mmap
+
+        :param save: save a newly built index to the sidecar file
+        :type save: Boolean
+
+        :return: A NexusIndex
+        """
+        stat = os.stat(filename)
+        index = cls.load(filename + INDEX_SUFFIX)
+        if index and index.size == stat.st_size and index.mtime == stat.st_mtime:
+            return index
+
+        if buffer is None:
+            buffer = map_file(filename)
+        index = cls.build(buffer, stat.st_size, stat.st_mtime)
+        if save:
+            try:
+                index.save(filename + INDEX_SUFFIX)
+            except (IOError, OSError):  # pragma: no cover
+                pass  # e.g. read-only directory, the index is still usable.
+        return index
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Loads an index from `filename`.
+
+        :return: A NexusIndex, or None if `filename` isn't a valid index.
+        """
+        try:
+            with open(filename, 'r') as handle:
+                data = json.load(handle)
+        except (IOError, OSError, ValueError):
+            return None
+        if data.get('version') != cls.VERSION:
+            return None
+        index = cls(data['size'], data['mtime'])
+        index.blocks = data['blocks']
+        index.rows = data['rows']
+        index.trees = data['trees']
+        return index
+
+    def save(self, filename):
+        """
+        Saves the index to `filename`.
+
+        :raises IOError: If file writing fails.
+        """
+        tmpname = "%s.%d.tmp" % (filename, os.getpid())
+        with open(tmpname, 'w') as handle:
+            json.dump({
+                'version': self.VERSION,
+                'size': self.size,
+                'mtime': self.mtime,
+                'blocks': self.blocks,
+                'rows': self.rows,
+                'trees': self.trees,
+            }, handle, separators=(',', ':'))
+        # atomic, so other readers never see a half-written index
+        getattr(os, 'replace', os.rename)(tmpname, filename)
+
+    @property
+    def ntrees(self):
+        return len(self.trees)
+
+    def __repr__(self):
+        return "<NexusIndex: %d blocks, %d rows, %d trees>" % (
+            len(self.blocks),
+            sum(len(rows) for rows in self.rows.values()),
+            self.ntrees
+        )
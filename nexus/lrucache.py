@@ -0,0 +1,100 @@
+"""
+A small bounded cache
+"""
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A cache that holds at most `maxsize` items, removing the least recently
+    used item when it is full.
+
+    The cache counts its `hits`, `misses` and `evictions`. If
+    `min_hit_rate` is given, the cache checks its hit rate once it has
+    had `warmup` lookups, and if too few lookups were hits it empties
+    itself and is `bypassed`: every lookup then misses without being
+    counted and nothing more is stored, so a cache that doesn't help
+    doesn't cost memory either.
+
+    >>> cache = LRUCache(2)
+    >>> cache['a'] = 1
+    >>> cache['b'] = 2
+    >>> cache.get('a')
+    1
+    >>> cache['c'] = 3  # evicts 'b', the least recently used
+    >>> cache.get('b') is None
+    True
+    >>> cache.hits, cache.misses, cache.evictions
+    (1, 1, 1)
+
+    :param maxsize: maximum number of items to keep (0 to never cache)
+    :type maxsize: int
+
+    :param min_hit_rate: stop caching if the hit rate is lower than this
+        after `warmup` lookups
+    :type min_hit_rate: float
+
+    :param warmup: number of lookups before the hit rate is checked
+    :type warmup: int
+    """
+    def __init__(self, maxsize=1024, min_hit_rate=None, warmup=1000):
+        self.maxsize = maxsize
+        self.min_hit_rate = min_hit_rate
+        self.warmup = warmup
+        self._data = OrderedDict()
+        self.reset()
+
+    def reset(self):
+        """Empties the cache, and resets the counters and the bypass"""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypassed = self.maxsize <= 0
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that were hits"""
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def get(self, key, default=None):
+        """
+        Returns the value for `key`, or `default` if it isn't cached.
+        """
+        if self.bypassed:
+            return default
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            if self.min_hit_rate is not None and \
+                    self.hits + self.misses >= self.warmup and \
+                    self.hit_rate < self.min_hit_rate:
+                self._data.clear()
+                self.bypassed = True
+            return default
+        self._data[key] = value  # move to the most recently used end.
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        if self.bypassed:
+            return
+        self._data.pop(key, None)
+        self._data[key] = value
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return "<LRUCache: %d/%d items, %d hits, %d misses, %d evictions%s>" % (
+            len(self), self.maxsize, self.hits, self.misses, self.evictions,
+            ", bypassed" if self.bypassed else ""
+        )
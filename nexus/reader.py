@@ -2,7 +2,6 @@
 Tools for reading a nexus file
 """
 import os
-import gzip
 
 try:  # pragma: no cover
     from StringIO import StringIO
@@ -10,17 +9,87 @@ except ImportError:
     from io import StringIO
 
 from nexus.handlers import GenericHandler
-from nexus.handlers import BEGIN_PATTERN, END_PATTERN
 from nexus.handlers.taxa import TaxaHandler
 from nexus.handlers.data import CharacterHandler, DataHandler
 from nexus.handlers.tree import TreeHandler
-from nexus.exceptions import NexusFormatException
+from nexus.tokenizer import NexusTokenizer
+from nexus.index import NexusIndex, map_file, parse_row
+from nexus.cache import NexusCache
+from nexus.compression import open_file, sniff
+
+
+class _Unparsed(object):
+    """Placeholder for a block that has not been parsed yet"""
+    def __repr__(self):
+        return "<unparsed>"
+
+    def __reduce__(self):
+        # keep the placeholder a singleton when pickled
+        return 'UNPARSED'
+
+UNPARSED = _Unparsed()
+
+
+class LazyBlocks(dict):
+    """
+    A dictionary of blocks that defers loading each block (e.g. parsing it
+    with a handler) until it is first accessed.
+
+    :param reader: the object that loads the blocks
+    :type reader: NexusReader
+
+    :param loader: name of the method of `reader` returning the value for
+        a block name (a name rather than a bound method, so that the
+        blocks can be pickled on python 2)
+    :type loader: string
+    """
+    def __init__(self, reader, loader, *args, **kwargs):
+        self._reader = reader
+        self._loader = loader
+        super(LazyBlocks, self).__init__(*args, **kwargs)
+
+    def __getitem__(self, block):
+        handler = super(LazyBlocks, self).__getitem__(block)
+        if handler is UNPARSED:
+            handler = getattr(self._reader, self._loader)(block)
+            self[block] = handler
+        return handler
+
+    def get(self, block, default=None):
+        return self[block] if block in self else default
+
+    def values(self):
+        return [self[block] for block in self]
+
+    def items(self):
+        return [(block, self[block]) for block in self]
+
+    def is_parsed(self, block):
+        """Returns True if `block` has been parsed"""
+        return super(LazyBlocks, self).__getitem__(block) is not UNPARSED
+
+    def __reduce__(self):
+        # pickle the unparsed placeholders rather than loading every block
+        return (
+            self.__class__, (self._reader, self._loader), None, None,
+            iter(list(super(LazyBlocks, self).items()))
+        )
 
 
 class NexusReader(object):
     """A nexus reader"""
-    def __init__(self, filename=None, debug=False):
+    def __init__(self, filename=None, debug=False, lazy=False, blocks=None,
+                 mmap=False, cache=None, compact=False):
         self.debug = debug
+        self.lazy = lazy
+        self.mmap = mmap
+        self.compact = compact
+        if cache is not None and not isinstance(cache, NexusCache):
+            cache = NexusCache(cache)
+        self.cache = cache
+        self.index = None
+        self._buffer = None
+        self.wanted_blocks = blocks
         self.blocks = {}
         self.raw_blocks = {}
         self.handlers = {
@@ -32,11 +101,42 @@ class NexusReader(object):
         if filename:
             self.read_file(filename)
 
+    def __getattr__(self, name):
+        # only called when `name` isn't set yet, i.e. for unparsed lazy blocks
+        blocks = self.__dict__.get('blocks')
+        if isinstance(blocks, LazyBlocks) and name in blocks:
+            setattr(self, name, blocks[name])
+            return self.__dict__[name]
+        raise AttributeError(
+            "%r object has no attribute %r" % (self.__class__.__name__, name)
+        )
+
+    def _parse_block(self, block):
+        """Parses the raw nexus block `block` with the appropriate handler"""
+        if block == 'data' and 'data' not in self.raw_blocks:
+            return self.blocks['characters']
+        handler = self.handlers.get(block, GenericHandler)()
+        if self.compact and isinstance(handler, DataHandler):
+            handler.compact = True
+        handler.parse(self.raw_blocks[block])
+        return handler
+
     def _do_blocks(self):
         """Iterates over all nexus blocks and parses them appropriately"""
-        for block, data in self.raw_blocks.items():
-            self.blocks[block] = self.handlers.get(block, GenericHandler)()
-            self.blocks[block].parse(data)
+        if self.lazy or self.mmap:
+            # only record the blocks found, parsing happens on first access.
+            if not isinstance(self.blocks, LazyBlocks):
+                self.blocks = LazyBlocks(self, '_parse_block', self.blocks)
+            for block in self.raw_blocks:
+                self.blocks[block] = UNPARSED
+                self.__dict__.pop(block, None)
+            if 'characters' in self.raw_blocks and 'data' not in self.raw_blocks:
+                self.blocks['data'] = UNPARSED
+                self.__dict__.pop('data', None)
+            return
+
+        for block in self.raw_blocks:
+            self.blocks[block] = self._parse_block(block)
         
         if self.blocks.get('characters') and not self.blocks.get('data'):
             self.blocks['data'] = self.blocks['characters']
@@ -44,75 +144,268 @@ class NexusReader(object):
         for block in self.blocks:
             setattr(self, block, self.blocks[block])
         
-    def read_file(self, filename):
+    def read_file(self, filename, blocks=None):
         """
         Loads and Parses a Nexus File
 
         :param filename: filename of a nexus file
         :type filename: string
 
+        :param blocks: only read these blocks, skipping all others
+            (default: the `blocks` given to the constructor, or all blocks)
+        :type blocks: list
+
         :raises IOError: If file reading fails.
 
         :return: None
         """
         self.filename = filename
         self.short_filename = os.path.split(filename)[1]
+        if self.mmap:
+            return self._read_mapped(filename, blocks)
+        if self.cache is not None and self._read_cached(filename, blocks):
+            return
+        handle = self._open(filename)
+        self._read(handle, blocks)
+        handle.close()
+        # only cache complete files, and don't force parsing lazy blocks.
+        if self.cache is not None and not self.lazy and \
+                self._get_block_filter(blocks) is None:
+            self.cache.put(filename, NexusCache.dump_blocks(self.blocks))
+
+    def _read_cached(self, filename, blocks=None):
+        """
+        Loads the parsed blocks for `filename` from the cache.
 
+        :return: True if the file was found in the cache.
+        """
         if not os.path.isfile(filename):
             raise IOError("Unable To Read File %s" % filename)
+        states = self.cache.get(filename)
+        if states is None:
+            return False
+        wanted = self._get_block_filter(blocks)
+        self.raw_blocks = {}
+        for block, handler in NexusCache.load_blocks(states, self.handlers).items():
+            if wanted is None or block in wanted:
+                if isinstance(handler, DataHandler):
+                    handler.compact = self.compact
+                self.blocks[block] = handler
+                setattr(self, block, handler)
+        return True
 
-        if filename.endswith('.gz'):
-            handle = gzip.open(filename, 'rb')  # pragma: no cover
-        else:
-            handle = open(filename, 'r')
-        self._read(handle)
-        handle.close()
+    def _read_mapped(self, filename, blocks=None):
+        """
+        Memory-maps a Nexus File and indexes it, using the sidecar index
+        file if there is an up to date one. Blocks are only read from the
+        map and parsed when they are first accessed.
+        """
+        self.close()
+        self._buffer = map_file(filename)
+        if sniff(self._buffer[:16]):
+            self.close()
+            raise ValueError("Unable to memory-map compressed file %s" % filename)
+        self.index = NexusIndex.for_file(filename, self._buffer)
+        wanted = self._get_block_filter(blocks)
+        self.raw_blocks = LazyBlocks(self, '_read_mapped_block')
+        for block in self.index.blocks:
+            if wanted is None or block in wanted:
+                self.raw_blocks[block] = UNPARSED
+        self._do_blocks()
+
+    def _read_mapped_block(self, block):
+        """Reads the lines of `block` from the memory-mapped file"""
+        start, end = self.index.blocks[block]
+        lines = self._buffer[start:end].splitlines()
+        return [
+            line for event, name, line in NexusTokenizer().tokenize(lines)
+            if name == block and line is not None
+        ]
+
+    def _check_mapped(self):
+        if self.index is None:
+            raise ValueError("Nexus was not read with mmap=True")
+
+    def read_row(self, taxon, block='data'):
+        """
+        Reads the site values of `taxon` straight from a memory-mapped file
+        using the index, without parsing the rest of the matrix.
+
+        :param taxon: taxon name
+        :type taxon: string
+
+        :param block: the block the matrix is in (`data` or `characters`)
+        :type block: string
+
+        :return: A list of site values
+        :raises ValueError: If the nexus was not read with mmap=True
+        :raises KeyError: If `taxon` is not in the matrix
+        """
+        self._check_mapped()
+        rows = self.index.rows.get(block)
+        if rows is None and block == 'data':
+            rows = self.index.rows.get('characters')
+        sites = []
+        for start, end in (rows or {})[taxon]:
+            line = self._buffer[start:end].decode('utf-8')
+            sites.extend(DataHandler()._parse_sites(parse_row(line)[1]))
+        return sites
+
+    def read_tree(self, index):
+        """
+        Reads tree number `index` (zero-indexed, as in `trees.trees`)
+        straight from a memory-mapped file using the index, without parsing
+        the rest of the trees block.
+
+        :param index: tree number
+        :type index: int
+
+        :return: A tree string
+        :raises ValueError: If the nexus was not read with mmap=True
+        :raises IndexError: If there is no such tree
+        """
+        self._check_mapped()
+        start, end = self.index.trees[index]
+        return self._buffer[start:end].decode('utf-8').strip()
+
+    def close(self):
+        """Closes the memory-mapped file, if any"""
+        if hasattr(self._buffer, 'close'):
+            self._buffer.close()
+        self._buffer = None
 
-    def read_string(self, contents):
+    def _open(self, filename):
+        """
+        Opens `filename` for reading, decompressing gzip, bz2, xz or zstd
+        files as they are read.
+        """
+        return open_file(filename, 'r')
+
+    def iter_trees(self, filename, detranslate=False):
+        """
+        Iterates over the trees in a Nexus File one tree at a time.
+
+        Unlike `read_file`, the trees are never stored, so memory use stays
+        flat no matter how many trees the file holds. Any blocks before the
+        `trees` block (e.g. `taxa`) are parsed as usual and the translate
+        table is available on `self.trees` as soon as the first tree is
+        yielded. Blocks after the `trees` block are ignored.
+
+        :param filename: filename of a nexus file
+        :type filename: string
+
+        :param detranslate: expand translated taxa labels in each tree
+        :type detranslate: Boolean
+
+        :raises IOError: If file reading fails.
+
+        :return: A generator of tree strings
+        """
+        self.filename = filename
+        self.short_filename = os.path.split(filename)[1]
+        handle = self._open(filename)
+        try:
+            preamble = {}
+            blocks = self._get_block_filter()
+            if blocks is not None:
+                blocks.add('trees')
+            scanner = self._scan(handle, blocks)
+            for block, line in scanner:
+                if block != 'trees':
+                    preamble.setdefault(block, []).append(line)
+                    continue
+
+                self.raw_blocks = preamble
+                self._do_blocks()
+                self.blocks['trees'] = self.trees = TreeHandler()
+
+                def _tree_lines(first):
+                    yield first
+                    for block, line in scanner:
+                        if block != 'trees':
+                            return
+                        yield line
+
+                for tree in self.trees.iterparse(_tree_lines(line), detranslate):
+                    yield tree
+                return
+            # no trees block, but make sure the other blocks are available.
+            self.raw_blocks = preamble
+            self._do_blocks()
+        finally:
+            handle.close()
+
+    def read_string(self, contents, blocks=None):
         """
         Loads and Parses a Nexus from a string
 
         :param contents: string or string-like object containing a nexus
         :type contents: string
 
+        :param blocks: only read these blocks, skipping all others
+            (default: the `blocks` given to the constructor, or all blocks)
+        :type blocks: list
+
         :return: None
         """
         self.filename = "<String>"
-        self._read(StringIO(contents))
+        self._read(StringIO(contents), blocks)
         return self
-        
-    def _read(self, handle):
+
+    def _get_block_filter(self, blocks=None):
+        """
+        Returns the set of block names to read, or None to read all blocks.
+        """
+        blocks = blocks if blocks is not None else self.wanted_blocks
+        if blocks is None:
+            return None
+        blocks = set(b.lower() for b in blocks)
+        # `characters` blocks are made available as `data` and vice versa.
+        if 'data' in blocks or 'characters' in blocks:
+            blocks.update(['data', 'characters'])
+        return blocks
+
+    def _scan(self, handle, blocks=None):
+        """
+        Lazily reads lines from a iterable object and yields a tuple of
+        (block name, line) for every line found inside a nexus block.
+
+        If `blocks` is given, lines in any other blocks are skipped.
+        """
+        for event, block, line in NexusTokenizer(blocks).tokenize(handle):
+            if line is not None:
+                yield block, line
+
+    def _read(self, handle, blocks=None):
         """Reads from a iterable object"""
         store = {}
-        block = None
-        for line in handle.readlines():
-            if hasattr(line, 'decode'):
-                line = line.decode('utf-8')
-            line = line.strip()
-            if not line:
-                continue
-            elif line.startswith('[') and line.endswith(']'):
-                continue
-
-            # check if we're in a block and initialise
-            found = BEGIN_PATTERN.findall(line)
-            if found:
-                block = found[0][0].lower()
-                if block in store:
-                    raise NexusFormatException("Duplicate Block %s" % block)
-                store[block] = []
-
-            # check if we're ending a block
-            if END_PATTERN.search(line):
-                if block:
-                    store[block].append(line)
-                block = None
-
-            if block:
-                store[block].append(line)
+        for block, line in self._scan(handle, self._get_block_filter(blocks)):
+            store.setdefault(block, []).append(line)
         self.raw_blocks = store
         self._do_blocks()
 
+    def view(self, taxa=None, sites=None):
+        """
+        Returns a new `NexusReader` whose `data` block is a view of some of
+        the taxa and/or sites of this nexus' data block (see
+        `DataHandler.view`), so that it can be written or passed to the
+        `nexus.tools` without copying the matrix.
+
+        :param taxa: the taxa to include, in order (default: all taxa)
+        :type taxa: list
+
+        :param sites: the site positions to include, in order (default:
+            all sites)
+        :type sites: list
+
+        :return: A `NexusReader` with only a `data` block
+        :raises AttributeError: If the nexus has no `data` block.
+        """
+        reader = self.__class__()
+        reader.filename = getattr(self, 'filename', None)
+        reader.blocks['data'] = reader.data = self.data.view(taxa, sites)
+        return reader
+
     def write(self):
         """
         Generates a string containing a complete nexus from
@@ -120,22 +413,46 @@ class NexusReader(object):
 
         :return: String
         """
-        out = ["#NEXUS\n"]
+        return "\n".join(self._iter_write())
+
+    def _iter_write(self):
+        """Yields the parts of the nexus that `write` joins with newlines"""
+        yield "#NEXUS\n"
         for block in self.blocks:
-            out.append(self.blocks[block].write())
+            handler = self.blocks[block]
+            if hasattr(handler, '_iter_write'):  # i.e. write a line at a time
+                for part in handler._iter_write():
+                    yield part
+            else:
+                yield handler.write()
             # empty line after block if needed
             if len(self.blocks) > 1:
-                out.append("\n")
-        return "\n".join(out)
+                yield "\n"
 
-    def write_to_file(self, filename):
+    def write_to_file(self, filename, compression=None):
         """
         Writes the nexus to a file.
 
+        Each block is written (and compressed) as it is generated, so the
+        whole nexus is never held in memory at once.
+
+        :param filename: Filename to store nexus as
+        :type filename: String
+
+        :param compression: compress the file with `gzip`, `bz2`, `xz` or
+            `zstd` (default: guessed from the extension of `filename`,
+            e.g. `.gz`), or False to never compress.
+        :type compression: String
+
         :return: None
 
         :raises IOError: If file writing fails.
         """
-        handle = open(filename, 'w')
-        handle.writelines(self.write())
-        handle.close()
+        handle = open_file(filename, 'w', compression)
+        try:
+            for index, part in enumerate(self._iter_write()):
+                if index:
+                    handle.write("\n")
+                handle.write(part)
+        finally:
+            handle.close()
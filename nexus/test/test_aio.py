@@ -0,0 +1,93 @@
+"""Tests for the asyncio reading API"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from nexus.reader import NexusReader
+
+try:
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+    from nexus import aio
+except (ImportError, SyntaxError):  # pragma: no cover
+    aio = None
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
+FILENAMES = [
+    os.path.join(EXAMPLE_DIR, name) for name in
+    ['example.nex', 'example.trees', 'example2.nex', 'maddison_et_al.nex']
+]
+
+
+@unittest.skipIf(aio is None, "asyncio is not available")
+class Test_AsyncRead(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_coroutine(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_read_file(self):
+        nex = self.run_coroutine(aio.read_file(FILENAMES[1]))
+        assert nex.filename == FILENAMES[1]
+        assert nex.short_filename == 'example.trees'
+        assert nex.write() == NexusReader(FILENAMES[1]).write()
+
+    def test_read_file_kwargs(self):
+        nex = self.run_coroutine(aio.read_file(FILENAMES[3], blocks=['taxa']))
+        assert list(nex.blocks) == ['taxa']
+
+    def test_read_file_mmap(self):
+        # copy the file, so the index isn't saved in the examples directory
+        tmpdir = tempfile.mkdtemp()
+        filename = os.path.join(tmpdir, 'example.trees')
+        shutil.copy(FILENAMES[1], filename)
+        try:
+            nex = self.run_coroutine(aio.read_file(filename, mmap=True))
+            assert nex.trees.ntrees == 3
+            nex.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_read_file_compressed(self):
+        tmpdir = tempfile.mkdtemp()
+        filename = os.path.join(tmpdir, 'example.trees.gz')
+        try:
+            NexusReader(FILENAMES[1]).write_to_file(filename)
+            nex = self.run_coroutine(aio.read_file(filename))
+            assert nex.write() == NexusReader(FILENAMES[1]).write()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_read_file_error(self):
+        with self.assertRaises(IOError):
+            self.run_coroutine(aio.read_file('sausage.nex'))
+
+    def test_read_many(self):
+        nexuslist = self.run_coroutine(aio.read_many(FILENAMES, limit=2))
+        assert [n.filename for n in nexuslist] == FILENAMES
+        assert nexuslist[3].taxa.ntaxa == 4
+
+    def test_read_many_process_executor(self):
+        with ProcessPoolExecutor(2) as executor:
+            nexuslist = self.run_coroutine(
+                aio.read_many(FILENAMES, executor=executor)
+            )
+        assert [n.filename for n in nexuslist] == FILENAMES
+
+    def test_read_many_capture_errors(self):
+        nexuslist = self.run_coroutine(
+            aio.read_many(FILENAMES + ['sausage.nex'], capture_errors=True)
+        )
+        assert isinstance(nexuslist[-1], IOError)
+        assert [n.filename for n in nexuslist[:-1]] == FILENAMES
+
+    def test_cancel(self):
+        task = self.loop.create_task(aio.read_many(FILENAMES * 10, limit=1))
+        self.loop.call_soon(task.cancel)
+        with self.assertRaises(asyncio.CancelledError):
+            self.run_coroutine(task)
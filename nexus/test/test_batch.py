@@ -0,0 +1,56 @@
+"""Tests for read_many"""
+import os
+import unittest
+from nexus import read_many
+from nexus.reader import NexusReader
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
+FILENAMES = [
+    os.path.join(EXAMPLE_DIR, name) for name in
+    ['example.nex', 'example.trees', 'example2.nex', 'maddison_et_al.nex']
+]
+
+
+class Test_ReadMany(unittest.TestCase):
+    def test_read_many(self):
+        nexuslist = read_many(FILENAMES, processes=2)
+        assert len(nexuslist) == len(FILENAMES)
+        for filename, nex in zip(FILENAMES, nexuslist):
+            assert isinstance(nex, NexusReader)
+            assert nex.filename == filename
+            expected = NexusReader(filename)
+            # (compare each block, as python 2 may order them differently)
+            assert sorted(nex.blocks) == sorted(expected.blocks)
+            for block in expected.blocks:
+                assert nex.blocks[block].write() == \
+                    expected.blocks[block].write()
+
+    def test_serial(self):
+        nexuslist = read_many(FILENAMES, processes=1)
+        assert [n.filename for n in nexuslist] == FILENAMES
+
+    def test_kwargs(self):
+        nexuslist = read_many(FILENAMES, processes=2, blocks=['trees'])
+        assert [sorted(n.blocks) for n in nexuslist] == [
+            [], ['trees'], [], ['trees']
+        ]
+
+    def test_lazy(self):
+        nex = read_many(FILENAMES, processes=2, lazy=True)[3]
+        assert not nex.blocks.is_parsed('trees')
+        assert nex.trees.ntrees == 1
+
+    def test_error(self):
+        with self.assertRaises(IOError):
+            read_many(FILENAMES + ['sausage.nex'], processes=2)
+
+    def test_capture_errors(self):
+        nexuslist = read_many(
+            ['sausage.nex'] + FILENAMES, processes=2, capture_errors=True
+        )
+        assert isinstance(nexuslist[0], IOError)
+        assert [n.filename for n in nexuslist[1:]] == FILENAMES
+
+    def test_mmap(self):
+        with self.assertRaises(ValueError):
+            read_many(FILENAMES, mmap=True)
@@ -0,0 +1,112 @@
+"""Tests for NexusCache"""
+import os
+import shutil
+import tempfile
+import unittest
+from nexus.reader import NexusReader
+from nexus.cache import NexusCache
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
+
+
+class Test_NexusCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = NexusCache(os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def copy(self, name):
+        filename = os.path.join(self.tmpdir, name)
+        shutil.copy(os.path.join(EXAMPLE_DIR, name), filename)
+        return filename
+
+    def test_miss_then_hit(self):
+        filename = self.copy('example.nex')
+        NexusReader(filename, cache=self.cache)
+        assert (self.cache.hits, self.cache.misses) == (0, 1)
+        NexusReader(filename, cache=self.cache)
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+
+    def test_cached_data(self):
+        filename = self.copy('maddison_et_al.nex')
+        expected = NexusReader(filename)
+        NexusReader(filename, cache=self.cache)
+        nex = NexusReader(filename, cache=self.cache)
+        assert self.cache.hits == 1
+        assert sorted(nex.blocks) == sorted(expected.blocks)
+        assert nex.data is nex.characters
+        assert nex.data.matrix == expected.data.matrix
+        assert nex.data.charlabels == expected.data.charlabels
+        assert nex.taxa.taxa == expected.taxa.taxa
+        assert nex.trees.trees == expected.trees.trees
+        assert nex.trees.translators == expected.trees.translators
+        assert nex.write() == expected.write()
+
+    def test_cache_directory_name(self):
+        filename = self.copy('example.nex')
+        nex = NexusReader(filename, cache=os.path.join(self.tmpdir, 'other'))
+        assert isinstance(nex.cache, NexusCache)
+        assert nex.cache.size > 0
+
+    def test_changed_file(self):
+        filename = self.copy('example.nex')
+        NexusReader(filename, cache=self.cache)
+        with open(filename, 'a') as handle:
+            handle.write("\nbegin sausage;\nend;\n")
+        nex = NexusReader(filename, cache=self.cache)
+        assert self.cache.hits == 0
+        assert 'sausage' in nex.blocks
+
+    def test_copies_share_entry(self):
+        first = self.copy('example.nex')
+        second = os.path.join(self.tmpdir, 'copy.nex')
+        shutil.copy(first, second)
+        NexusReader(first, cache=self.cache)
+        NexusReader(second, cache=self.cache)
+        assert self.cache.hits == 1
+
+    def test_blocks_filter(self):
+        filename = self.copy('maddison_et_al.nex')
+        # filtered reads aren't cached...
+        NexusReader(filename, cache=self.cache, blocks=['taxa'])
+        assert self.cache.size == 0
+        NexusReader(filename, cache=self.cache)
+        # ...but can be loaded from the cache
+        nex = NexusReader(filename, cache=self.cache, blocks=['taxa'])
+        assert self.cache.hits == 1
+        assert list(nex.blocks) == ['taxa']
+
+    def test_eviction(self):
+        first = self.copy('example.nex')
+        second = self.copy('example.trees')
+        NexusReader(first, cache=self.cache)
+        self.cache.max_size = 1
+        # the newest entry is always kept
+        NexusReader(second, cache=self.cache)
+        assert self.cache.evictions == 1
+        NexusReader(second, cache=self.cache)
+        assert self.cache.hits == 1
+        NexusReader(first, cache=self.cache)
+        assert self.cache.misses == 3
+
+    def test_corrupt_entry(self):
+        filename = self.copy('example.nex')
+        NexusReader(filename, cache=self.cache)
+        for name in os.listdir(self.cache.directory):
+            if name.endswith('.nxc'):
+                with open(os.path.join(self.cache.directory, name), 'wb') as h:
+                    h.write(b'rubbish')
+        nex = NexusReader(filename, cache=self.cache)
+        assert self.cache.misses == 2
+        assert 'Simon' in nex.data.matrix
+
+    def test_clear(self):
+        NexusReader(self.copy('example.nex'), cache=self.cache)
+        self.cache.clear()
+        assert os.listdir(self.cache.directory) == []
+
+    def test_missing_file(self):
+        with self.assertRaises(IOError):
+            NexusReader(os.path.join(self.tmpdir, 'sausage.nex'), cache=self.cache)
@@ -0,0 +1,135 @@
+"""Tests for reading and writing compressed nexus files"""
+import os
+import bz2
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from nexus.reader import NexusReader
+from nexus.writer import NexusWriter
+from nexus import compression
+from nexus.compression import sniff, detect_codec, open_file, decompress
+
+try:  # pragma: no cover
+    import lzma
+except ImportError:  # pragma: no cover
+    lzma = None
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
+
+
+def _compress(codec, filename, content):
+    if codec == 'gzip':
+        handle = gzip.GzipFile(filename, 'wb')
+    elif codec == 'bz2':
+        handle = bz2.BZ2File(filename, 'wb')
+    else:
+        handle = lzma.LZMAFile(filename, 'wb')
+    with handle:
+        handle.write(content)
+
+
+class Test_Compression(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.codecs = ['gzip', 'bz2'] + (['xz'] if lzma else [])
+        with open(os.path.join(EXAMPLE_DIR, 'example.trees'), 'rb') as handle:
+            self.content = handle.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make(self, codec, name='compressed.trees'):
+        filename = os.path.join(self.tmpdir, name)
+        _compress(codec, filename, self.content)
+        return filename
+
+    def test_sniff(self):
+        assert sniff(b'#NEXUS\n') is None
+        assert sniff(b'') is None
+        assert sniff(b'\x1f\x8b\x08') == 'gzip'
+        assert sniff(b'BZh91AY') == 'bz2'
+        assert sniff(b'\xfd7zXZ\x00\x00') == 'xz'
+        assert sniff(b'\x28\xb5\x2f\xfd\x00') == 'zstd'
+
+    def test_detect_codec(self):
+        for codec in self.codecs:
+            assert detect_codec(self.make(codec)) == codec
+        assert detect_codec(os.path.join(EXAMPLE_DIR, 'example.nex')) is None
+
+    def test_read_by_magic(self):
+        # the codec is found from the contents, not the (wrong) extension.
+        expected = NexusReader(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        for codec in self.codecs:
+            nex = NexusReader(self.make(codec))
+            assert nex.trees.ntrees == 3
+            assert nex.trees.trees == expected.trees.trees
+
+    def test_iter_trees(self):
+        for codec in self.codecs:
+            trees = list(NexusReader().iter_trees(self.make(codec)))
+            assert len(trees) == 3
+
+    def test_decompress(self):
+        for codec in self.codecs:
+            with open(self.make(codec), 'rb') as handle:
+                assert decompress(handle.read()) == self.content
+        assert decompress(self.content) == self.content
+
+    def test_mmap_compressed(self):
+        with self.assertRaises(ValueError):
+            NexusReader(self.make('gzip'), mmap=True)
+
+    def test_write_to_file(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        for codec, ext in [('gzip', '.gz'), ('bz2', '.bz2'), ('xz', '.xz')]:
+            if codec not in self.codecs:  # pragma: no cover
+                continue
+            filename = os.path.join(self.tmpdir, 'out.trees' + ext)
+            nex.write_to_file(filename)
+            assert detect_codec(filename) == codec
+            assert NexusReader(filename).write() == nex.write()
+
+    def test_write_to_file_compression(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        filename = os.path.join(self.tmpdir, 'out.nex')
+        nex.write_to_file(filename, compression='bz2')
+        assert detect_codec(filename) == 'bz2'
+        nex.write_to_file(filename + '.gz', compression=False)
+        assert detect_codec(filename + '.gz') is None
+        with self.assertRaises(ValueError):
+            nex.write_to_file(filename, compression='sausage')
+
+    def test_write_to_file_uncompressed(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        filename = os.path.join(self.tmpdir, 'out.nex')
+        nex.write_to_file(filename)
+        with open(filename) as handle:
+            assert handle.read() == nex.write()
+
+    def test_writer_write_to_file(self):
+        nw = NexusWriter()
+        nw.add('taxon1', 'char1', '0')
+        nw.add('taxon2', 'char1', '1')
+        filename = os.path.join(self.tmpdir, 'out.nex.gz')
+        nw.write_to_file(filename)
+        assert detect_codec(filename) == 'gzip'
+        with open_file(filename) as handle:
+            assert handle.read().decode('utf-8') == nw.make_nexus()
+
+    def test_open_file_write_text(self):
+        filename = os.path.join(self.tmpdir, 'out.nex.bz2')
+        with open_file(filename, 'w') as handle:
+            handle.write('#NEXUS\n')
+            handle.write(u'[Andr\xe9]\n')
+        with open_file(filename) as handle:
+            assert handle.read().decode('utf-8') == u'#NEXUS\n[Andr\xe9]\n'
+
+    @unittest.skipIf(compression.zstandard is not None, "zstandard installed")
+    def test_zstd_missing(self):
+        filename = os.path.join(self.tmpdir, 'out.zst')
+        with open(filename, 'wb') as handle:
+            handle.write(b'\x28\xb5\x2f\xfd\x00\x00')
+        with self.assertRaises(ValueError):
+            NexusReader(filename)
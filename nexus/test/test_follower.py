@@ -0,0 +1,106 @@
+"""Tests for TreeFollower"""
+import os
+import shutil
+import tempfile
+import unittest
+from nexus.reader import NexusReader
+from nexus.follower import TreeFollower
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
+
+
+class Test_TreeFollower(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'run.trees')
+        with open(os.path.join(EXAMPLE_DIR, 'example-translated.trees')) as h:
+            self.lines = h.read().splitlines(True)
+        self.expected = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees')
+        ).trees.trees
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, lines, mode='a'):
+        with open(self.filename, mode) as handle:
+            handle.writelines(lines)
+
+    def test_missing_file(self):
+        assert TreeFollower(self.filename).poll() == []
+
+    def test_poll_everything(self):
+        self.write(self.lines)
+        follower = TreeFollower(self.filename)
+        assert follower.poll() == self.expected
+        assert follower.poll() == []
+        assert follower.ntrees == 3
+        assert len(follower.trees.translators) == 13
+
+    def test_incremental(self):
+        # header and first tree
+        self.write(self.lines[:17])
+        follower = TreeFollower(self.filename)
+        assert follower.poll() == self.expected[:1]
+        offset = follower.offset
+        # second tree
+        self.write(self.lines[17:18])
+        assert follower.poll() == self.expected[1:2]
+        assert follower.offset > offset
+        # the rest
+        self.write(self.lines[18:])
+        assert follower.poll() == self.expected[2:]
+        assert follower.ntrees == 3
+
+    def test_split_translate_block(self):
+        self.write(self.lines[:6])
+        follower = TreeFollower(self.filename)
+        assert follower.poll() == []
+        self.write(self.lines[6:])
+        assert follower.poll() == self.expected
+        assert len(follower.trees.translators) == 13
+
+    def test_partial_line(self):
+        self.write(self.lines[:16])
+        partial = self.lines[16][:50]
+        self.write([partial])
+        follower = TreeFollower(self.filename)
+        assert follower.poll() == []
+        self.write([self.lines[16][50:]])
+        assert follower.poll() == self.expected[:1]
+
+    def test_stop_early(self):
+        self.write(self.lines)
+        follower = TreeFollower(self.filename)
+        for tree in follower.iter_new():
+            break
+        assert tree == self.expected[0]
+        assert follower.poll() == self.expected[1:]
+        assert follower.ntrees == 3
+
+    def test_small_chunks(self):
+        self.write(self.lines)
+        follower = TreeFollower(self.filename, chunksize=7)
+        assert follower.poll() == self.expected
+
+    def test_detranslate(self):
+        self.write(self.lines)
+        follower = TreeFollower(self.filename, detranslate=True)
+        expected = NexusReader(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        assert follower.poll() == expected.trees.trees
+
+    def test_store(self):
+        self.write(self.lines[:17])
+        follower = TreeFollower(self.filename, store=True)
+        follower.poll()
+        self.write(self.lines[17:])
+        follower.poll()
+        assert follower.trees.trees == self.expected
+
+    def test_restart(self):
+        self.write(self.lines)
+        follower = TreeFollower(self.filename)
+        follower.poll()
+        self.write(self.lines[:17], mode='w')
+        assert follower.poll() == self.expected[:1]
+        assert follower.ntrees == 1
@@ -1,10 +1,14 @@
 """Tests for DataHandler"""
 import os
 import re
+import pickle
 import warnings
 import unittest
+from collections import OrderedDict
 from nexus import NexusReader
 from nexus.reader import DataHandler
+from nexus.handlers.data import CharacterView
+from nexus.exceptions import NexusFormatException
 
 EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
 
@@ -30,6 +34,59 @@ class Test_DataHandler_parse_sites(unittest.TestCase):
     def test_extra_comma(self):
         assert DataHandler()._parse_sites('(T,A),C,G') == ['T,A', 'C', 'G']
 
+    def test_space(self):
+        assert DataHandler()._parse_sites('123(4 5)56') == \
+            ['1', '2', '3', '45', '5', '6']
+
+    def test_braces(self):
+        assert DataHandler()._parse_sites('1{23}(4,5)6') == \
+            ['1', '23', '4,5', '6']
+
+    def test_cached(self):
+        handler = DataHandler()
+        assert handler._parse_sites('1(12)') == ['1', '12']
+        assert handler._parse_sites('1(12)') == ['1', '12']
+
+    def test_unmatched(self):
+        for sites in ['12(3', '1{2', '1)2', '(1(2))']:
+            with self.assertRaises(NexusFormatException):
+                DataHandler()._parse_sites(sites)
+
+    def test_sitecache_repeated_rows(self):
+        handler = DataHandler()
+        for _ in range(1000):
+            handler._parse_sites('0101')
+        assert handler.sitecache.hits == 999
+        assert not handler.sitecache.bypassed
+
+    def test_sitecache_bypassed_for_unique_rows(self):
+        handler = DataHandler()
+        for i in range(DataHandler.SITECACHE_WARMUP):
+            handler._parse_sites(bin(i))
+        assert handler.sitecache.bypassed
+        assert len(handler.sitecache) == 0
+        assert handler._parse_sites('0101') == ['0', '1', '0', '1']
+
+    def test_sitecache_size(self):
+        handler = DataHandler(sitecache_size=2)
+        for sites in ('01', '10', '11', '01'):
+            handler._parse_sites(sites)
+        assert len(handler.sitecache) == 2
+        assert handler.sitecache.evictions == 2
+        assert DataHandler(sitecache_size=0).sitecache.bypassed
+
+    def test_sitecache_not_pickled(self):
+        handler = DataHandler(sitecache_size=5)
+        handler._parse_sites('01')
+        handler = pickle.loads(pickle.dumps(handler))
+        assert len(handler.sitecache) == 0
+        assert handler.sitecache.maxsize == 5
+
+    def test_long_polymorphic_row(self):
+        sites = DataHandler()._parse_sites('0(12){01}' * 10000)
+        assert len(sites) == 30000
+        assert sites[-3:] == ['0', '12', '01']
+
 
 class Test_DataHandler_SimpleNexusFormat(unittest.TestCase):
     expected = {
@@ -96,11 +153,112 @@ class Test_DataHandler_SimpleNexusFormat(unittest.TestCase):
     
     def test_characters_cached(self):
         assert self.nex.data.characters == self.nex.data._characters
+
+    def test_characters_view(self):
+        view = self.nex.data.characters
+        assert isinstance(view, CharacterView)
+        assert len(view) == 2
+        assert list(view) == [0, 1]
+        assert 1 in view and 2 not in view
+        assert view[0] == {'Harry': '0', 'Simon': '0', 'Betty': '1', 'Louise': '1'}
+        assert dict(view.items()) == dict((k, view[k]) for k in view)
+        with self.assertRaises(KeyError):
+            view[2]
+
+    def test_characters_fresh_columns(self):
+        self.nex.data.characters[0]['Harry'] = 'X'
+        assert self.nex.data.characters[0]['Harry'] == '0'
+
+    def test_characters_follow_taxa(self):
+        view = self.nex.data.characters
+        assert len(view[0]) == 4
+        self.nex.data.add_taxon('Sausage', ['1', '1', '0'])
+        assert view[0]['Sausage'] == '1'
+        assert view[2] == {'Sausage': '0'}
+        self.nex.data.del_taxon('Sausage')
+        self.nex.data.del_taxon('Harry')
+        assert 2 not in view
+        assert sorted(view[0]) == ['Betty', 'Louise', 'Simon']
+        assert self.nex.data.symbols == set(['0', '1'])
+
+    def test_characters_follow_matrix(self):
+        view = self.nex.data.characters
+        assert len(view) == 2
+        for taxon, row in self.nex.data:
+            row.pop()
+        assert list(view) == [0]
+        self.nex.data.matrix = {'A': ['1', '2', '3']}
+        assert view[2] == {'A': '3'}
     
     def test_iterable(self):
         for taxon, block in self.nex.data:
             assert block == self.expected[taxon]
 
+    def test_iter_order(self):
+        assert [t for t, _ in self.nex.data] == self.nex.data.taxa
+        assert [t for t, _ in self.nex.data] == \
+            [self.nex.data[i][0] for i in range(self.nex.data.ntaxa)]
+
+    def test_getitem(self):
+        # (taxa are in matrix order, which python 2 doesn't keep)
+        taxa = self.nex.data.taxa
+        assert self.nex.data[0] == (taxa[0], self.expected[taxa[0]])
+        assert self.nex.data[-1] == (taxa[-1], self.expected[taxa[-1]])
+        with self.assertRaises(IndexError):
+            self.nex.data[4]
+
+    def test_add_and_del_taxon(self):
+        self.nex.data.add_taxon('Sausage', ['1', '0'])
+        assert self.nex.data.ntaxa == 5
+        assert dict(self.nex.data)['Sausage'] == ['1', '0']
+        self.nex.data.del_taxon('Simon')
+        assert sorted(self.nex.data.taxa) == \
+            ['Betty', 'Harry', 'Louise', 'Sausage']
+        assert [t for t, _ in self.nex.data] == self.nex.data.taxa
+
+    def test_replaced_matrix(self):
+        self.nex.data.matrix = OrderedDict(
+            (t.upper(), r) for t, r in sorted(self.nex.data.matrix.items())
+        )
+        assert self.nex.data[0] == ('BETTY', ['1', '0'])
+        self.nex.data.del_taxon('SIMON')
+        assert self.nex.data.taxa == ['BETTY', 'HARRY', 'LOUISE']
+
+    def test_edited_matrix(self):
+        del self.nex.data.matrix['Harry']
+        self.nex.data.matrix['Zed'] = ['1', '1']
+        assert sorted(self.nex.data.taxa) == \
+            ['Betty', 'Louise', 'Simon', 'Zed']
+        assert dict(self.nex.data)['Zed'] == ['1', '1']
+        assert 'Harry' not in [t for t, _ in self.nex.data]
+
+    def test_taxon_index_kept(self):
+        index = self.nex.data._taxon_index()
+        assert self.nex.data._taxon_index() is index
+        self.nex.data.add_taxon('Sausage', ['1', '0'])
+        self.nex.data.del_taxon('Simon')
+        assert self.nex.data._taxon_index() is index
+        assert sorted(index) == sorted(self.nex.data.matrix.keys())
+        self.nex.data.matrix['Zed'] = ['1', '1']  # rebuilt after this
+        assert self.nex.data._taxon_index() == \
+            list(self.nex.data.matrix.keys())
+        for edit in (
+            lambda m: m.pop('Zed'), lambda m: m.update({'Yan': ['0', '0']}),
+            lambda m: m.setdefault('Xu', ['1', '0']), lambda m: m.popitem(),
+            lambda m: m.clear(),
+        ):
+            edit(self.nex.data.matrix)
+            assert self.nex.data.taxa == list(self.nex.data.matrix.keys())
+
+    def test_nchar_follows_edits(self):
+        for taxon, row in self.nex.data:
+            row.pop()
+        assert self.nex.data.nchar == 1
+
+    def test_empty(self):
+        assert DataHandler().nchar == 0
+        assert list(DataHandler()) == []
+
     def test_parse_format_line(self):
         d = DataHandler()
         f = d.parse_format_line('Format datatype=standard gap=- symbols="01";')
@@ -321,3 +479,90 @@ class Test_DataHandler_CharacterBlockNexusFormat(unittest.TestCase):
             assert re.search(expected, written, re.MULTILINE), \
                 'Expected "%s"' % expected
 
+
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class Test_DataHandler_to_numpy(unittest.TestCase):
+    def setUp(self):
+        self.nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example.nex'))
+
+    def test_to_numpy(self):
+        codes, alphabet = self.nex.data.to_numpy()
+        assert codes.shape == (4, 2)
+        assert codes.dtype == numpy.uint8
+        assert alphabet == ['0', '1']
+        for taxon, row in zip(self.nex.data.taxa, codes):
+            assert [alphabet[c] for c in row] == self.nex.data.matrix[taxon]
+
+    def test_to_numpy_compact(self):
+        expected = self.nex.data.to_numpy()
+        self.nex.data.compact = True
+        codes, alphabet = self.nex.data.to_numpy()
+        assert alphabet == expected[1]
+        assert (codes == expected[0]).all()
+
+    def test_to_numpy_multistate(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example-characters.nex'))
+        codes, alphabet = nex.data.to_numpy()
+        assert codes.shape == (nex.data.ntaxa, nex.data.nchar)
+        for taxon, row in zip(nex.data.taxa, codes):
+            assert [alphabet[c] for c in row] == nex.data.matrix[taxon]
+
+    def test_to_numpy_ragged(self):
+        self.nex.data.matrix['Simon'].append('1')
+        with self.assertRaises(NexusFormatException):
+            self.nex.data.to_numpy()
+
+
+class Test_DataHandler_site_patterns(unittest.TestCase):
+    def setUp(self):
+        self.data = DataHandler()
+        # (ordered, as python 2 dicts don't keep the taxa in order)
+        self.data.matrix = OrderedDict([
+            ('A', ['0', '1', '1', '0', '12', '1']),
+            ('B', ['0', '1', '0', '0', '?', '1']),
+            ('C', ['1', '0', '0', '1', '?', '0']),
+        ])
+
+    def test_site_patterns(self):
+        patterns = self.data.site_patterns()
+        assert patterns.taxa == ['A', 'B', 'C']
+        assert patterns.patterns == [
+            ('0', '0', '1'), ('1', '1', '0'), ('1', '0', '0'), ('12', '?', '?')
+        ]
+        assert patterns.weights == [2, 2, 1, 1]
+        assert patterns.sites == [0, 1, 2, 0, 3, 1]
+
+    def test_site_patterns_compact(self):
+        expected = self.data.site_patterns()
+        self.data.compact = True
+        patterns = self.data.site_patterns()
+        # (python 2 may order the taxa differently in a compact matrix)
+        order = [patterns.taxa.index(taxon) for taxon in expected.taxa]
+        assert [
+            tuple(pattern[i] for i in order) for pattern in patterns.patterns
+        ] == expected.patterns
+        assert patterns.weights == expected.weights
+        assert patterns.sites == expected.sites
+
+    def test_expand(self):
+        patterns = self.data.site_patterns()
+        assert patterns.expand([0]) == [0, 3]
+        assert patterns.expand([1, 3]) == [1, 4, 5]
+        assert patterns.expand([]) == []
+
+    def test_empty(self):
+        patterns = DataHandler().site_patterns()
+        assert patterns.patterns == []
+        assert patterns.sites == []
+
+    def test_ragged(self):
+        self.data.matrix['A'].append('1')
+        with self.assertRaises(NexusFormatException):
+            self.data.site_patterns()
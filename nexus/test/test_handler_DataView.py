@@ -0,0 +1,116 @@
+"""Tests for DataView"""
+import os
+import pickle
+import unittest
+from nexus import NexusReader
+from nexus.handlers.data import DataView
+from nexus.handlers.matrix import CompactMatrix
+from nexus.tools.sites import find_constant_sites, new_nexus_without_sites
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
+
+
+class Test_DataView(unittest.TestCase):
+    def setUp(self):
+        self.nex = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-characters.nex')
+        )
+        self.data = self.nex.data
+        self.view = self.data.view(taxa=['E', 'A'], sites=[4, 0, 2])
+
+    def test_view(self):
+        assert isinstance(self.view, DataView)
+        assert self.view.taxa == ['E', 'A']
+        assert self.view.ntaxa == 2
+        assert self.view.nchar == 3
+        assert self.view.matrix['A'] == ['E', 'A', 'C']
+        assert self.view.matrix['A'][1] == 'A'
+        assert self.view.matrix['A'][1:] == ['A', 'C']
+        assert 'B' not in self.view.matrix
+        assert not self.view.materialized
+
+    def test_shares_rows(self):
+        self.data.matrix['A'][0] = 'Z'
+        assert self.view.matrix['A'] == ['E', 'Z', 'C']
+
+    def test_iter(self):
+        assert list(self.view) == [
+            ('E', ['E', 'A', 'C']), ('A', ['E', 'A', 'C'])
+        ]
+        assert self.view[1] == ('A', ['E', 'A', 'C'])
+
+    def test_charlabels(self):
+        assert self.view.charlabels == {0: 'CHAR_E', 1: 'CHAR_A', 2: 'CHAR_C'}
+        assert self.view.characters['CHAR_A'] == {'E': 'A', 'A': 'A'}
+
+    def test_all_sites(self):
+        view = self.data.view(taxa=['B'])
+        assert view.matrix['B'] == self.data.matrix['B']
+        assert view.charlabels == self.data.charlabels
+
+    def test_write(self):
+        expected = new_nexus_without_sites(self.nex, [1, 3]).write()
+        expected = NexusReader().read_string(expected)
+        nex = NexusReader().read_string(self.data.view(sites=[0, 2, 4]).write())
+        assert nex.data.matrix == expected.data.matrix
+        assert nex.data.charlabels == {0: 'CHAR_A', 1: 'CHAR_C', 2: 'CHAR_E'}
+
+    def test_reader_view(self):
+        nex = self.nex.view(taxa=['A', 'B'], sites=[1, 2])
+        assert nex.data.matrix == {'A': ['B', 'C'], 'B': ['B', 'C']}
+        assert find_constant_sites(nex) == [0, 1]
+        assert 'begin data;' in nex.write()
+
+    def test_view_of_view(self):
+        view = self.view.view(taxa=['A'], sites=[2, 0])
+        assert view.parent is self.data
+        assert view.matrix['A'] == ['C', 'E']
+        assert view.charlabels == {0: 'CHAR_C', 1: 'CHAR_E'}
+
+    def test_materialize_on_edit(self):
+        row = self.view.matrix['A']
+        row[0] = 'Z'
+        assert self.view.materialized
+        assert row == ['Z', 'A', 'C']
+        assert self.view.matrix['A'] == ['Z', 'A', 'C']
+        assert self.data.matrix['A'] == ['A', 'B', 'C', 'D', 'E']
+        # the view no longer sees changes to the parent
+        self.data.matrix['E'][0] = 'Z'
+        assert self.view.matrix['E'] == ['E', 'A', 'C']
+
+    def test_materialize_on_add_and_del_taxon(self):
+        self.view.add_taxon('F', ['1', '2', '3'])
+        assert sorted(self.view.taxa) == ['A', 'E', 'F']
+        assert 'F' not in self.data.matrix
+        self.view.del_taxon('E')
+        assert sorted(self.view.taxa) == ['A', 'F']
+        assert 'E' in self.data.matrix
+
+    def test_materialize_compact(self):
+        self.data.compact = True
+        view = self.data.view(sites=[0, 1])
+        assert view.matrix['A'] == ['A', 'B']
+        view.materialize()
+        assert isinstance(view.matrix, CompactMatrix)
+        assert view.matrix['A'] == ['A', 'B']
+
+    def test_site_patterns(self):
+        view = self.data.view(sites=[0, 0, 1])
+        patterns = view.site_patterns()
+        assert patterns.weights == [2, 1]
+        assert patterns.sites == [0, 0, 1]
+
+    def test_pickle(self):
+        view = pickle.loads(pickle.dumps(self.view))
+        assert view.matrix['A'] == ['E', 'A', 'C']
+        view.add_taxon('Z', ['0', '0', '0'])
+        assert view.materialized
+        assert 'Z' not in self.data.matrix
+
+    def test_errors(self):
+        with self.assertRaises(KeyError):
+            self.data.view(taxa=['X'])
+        with self.assertRaises(IndexError):
+            self.data.view(sites=[5])
+        with self.assertRaises(IndexError):
+            self.data.view(sites=[-1])
@@ -3,7 +3,8 @@ import os
 import unittest
 from nexus.reader import NexusReader
 from nexus.exceptions import NexusFormatException
-from nexus.handlers.tree import TreeHandler
+from nexus.handlers.tree import TreeHandler, remove_comments
+from nexus.trees import parse_tree
 
 EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
 
@@ -48,9 +49,286 @@ class Test_TreeHandler_SimpleTreefile(unittest.TestCase):
 
     def test_write_produces_end(self):
         assert "end;" in self.nex.trees.write()
+
+    def test_parse_tree(self):
+        tree = self.nex.trees.parse_tree(0)
+        assert tree.name == 'tree.0.1065.603220'
+        assert tree.ntips == 13
+        assert tree.lengths[tree.labels.index('Chris')] == 0.0668822155
+        assert sorted(tree.tip_labels) == sorted(self.nex.trees.taxa)
+
+    def test_iter_parsed(self):
+        trees = list(self.nex.trees.iter_parsed())
+        assert len(trees) == 3
+        assert [t.name for t in trees] == [
+            self.nex.trees.parse_tree(i).name for i in range(3)
+        ]
     
 
 
+class Test_TreeHandler_LazyDetranslate(unittest.TestCase):
+    def setUp(self):
+        self.nex = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees')
+        )
+        self.expected = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example.trees')
+        ).trees.trees
+        self.calls = []
+        detranslate_tree = self.nex.trees._detranslate_tree
+
+        def _counting(tree, translatetable):
+            self.calls.append(tree)
+            return detranslate_tree(tree, translatetable)
+        self.nex.trees._detranslate_tree = _counting
+
+    def test_nothing_detranslated_up_front(self):
+        self.nex.trees.detranslate()
+        assert self.calls == []
+        assert self.nex.trees.ntrees == 3
+
+    def test_access(self):
+        self.nex.trees.detranslate()
+        assert self.nex.trees[1] == self.expected[1]
+        assert self.nex.trees[-1] == self.expected[2]
+        assert self.nex.trees[1] == self.expected[1]  # cached
+        assert len(self.calls) == 2
+        assert self.nex.trees.trees[:2] == self.expected[:2]
+
+    def test_iteration(self):
+        self.nex.trees.detranslate()
+        assert list(self.nex.trees) == self.expected
+        assert self.nex.trees.trees == self.expected
+
+    def test_index_error(self):
+        self.nex.trees.detranslate()
+        with self.assertRaises(IndexError):
+            self.nex.trees[3]
+        with self.assertRaises(IndexError):
+            self.nex.trees[-4]
+        assert self.nex.trees[-3] == self.expected[0]
+
+    def test_select(self):
+        self.nex.trees.detranslate()
+        self.nex.trees.select([2, 0])
+        assert self.calls == []
+        assert self.nex.trees.ntrees == 2
+        assert list(self.nex.trees) == [self.expected[2], self.expected[0]]
+        assert len(self.calls) == 2
+
+    def test_write(self):
+        self.nex.trees.detranslate()
+        self.nex.trees.select([1])
+        written = self.nex.trees.write()
+        assert 'translate' not in written
+        assert self.expected[1] in written
+        assert self.expected[0] not in written
+        assert len(self.calls) == 1
+
+    def test_edit(self):
+        self.nex.trees.detranslate()
+        self.nex.trees.trees.append('tree new = (Chris,Bruce);')
+        assert isinstance(self.nex.trees.trees, list)
+        assert self.nex.trees.trees == self.expected + ['tree new = (Chris,Bruce);']
+
+    def test_assign(self):
+        self.nex.trees.detranslate()
+        self.nex.trees.trees = ['tree new = (Chris,Bruce);']
+        assert self.nex.trees.trees == ['tree new = (Chris,Bruce);']
+        assert self.calls == []
+
+    def test_cache_is_bounded(self):
+        self.nex.trees._cache.maxsize = 1
+        self.nex.trees.detranslate()
+        assert list(self.nex.trees) == self.expected
+        assert len(self.nex.trees._cache) == 1
+
+
+def tree_name(tree, translators):
+    # (module level so it can be sent to worker processes)
+    return tree.split()[1], len(translators)
+
+
+class Test_TreeHandler_map(unittest.TestCase):
+    def setUp(self):
+        self.nex = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees')
+        )
+        self.expected = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example.trees')
+        ).trees.trees
+
+    def test_serial(self):
+        assert self.nex.trees.map(tree_name, processes=1) == [
+            ('tree.0.1065.603220', 13),
+            ('tree.10000.874.808756', 13),
+            ('tree.20000.883.396049', 13),
+        ]
+
+    def test_parallel(self):
+        for chunksize in (None, 1, 2):
+            assert self.nex.trees.map(
+                tree_name, processes=2, chunksize=chunksize
+            ) == self.nex.trees.map(tree_name, processes=1)
+
+    def test_detranslated_in_workers(self):
+        self.nex.trees.detranslate()
+        for processes in (1, 2):
+            assert self.nex.trees.map(
+                remove_comments, processes=processes
+            ) == self.expected
+        # (and nothing was detranslated in this process)
+        assert len(self.nex.trees._cache) == 0
+
+    def test_detranslate_with_processes(self):
+        self.nex.trees.detranslate(processes=2)
+        assert isinstance(self.nex.trees.trees, list)
+        assert self.nex.trees.trees == self.expected
+        self.nex.trees.detranslate(processes=2)  # no-op the second time
+        assert self.nex.trees.trees == self.expected
+
+
+class Test_TreeHandler_consensus(unittest.TestCase):
+    def setUp(self):
+        self.translated = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees')
+        ).trees
+
+    def test_count_splits(self):
+        counter = self.translated.count_splits()
+        assert counter.ntrees == 3
+        assert counter.taxa == [  # in translate block order
+            'Tom', 'Simon', 'Bruce', 'Roger', 'Fred', 'Kevin', 'Timothy',
+            'Andrew', 'Chris', 'Michael', 'Mark', 'Henry', 'David'
+        ]
+        assert counter.support(counter.split(['Timothy', 'Henry'])) == 1.0
+
+    def test_same_after_detranslation(self):
+        expected = self.translated.count_splits().counts
+        self.translated.detranslate()  # (lazily)
+        assert self.translated.count_splits().counts == expected
+        detranslated = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees')
+        ).trees
+        detranslated.detranslate(processes=1)
+        assert detranslated.count_splits().counts == expected
+
+    def test_consensus(self):
+        tree = self.translated.consensus()
+        assert tree.name == 'consensus'
+        assert sorted(tree.tip_labels) == sorted(self.translated.taxa)
+        assert '(Timothy,Henry)1' in tree.newick()
+        greedy = self.translated.consensus(greedy=True)
+        assert len(greedy) > len(tree)
+
+    def test_untranslated_labels(self):
+        # labels the translators regex can't see are still taxa
+        handler = NexusReader().read_string("""#NEXUS
+begin trees;
+    tree one = ((Homo.sapiens:1,Pan-troglodytes:1):1,(Gorilla:1,Pongo:1):1,Hylo:1);
+    tree two = ((Homo.sapiens:1,Pan-troglodytes:1):1,(Gorilla:1,Hylo:1):1,Pongo:1);
+end;
+""").trees
+        counter = handler.count_splits()
+        assert counter.taxa == [
+            'Gorilla', 'Homo.sapiens', 'Hylo', 'Pan-troglodytes', 'Pongo'
+        ]
+        assert counter.support(
+            counter.split(['Homo.sapiens', 'Pan-troglodytes'])
+        ) == 1.0
+        assert '(Homo.sapiens,Pan-troglodytes)1' in handler.consensus().newick()
+
+
+def rotated(tree):
+    # the tree with the children of every node reversed, and no lengths
+    tree = parse_tree(tree)
+
+    def write(node):
+        children = tree.children(node)
+        if not children:
+            return tree.labels[node]
+        return '(%s)' % ','.join(write(child) for child in reversed(children))
+    return 'tree rotated = %s;' % write(0)
+
+
+class Test_TreeHandler_topologies(unittest.TestCase):
+    def setUp(self):
+        self.handler = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees')
+        ).trees
+        trees = self.handler.trees
+        # 4 copies of tree 0, 3 of tree 1 and 2 of tree 2, plus tree 0 with
+        # its children rotated and without branch lengths
+        self.handler.trees = [trees[0], trees[1], trees[2]] * 2 + \
+            [trees[0], trees[1], trees[0]] + [rotated(trees[0])]
+
+    def test_topology_hashes(self):
+        hashes = self.handler.topology_hashes(processes=1)
+        assert len(hashes) == 10
+        assert len(set(hashes)) == 3
+        assert hashes[0] == hashes[3] == hashes[9]
+        assert hashes[0] != hashes[1] != hashes[2]
+        assert self.handler.topology_hashes(processes=2) == hashes
+
+    def test_hashes_cached(self):
+        hashes = self.handler.topology_hashes(processes=1)
+        cache = self.handler._topologies[False]
+        assert len(cache) == 4  # one per distinct tree string
+        cache[self.handler.trees[0]] = 'cached'
+        assert self.handler.topology_hashes(processes=1)[0] == 'cached'
+        self.handler.trees = self.handler.trees[:]  # new trees clear it
+        assert self.handler.topology_hashes(processes=1) == hashes
+
+    def test_same_when_detranslated(self):
+        hashes = self.handler.topology_hashes(processes=1)
+        self.handler.detranslate(processes=1)
+        assert self.handler.topology_hashes(processes=1) == hashes
+
+    def test_unique_topologies(self):
+        topologies = self.handler.unique_topologies(processes=1)
+        assert [t.ntrees for t in topologies] == [5, 3, 2]
+        assert [t.frequency for t in topologies] == [0.5, 0.3, 0.2]
+        assert topologies[0].trees == [0, 3, 6, 8, 9]
+        assert topologies[1].trees == [1, 4, 7]
+        assert [t.credible for t in topologies] == [True, True, True]
+        assert [
+            t.credible for t in self.handler.unique_topologies(0.8)
+        ] == [True, True, False]
+        assert [
+            t.credible for t in self.handler.unique_topologies(0.5)
+        ] == [True, False, False]
+
+    def test_ties_in_order_seen(self):
+        self.handler.select([2, 1, 0])
+        topologies = self.handler.unique_topologies(processes=1)
+        assert [t.trees for t in topologies] == [[0], [1], [2]]
+
+    def test_select_unique(self):
+        kept = self.handler.select_unique(processes=1)
+        assert len(kept) == self.handler.ntrees == 3
+        assert self.handler.trees[0].startswith('tree tree.0.1065.603220 ')
+        assert len(set(self.handler.topology_hashes())) == 3
+
+    def test_select_unique_credible(self):
+        self.handler.select_unique(credible=0.6, processes=1)
+        assert self.handler.ntrees == 2
+
+    def test_no_trees(self):
+        self.handler.trees = []
+        assert self.handler.unique_topologies() == []
+
+    def test_untranslated_labels(self):
+        handler = NexusReader().read_string("""#NEXUS
+begin trees;
+    tree one = ((Homo.sapiens:1,Pan-troglodytes:1):1,(Gorilla:1,Pongo:1):1,Hylo:1);
+    tree two = ((Gorilla:1,Pongo:1):1,Hylo:1,(Pan-troglodytes:1,Homo.sapiens:1):1);
+    tree three = ((Homo.sapiens:1,Gorilla:1):1,(Pan-troglodytes:1,Pongo:1):1,Hylo:1);
+end;
+""").trees
+        topologies = handler.unique_topologies(processes=1)
+        assert [t.trees for t in topologies] == [[0, 1], [2]]
+
+
 class Test_TreeHandler_TranslatedTreefile(unittest.TestCase):
     def setUp(self):
         self.nex = NexusReader(
@@ -508,3 +786,18 @@ class Test_TreeHandler__detranslate_tree(unittest.TestCase):
         trans = TreeHandler()._detranslate_tree(oldtree, translatetable)
         assert trans == newtree, \
             "Unable to correctly detranslate a BEAST tree"
+
+    def test_replaces_each_taxon_once(self):
+        # taxa names that look like taxa ids mustn't be translated again
+        translatetable = {'1': '2', '2': 'Bruce', '3': 'Tom'}
+        oldtree = "tree a = (1,(2,3));"
+        newtree = "tree a = (2,(Bruce,Tom));"
+        trans = TreeHandler()._detranslate_tree(oldtree, translatetable)
+        assert trans == newtree
+
+    def test_comments_untouched(self):
+        translatetable = {'1': 'Chris', '2': 'Bruce', '3': 'Tom'}
+        oldtree = "tree a = ((1,2)[&set={1,2}],3);"
+        newtree = "tree a = ((Chris,Bruce)[&set={1,2}],Tom);"
+        trans = TreeHandler()._detranslate_tree(oldtree, translatetable)
+        assert trans == newtree
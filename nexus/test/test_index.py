@@ -0,0 +1,132 @@
+"""Tests for NexusIndex and memory-mapped reading"""
+import os
+import shutil
+import tempfile
+import unittest
+from nexus.reader import NexusReader
+from nexus.index import NexusIndex, INDEX_SUFFIX
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
+
+
+class Test_NexusIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def copy(self, name):
+        filename = os.path.join(self.tmpdir, name)
+        shutil.copy(os.path.join(EXAMPLE_DIR, name), filename)
+        return filename
+
+    def test_build(self):
+        with open(os.path.join(EXAMPLE_DIR, 'maddison_et_al.nex'), 'rb') as h:
+            content = h.read()
+        index = NexusIndex.build(content)
+        assert sorted(index.blocks) == ['characters', 'taxa', 'trees']
+        assert len(index.rows['characters']) == 4
+        assert index.ntrees == 1
+        start, end = index.trees[0]
+        assert content[start:end].strip().startswith(b'TREE')
+        start, end = index.blocks['taxa']
+        assert content[start:end].strip().startswith(b'BEGIN TAXA;')
+        assert content[start:end].strip().endswith(b'END;')
+
+    def test_interleaved_rows(self):
+        index = NexusIndex.build(b"""#NEXUS
+        begin data;
+        matrix
+        A 01
+        B 10
+        A 11
+        B 00
+        ;
+        end;
+        """)
+        assert len(index.rows['data']['A']) == 2
+        assert len(index.rows['data']['B']) == 2
+
+    def test_sidecar(self):
+        filename = self.copy('example.trees')
+        index = NexusIndex.for_file(filename)
+        assert os.path.isfile(filename + INDEX_SUFFIX)
+        loaded = NexusIndex.load(filename + INDEX_SUFFIX)
+        assert loaded.blocks == index.blocks
+        assert loaded.trees == index.trees
+        assert NexusIndex.for_file(filename).trees == index.trees
+
+    def test_stale_sidecar_is_rebuilt(self):
+        filename = self.copy('example.trees')
+        NexusIndex.for_file(filename)
+        with open(filename, 'a') as handle:
+            handle.write("\n[appended]\n")
+        index = NexusIndex.for_file(filename)
+        assert index.size == os.path.getsize(filename)
+
+    def test_invalid_sidecar(self):
+        filename = self.copy('example.trees')
+        with open(filename + INDEX_SUFFIX, 'w') as handle:
+            handle.write("rubbish")
+        assert NexusIndex.load(filename + INDEX_SUFFIX) is None
+        assert NexusIndex.for_file(filename).ntrees == 3
+
+
+class Test_NexusReader_Mmap(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'maddison_et_al.nex')
+        shutil.copy(
+            os.path.join(EXAMPLE_DIR, 'maddison_et_al.nex'), self.filename
+        )
+        self.nex = NexusReader(self.filename, mmap=True)
+
+    def tearDown(self):
+        self.nex.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_same_as_reading(self):
+        expected = NexusReader(self.filename)
+        assert sorted(self.nex.blocks) == sorted(expected.blocks)
+        assert self.nex.raw_blocks['taxa'] == expected.raw_blocks['taxa']
+        assert self.nex.data.matrix == expected.data.matrix
+        assert self.nex.trees.trees == expected.trees.trees
+        for block in expected.blocks:  # (in any order on python 2)
+            assert self.nex.blocks[block].write() == \
+                expected.blocks[block].write()
+
+    def test_blocks_are_lazy(self):
+        assert not self.nex.blocks.is_parsed('trees')
+        assert not self.nex.raw_blocks.is_parsed('trees')
+
+    def test_read_row(self):
+        expected = NexusReader(self.filename)
+        for taxon in expected.data.taxa:
+            assert self.nex.read_row(taxon) == expected.data.matrix[taxon]
+        assert not self.nex.blocks.is_parsed('data')
+
+    def test_read_row_error(self):
+        with self.assertRaises(KeyError):
+            self.nex.read_row('sausage')
+
+    def test_read_tree(self):
+        expected = NexusReader(self.filename)
+        assert self.nex.read_tree(0) == expected.trees.trees[0]
+        with self.assertRaises(IndexError):
+            self.nex.read_tree(1)
+
+    def test_uses_sidecar(self):
+        assert os.path.isfile(self.filename + INDEX_SUFFIX)
+        nex = NexusReader(self.filename, mmap=True)
+        assert nex.index.blocks == self.nex.index.blocks
+        nex.close()
+
+    def test_blocks_filter(self):
+        nex = NexusReader(self.filename, mmap=True, blocks=['trees'])
+        assert list(nex.blocks) == ['trees']
+        nex.close()
+
+    def test_read_row_needs_mmap(self):
+        with self.assertRaises(ValueError):
+            NexusReader(self.filename).read_row('fish')
@@ -0,0 +1,72 @@
+"""Tests for LRUCache"""
+import unittest
+from nexus.lrucache import LRUCache
+
+
+class Test_LRUCache(unittest.TestCase):
+    def test_get(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('b', 5) == 5
+        assert (cache.hits, cache.misses) == (1, 2)
+        assert cache.hit_rate == 1.0 / 3
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache.get('a')
+        cache['c'] = 3
+        assert 'a' in cache and 'c' in cache
+        assert 'b' not in cache
+        assert len(cache) == 2
+        assert cache.evictions == 1
+
+    def test_overwrite(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['a'] = 2
+        assert len(cache) == 1
+        assert cache.get('a') == 2
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache['a'] = 1
+        assert cache.bypassed
+        assert len(cache) == 0
+        assert cache.get('a') is None
+
+    def test_bypass(self):
+        cache = LRUCache(10, min_hit_rate=0.5, warmup=4)
+        for key in range(3):
+            cache[key] = key
+            cache.get('missing')
+        assert not cache.bypassed
+        cache.get('missing')
+        assert cache.bypassed
+        assert len(cache) == 0
+        cache['a'] = 1
+        assert cache.get('a') is None
+        assert cache.misses == 4
+
+    def test_no_bypass_when_hitting(self):
+        cache = LRUCache(10, min_hit_rate=0.5, warmup=4)
+        cache['a'] = 1
+        for _ in range(10):
+            cache.get('a')
+        cache.get('b')
+        assert not cache.bypassed
+
+    def test_reset(self):
+        cache = LRUCache(10, min_hit_rate=1.0, warmup=1)
+        cache.get('a')
+        assert cache.bypassed
+        cache.reset()
+        assert not cache.bypassed
+        assert (cache.hits, cache.misses, cache.evictions) == (0, 0, 0)
+
+    def test_repr(self):
+        assert repr(LRUCache(2)) == \
+            "<LRUCache: 0/2 items, 0 hits, 0 misses, 0 evictions>"
@@ -0,0 +1,110 @@
+"""Tests for CompactMatrix"""
+import os
+import pickle
+import unittest
+from nexus import NexusReader
+from nexus.handlers.data import DataHandler
+from nexus.handlers.matrix import CompactMatrix, CompactRow, SymbolTable
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../examples')
+
+
+class Test_CompactRow(unittest.TestCase):
+    def setUp(self):
+        self.row = CompactRow(SymbolTable(), ['0', '1', '?', '12', '1'])
+
+    def test_read(self):
+        assert len(self.row) == 5
+        assert self.row[0] == '0'
+        assert self.row[-2] == '12'
+        assert self.row[1:3] == ['1', '?']
+        assert list(self.row) == ['0', '1', '?', '12', '1']
+        assert ''.join(self.row) == '01?121'
+        assert self.row == ['0', '1', '?', '12', '1']
+        assert self.row != ['0', '1']
+
+    def test_one_byte_per_site(self):
+        assert self.row.codes.itemsize == 1
+        assert len(self.row.table) == 4
+
+    def test_scans(self):
+        assert self.row.count('1') == 2
+        assert self.row.count('A') == 0
+        assert '12' in self.row
+        assert 'A' not in self.row
+        assert self.row.index('?') == 2
+
+    def test_modify(self):
+        self.row[0] = 'A'
+        self.row.append('-')
+        self.row.insert(0, 'B')
+        assert self.row.pop() == '-'
+        del self.row[1]
+        assert self.row == ['B', '1', '?', '12', '1']
+
+    def test_widen(self):
+        states = [str(i) for i in range(300)]
+        row = CompactRow(SymbolTable(), states)
+        assert row.codes.itemsize == 2
+        assert list(row) == states
+
+
+class Test_CompactMatrix(unittest.TestCase):
+    def test_defaultdict_api(self):
+        matrix = CompactMatrix()
+        matrix['A'].extend(['0', '1'])
+        matrix['B'] = ['1', '1']
+        assert list(matrix) == ['A', 'B']
+        assert matrix['B'] == ['1', '1']
+        assert matrix.get('C') is None
+        assert matrix['A'].table is matrix['B'].table is matrix.table
+
+    def test_nbytes(self):
+        matrix = CompactMatrix({'A': '0101', 'B': '1111'})
+        assert matrix.nbytes == 8
+
+    def test_copy(self):
+        matrix = CompactMatrix({'A': '01'})
+        copy = matrix.copy()
+        copy['A'][0] = '1'
+        assert matrix['A'] == ['0', '1']
+        assert copy['A'] == ['1', '1']
+
+    def test_pickle(self):
+        matrix = CompactMatrix({'A': '01', 'B': '10'})
+        copy = pickle.loads(pickle.dumps(matrix, pickle.HIGHEST_PROTOCOL))
+        assert copy == {'A': ['0', '1'], 'B': ['1', '0']}
+        assert copy['A'].table is copy.table
+
+
+class Test_DataHandler_Compact(unittest.TestCase):
+    def setUp(self):
+        self.filename = os.path.join(EXAMPLE_DIR, 'example.nex')
+        self.nex = NexusReader(self.filename, compact=True)
+
+    def test_compact(self):
+        assert self.nex.data.compact
+        assert isinstance(self.nex.data.matrix, CompactMatrix)
+        assert not NexusReader(self.filename).data.compact
+        assert DataHandler(compact=True).compact
+
+    def test_same_as_lists(self):
+        nex = NexusReader(self.filename)
+        assert self.nex.data.matrix == nex.data.matrix
+        assert self.nex.data.characters == nex.data.characters
+        assert self.nex.data.symbols == nex.data.symbols
+        assert self.nex.write() == nex.write()
+
+    def test_multistate(self):
+        nex = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-characters.nex'), compact=True
+        )
+        expected = NexusReader(os.path.join(EXAMPLE_DIR, 'example-characters.nex'))
+        assert nex.data.matrix == expected.data.matrix
+
+    def test_toggle(self):
+        self.nex.data.compact = False
+        assert self.nex.data.matrix['Simon'] == ['0', '1']
+        assert isinstance(self.nex.data.matrix['Simon'], list)
+        self.nex.data.compact = True
+        assert isinstance(self.nex.data.matrix['Simon'], CompactRow)
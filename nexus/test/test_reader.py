@@ -94,3 +94,167 @@ class Test_NexusReader_Core(unittest.TestCase):
                 Matrix
                 Harry              1
                 """)
+
+
+class Test_NexusReader_IterTrees(unittest.TestCase):
+    """Test streaming trees with NexusReader.iter_trees"""
+    def test_iter_trees(self):
+        nex = NexusReader()
+        trees = nex.iter_trees(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        expected = NexusReader(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        assert list(trees) == expected.trees.trees
+
+    def test_iter_trees_is_lazy(self):
+        nex = NexusReader()
+        trees = nex.iter_trees(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        assert next(trees).startswith('tree tree.0.1065.603220 = ')
+        # trees are not stored.
+        assert nex.trees.trees == []
+        assert nex.trees.block == []
+
+    def test_iter_trees_translators(self):
+        nex = NexusReader()
+        trees = nex.iter_trees(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees')
+        )
+        next(trees)
+        assert nex.trees.was_translated
+        assert len(nex.trees.translators) == 13
+
+    def test_iter_trees_detranslate(self):
+        nex = NexusReader()
+        trees = nex.iter_trees(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees'),
+            detranslate=True
+        )
+        expected = NexusReader(os.path.join(EXAMPLE_DIR, 'example.trees'))
+        assert list(trees) == expected.trees.trees
+
+    def test_iter_trees_parses_taxa_block(self):
+        nex = NexusReader()
+        trees = list(nex.iter_trees(
+            os.path.join(EXAMPLE_DIR, 'example-beast.trees')
+        ))
+        assert len(trees) == 1
+        assert 'taxa' in nex.blocks
+        assert nex.taxa.ntaxa == 38
+
+    def test_iter_trees_without_trees(self):
+        nex = NexusReader()
+        assert list(nex.iter_trees(os.path.join(EXAMPLE_DIR, 'example.nex'))) == []
+        assert 'data' in nex.blocks
+
+
+class Test_NexusReader_Lazy(unittest.TestCase):
+    """Test lazy block parsing in NexusReader"""
+    def setUp(self):
+        self.nex = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'maddison_et_al.nex'), lazy=True
+        )
+
+    def test_blocks_found(self):
+        assert sorted(self.nex.blocks) == [
+            'characters', 'data', 'taxa', 'trees'
+        ]
+
+    def test_blocks_not_parsed(self):
+        for block in self.nex.blocks:
+            assert not self.nex.blocks.is_parsed(block)
+        assert 'trees' not in self.nex.__dict__
+
+    def test_parse_on_attribute_access(self):
+        assert self.nex.taxa.ntaxa == 4
+        assert self.nex.blocks.is_parsed('taxa')
+        assert not self.nex.blocks.is_parsed('characters')
+        assert not self.nex.blocks.is_parsed('trees')
+
+    def test_parse_on_item_access(self):
+        assert self.nex.blocks['trees'].ntrees == 1
+        assert self.nex.blocks.is_parsed('trees')
+        assert self.nex.trees is self.nex.blocks['trees']
+
+    def test_get(self):
+        assert self.nex.blocks.get('data').ntaxa == 4
+        assert self.nex.blocks.get('sausage') is None
+
+    def test_missing_attribute(self):
+        with self.assertRaises(AttributeError):
+            self.nex.sausage
+        assert hasattr(self.nex, 'sausage') is False
+
+    def test_characters_alias(self):
+        nex = NexusReader(lazy=True).read_string(
+            """
+            #NEXUS
+            Begin characters;
+            Dimensions ntax=1 nchar=1;
+            Format datatype=standard symbols="01" gap=-;
+            Matrix
+            Harry              1
+            ;
+            End;
+            """)
+        assert nex.data is nex.characters
+        assert nex.data.matrix['Harry'] == ['1']
+
+    def test_write(self):
+        eager = NexusReader(os.path.join(EXAMPLE_DIR, 'maddison_et_al.nex'))
+        assert self.nex.write() == eager.write()
+
+
+class Test_NexusReader_BlockFilter(unittest.TestCase):
+    """Test reading selected blocks with NexusReader"""
+    def test_read_file(self):
+        nex = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'maddison_et_al.nex'),
+            blocks=['taxa', 'trees']
+        )
+        assert sorted(nex.blocks) == ['taxa', 'trees']
+        assert sorted(nex.raw_blocks) == ['taxa', 'trees']
+        assert nex.taxa.ntaxa == 4
+        assert hasattr(nex, 'data') is False
+
+    def test_read_file_argument(self):
+        nex = NexusReader()
+        nex.read_file(
+            os.path.join(EXAMPLE_DIR, 'maddison_et_al.nex'), blocks=['TREES']
+        )
+        assert list(nex.blocks) == ['trees']
+
+    def test_data_includes_characters(self):
+        nex = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'maddison_et_al.nex'), blocks=['data']
+        )
+        assert sorted(nex.blocks) == ['characters', 'data']
+        assert nex.data.ntaxa == 4
+
+    def test_read_string(self):
+        handle = open(os.path.join(EXAMPLE_DIR, 'example2.nex'))
+        data = handle.read()
+        handle.close()
+        nex = NexusReader().read_string(data, blocks=['taxa'])
+        assert list(nex.blocks) == ['taxa']
+        assert nex.taxa.taxa == ['John', 'Paul', 'George', 'Ringo']
+
+    def test_unknown_block(self):
+        nex = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example.nex'), blocks=['sausage']
+        )
+        assert nex.blocks == {}
+
+    def test_duplicate_skipped_block_still_errors(self):
+        with self.assertRaises(NexusFormatException):
+            NexusReader().read_string(
+                """
+                #NEXUS
+                Begin data;
+                Matrix
+                Harry              1
+                ;
+                End;
+                Begin data;
+                Matrix
+                Harry              1
+                ;
+                End;
+                """, blocks=['trees'])
@@ -0,0 +1,118 @@
+"""Tests for NexusTokenizer"""
+import unittest
+from nexus.tokenizer import NexusTokenizer, BEGIN, LINE, END
+from nexus.exceptions import NexusFormatException
+
+
+def tokenize(text, blocks=None):
+    return list(NexusTokenizer(blocks).tokenize(text.split("\n")))
+
+
+class Test_NexusTokenizer(unittest.TestCase):
+    def test_simple(self):
+        assert tokenize("""#NEXUS
+        begin trees;
+            tree A = (a,b);
+        end;
+        """) == [
+            (BEGIN, 'trees', 'begin trees;'),
+            (LINE, 'trees', 'tree A = (a,b);'),
+            (END, 'trees', 'end;'),
+        ]
+
+    def test_bytes(self):
+        events = list(NexusTokenizer().tokenize([b"begin trees;", b"end;"]))
+        assert events == [(BEGIN, 'trees', 'begin trees;'), (END, 'trees', 'end;')]
+
+    def test_case_insensitive(self):
+        assert [e[:2] for e in tokenize("BEGIN Data;\nEND;")] == [
+            (BEGIN, 'data'), (END, 'data')
+        ]
+
+    def test_endblock(self):
+        assert [e[:2] for e in tokenize("begin taxa;\nendblock;")] == [
+            (BEGIN, 'taxa'), (END, 'taxa')
+        ]
+
+    def test_ignores_text_outside_blocks(self):
+        assert tokenize("#NEXUS\nsomething;\n") == []
+
+    def test_drops_comment_lines(self):
+        assert [e[2] for e in tokenize("""
+        begin taxa;
+        [a comment]
+        [a [nested] comment]
+        [a comment
+        over ; end ;
+        several lines]
+        end;
+        """)] == ['begin taxa;', 'end;']
+
+    def test_keeps_inline_comments(self):
+        assert tokenize("begin trees;\ntree [&U] = (a,b);\nend;")[1] == \
+            (LINE, 'trees', 'tree [&U] = (a,b);')
+
+    def test_end_in_comment(self):
+        assert [e[0] for e in tokenize("begin trees; [end;]\nend; [trees]")] == [
+            BEGIN, END
+        ]
+
+    def test_end_in_quotes(self):
+        assert [e[0] for e in tokenize("begin taxa;\ntaxlabels 'a; end;' b;\nend;")] == [
+            BEGIN, LINE, END
+        ]
+
+    def test_end_in_taxon_name(self):
+        # `end;` is only the end of a block if it's a command of its own.
+        events = tokenize("""
+        begin trees;
+            translate
+                1 Amend,
+                2 Friend;
+            tree A = (1,2);
+        end;""")
+        assert [e[0] for e in events] == [BEGIN, LINE, LINE, LINE, LINE, END]
+
+    def test_end_as_taxon(self):
+        # taxa called `End` or `Endblock` can start the last row of a command
+        for name in ('End', 'Endblock'):
+            events = tokenize(
+                "begin data;\nmatrix\nA 01\n%s 10;\nformat gap=-;\nend;" % name
+            )
+            assert [e[0] for e in events] == [BEGIN, LINE, LINE, LINE, LINE, END]
+            assert events[3] == (LINE, 'data', '%s 10;' % name)
+
+    def test_missing_semicolon_before_end(self):
+        events = tokenize("begin data;\nmatrix\nA 01\nend;")
+        assert [e[0] for e in events] == [BEGIN, LINE, LINE, END]
+
+    def test_one_line_block(self):
+        assert tokenize("begin sets; charset a = 1-2; end;") == [
+            (BEGIN, 'sets', 'begin sets; charset a = 1-2; end;'),
+            (END, 'sets', None),
+        ]
+
+    def test_two_blocks_on_one_line(self):
+        assert tokenize("begin taxa;\nend; begin trees;\nend;") == [
+            (BEGIN, 'taxa', 'begin taxa;'),
+            (END, 'taxa', 'end; begin trees;'),
+            (BEGIN, 'trees', 'end; begin trees;'),
+            (END, 'trees', 'end;'),
+        ]
+
+    def test_blocks_filter(self):
+        events = tokenize("""
+        begin data;
+        matrix
+        A 01
+        ;
+        end;
+        begin trees;
+        tree A = (a,b);
+        end;
+        """, blocks=set(['trees']))
+        assert [e[1] for e in events] == ['trees', 'trees', 'trees']
+
+    def test_duplicate_block(self):
+        with self.assertRaises(NexusFormatException):
+            tokenize("begin data;\nend;\nbegin data;\nend;")
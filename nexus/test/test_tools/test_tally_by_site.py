@@ -47,3 +47,19 @@ class Test_TallyBySite(unittest.TestCase):
         assert 'Harry' in tally[5]['?']
         assert 'Simon' in tally[5]['?']
         assert 'Elvis' in tally[5]['?']
+
+    def test_tally_by_site_copies_repeated_sites(self):
+        # sites 1 and 2 share a pattern, but mustn't share the taxa lists
+        nex = NexusReader()
+        nex.read_string(
+            """Begin data;
+            Dimensions ntax=2 nchar=2;
+            Matrix
+            Harry  11
+            Simon  00
+            ;"""
+        )
+        tally = tally_by_site(nex)
+        assert tally[0] == tally[1] == {'1': ['Harry'], '0': ['Simon']}
+        tally[0]['1'].append('Elvis')
+        assert tally[1]['1'] == ['Harry']
@@ -8,6 +8,7 @@ from nexus.bin.nexus_treemanip import run_random
 from nexus.bin.nexus_treemanip import run_removecomments
 from nexus.bin.nexus_treemanip import run_resample
 from nexus.bin.nexus_treemanip import run_detranslate
+from nexus.bin.nexus_treemanip import run_unique
 
 EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../../examples')
 
@@ -70,6 +71,13 @@ class Test_TreeManip_run_removecomments(unittest.TestCase):
         new_nex = run_removecomments(nex, do_print=False)
         assert '[&lnP=-15795.47019648783]' not in new_nex.trees[0]
 
+    def test_run_removecomments_processes(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example-beast.trees'))
+        expected = run_removecomments(
+            NexusReader(os.path.join(EXAMPLE_DIR, 'example-beast.trees'))
+        ).trees.trees
+        assert run_removecomments(nex, processes=2).trees.trees == expected
+
 
 class Test_TreeManip_run_randomise(unittest.TestCase):
     def setUp(self):
@@ -106,3 +114,41 @@ class Test_TreeManip_run_detranslate(unittest.TestCase):
             os.path.join(EXAMPLE_DIR, 'example.trees')
         )
         assert other_tree_file.trees[0] == nex.trees[0]
+
+    def test_run_detranslate_processes(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example-translated.trees'))
+        nex = run_detranslate(nex, processes=2)
+        assert isinstance(nex.trees.trees, list)
+        assert nex.trees.trees == NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example.trees')
+        ).trees.trees
+
+    def test_run_detranslate_lazy(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example-translated.trees'))
+        nex = run_detranslate(nex, processes=1)
+        assert nex.trees._pending
+        assert list(nex.trees) == NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example.trees')
+        ).trees.trees
+
+    def test_run_detranslate_all_cpus(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example-translated.trees'))
+        nex = run_detranslate(nex, processes=None)
+        assert not nex.trees._pending
+        assert nex.trees.trees == NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example.trees')
+        ).trees.trees
+
+
+class Test_TreeManip_run_unique(unittest.TestCase):
+    def test_run_unique(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example-translated.trees'))
+        nex.trees.trees = nex.trees.trees * 2
+        nex = run_unique(nex)
+        assert nex.trees.ntrees == 3
+
+    def test_run_unique_credible(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example-translated.trees'))
+        nex.trees.trees = nex.trees.trees + nex.trees.trees[:1]
+        nex = run_unique(nex, credible=0.6, processes=2)
+        assert nex.trees.ntrees == 2
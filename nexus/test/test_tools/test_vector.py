@@ -0,0 +1,89 @@
+import os
+import random
+import unittest
+
+from nexus import NexusReader
+from nexus.writer import NexusWriter
+from nexus.tools import sites
+from nexus.tools.check_zeros import check_zeros
+
+try:
+    import numpy
+    from nexus.tools import vector
+except ImportError:  # pragma: no cover
+    numpy = None
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../../examples')
+
+TOOLS = [
+    'find_constant_sites', 'find_unique_sites', 'count_site_values',
+    'count_binary_set_size',
+]
+
+
+def random_nexus(ntaxa=20, nchar=300, states='0011?-', seed=1):
+    rng = random.Random(seed)
+    writer = NexusWriter()
+    for taxon in range(ntaxa):
+        for char in range(nchar):
+            writer.add('taxon%d' % taxon, char, rng.choice(states))
+    return writer._convert_to_reader()
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class Test_Vector(unittest.TestCase):
+    """vector tools should give the same answers as the slow versions"""
+    def compare(self, nexus_obj, compact=False):
+        nexus_obj.data.compact = compact
+        for name in TOOLS:
+            assert getattr(vector, name)(nexus_obj) == \
+                getattr(sites, name)(nexus_obj), name
+        assert vector.check_zeros(nexus_obj) == check_zeros(nexus_obj)
+        assert vector.count_site_values(nexus_obj, ['1']) == \
+            sites.count_site_values(nexus_obj, ['1'])
+
+    def test_examples(self):
+        for name in ['example.nex', 'example2.nex', 'example-characters.nex']:
+            nex = NexusReader(os.path.join(EXAMPLE_DIR, name))
+            self.compare(nex)
+            self.compare(nex, compact=True)
+
+    def test_random(self):
+        for seed in range(3):
+            self.compare(random_nexus(seed=seed))
+        self.compare(random_nexus(states='01', seed=4))
+        self.compare(random_nexus(states='0000001', seed=5), compact=True)
+        self.compare(random_nexus(states='012', seed=6))
+
+    def test_find_unique_sites(self):
+        nexus = NexusReader()
+        nexus.read_string("""Begin data;
+        Dimensions ntax=4 nchar=7;
+        Format datatype=standard symbols="01" gap=-;
+        Matrix
+        Harry              10000?-
+        Simon              1100011
+        Betty              1110000
+        Louise             1111000
+        ;""")
+        assert vector.find_unique_sites(nexus) == [3, 5, 6]
+
+    def test_count_site_values_error(self):
+        nex = NexusReader(os.path.join(EXAMPLE_DIR, 'example.nex'))
+        with self.assertRaises(TypeError):
+            vector.count_site_values(nex, characters=1)
+
+    def test_check_zeros(self):
+        nex = NexusReader()
+        nex.read_string("""
+        Begin data;
+        Dimensions ntax=4 nchar=8;
+        Format datatype=standard symbols="01" gap=-;
+        Matrix
+        Harry              01000000
+        Simon              0010000-
+        Betty              00010-0?
+        Louise             000010?0
+        ;""")
+        assert vector.check_zeros(nex) == [0, 5, 6, 7]
+        assert vector.check_zeros(nex, missing=['?']) == [0, 6]
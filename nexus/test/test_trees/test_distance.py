@@ -0,0 +1,134 @@
+"""Tests for Robinson-Foulds distances"""
+import os
+import random
+import unittest
+
+from nexus import NexusReader
+from nexus.trees.newick import parse_tree
+from nexus.trees.splits import taxa_index, tree_splits
+from nexus.trees import distance
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), '../../examples')
+
+
+def random_splits(ntrees=40, seed=1):
+    rng = random.Random(seed)
+    return [
+        sorted(set(rng.randrange(2, 40) for _ in range(rng.randrange(8))))
+        for _ in range(ntrees)
+    ]
+
+
+def brute_force(splits1, splits2):
+    return [[len(set(a) ^ set(b)) for b in splits2] for a in splits1]
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class Test_rf_matrix(unittest.TestCase):
+    def test_rf_matrix(self):
+        splits = random_splits()
+        assert distance.rf_matrix(splits).tolist() == brute_force(splits, splits)
+
+    def test_small_blocks(self):
+        splits = random_splits()
+        size = distance.BLOCK_SIZE
+        distance.BLOCK_SIZE = 10
+        try:
+            assert distance.rf_matrix(splits).tolist() == \
+                brute_force(splits, splits)
+        finally:
+            distance.BLOCK_SIZE = size
+
+    def test_trees(self):
+        taxa = ['A', 'B', 'C', 'D', 'E', 'F']
+        index = taxa_index(taxa)
+        trees = [
+            "((A,B),(C,D),(E,F));", "((A,B),(C,E),(D,F));", "(A,B,C,D,E,F);",
+        ]
+        splits = [tree_splits(parse_tree(tree), index) for tree in trees]
+        assert distance.rf_matrix(splits).tolist() == [
+            [0, 4, 3], [4, 0, 3], [3, 3, 0]
+        ]
+
+    def test_empty(self):
+        assert distance.rf_matrix([]).shape == (0, 0)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class Test_SplitIndex(unittest.TestCase):
+    def test_distances(self):
+        reference, query = random_splits(seed=1), random_splits(20, seed=2)
+        index = distance.SplitIndex(reference)
+        assert len(index) == len(reference)
+        assert index.distances(query).tolist() == brute_force(query, reference)
+
+    def test_no_queries(self):
+        index = distance.SplitIndex(random_splits())
+        assert index.distances([]).shape == (0, 40)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class Test_TreeHandler_rf_matrix(unittest.TestCase):
+    def setUp(self):
+        self.translated = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example-translated.trees')
+        ).trees
+        self.plain = NexusReader(
+            os.path.join(EXAMPLE_DIR, 'example.trees')
+        ).trees
+        counter = self.translated.count_splits()
+        self.splits = [
+            tree_splits(parse_tree(tree), counter.index)
+            for tree in self.translated.trees
+        ]
+
+    def test_rf_matrix(self):
+        expected = brute_force(self.splits, self.splits)
+        assert self.translated.rf_matrix(processes=1).tolist() == expected
+        assert self.translated.rf_matrix(processes=2).tolist() == expected
+
+    def test_sample(self):
+        matrix = self.translated.rf_matrix(processes=1)
+        assert self.translated.rf_matrix(sample=2, processes=1).tolist() == \
+            matrix[:2, :2].tolist()
+        assert self.translated.rf_matrix(sample=[2, 0], processes=1).tolist() \
+            == matrix[[2, 0]][:, [2, 0]].tolist()
+        with self.assertRaises(ValueError):
+            self.translated.rf_matrix(sample=0)
+
+    def test_other(self):
+        # the same trees, but detranslated, so the distances are the same
+        matrix = self.translated.rf_matrix(processes=1).tolist()
+        for processes in (1, 2):
+            assert self.translated.rf_matrix(
+                other=self.plain, processes=processes
+            ).tolist() == matrix
+            assert self.translated.rf_matrix(
+                other=iter(self.plain.trees), processes=processes
+            ).tolist() == matrix
+
+    def test_other_in_chunks(self):
+        self.translated.RF_CHUNK_SIZE = 2
+        matrix = self.translated.rf_matrix(processes=1)
+        assert self.translated.rf_matrix(
+            other=iter(self.plain.trees), processes=1
+        ).tolist() == matrix.tolist()
+        assert self.translated.rf_matrix(
+            other=iter(self.plain.trees[:2]), processes=1
+        ).tolist() == matrix[:, :2].tolist()
+        assert self.translated.rf_matrix(other=[], processes=1).shape == (3, 0)
+
+    def test_untranslated_labels(self):
+        # labels the translators regex can't see are still taxa
+        handler = NexusReader().read_string("""#NEXUS
+begin trees;
+    tree one = ((Homo.sapiens:1,Pan-troglodytes:1):1,(Gorilla:1,Pongo:1):1,Hylo:1);
+    tree two = ((Homo.sapiens:1,Gorilla:1):1,(Pan-troglodytes:1,Pongo:1):1,Hylo:1);
+end;
+""").trees
+        assert handler.rf_matrix(processes=1).tolist() == [[0, 4], [4, 0]]
@@ -0,0 +1,139 @@
+"""Tests for the newick parser"""
+import math
+import pickle
+import unittest
+from nexus.exceptions import NexusFormatException
+from nexus.trees.newick import Tree, parse_newick, parse_tree
+
+
+class Test_parse_newick(unittest.TestCase):
+    def test_simple(self):
+        tree = parse_newick("(A,B,(C,D));")
+        assert len(tree) == 6
+        assert tree.parents.tolist() == [-1, 0, 0, 0, 3, 3]
+        assert tree.labels == [None, 'A', 'B', None, 'C', 'D']
+        assert all(math.isnan(length) for length in tree.lengths)
+        assert tree.tips == [1, 2, 4, 5]
+        assert tree.tip_labels == ['A', 'B', 'C', 'D']
+        assert tree.children(0) == [1, 2, 3]
+        assert tree.children(3) == [4, 5]
+        assert tree.children(4) == []
+
+    def test_branchlengths(self):
+        tree = parse_newick("((A:1,B:0.25):1e-3,C:2.5E+1):0;")
+        assert tree.lengths.tolist() == [0.0, 0.001, 1.0, 0.25, 25.0]
+
+    def test_internal_labels(self):
+        tree = parse_newick("((A,B)90:0.5,C)root;")
+        assert tree.labels == ['root', '90', 'A', 'B', 'C']
+        assert tree.lengths[1] == 0.5
+
+    def test_quoted_labels(self):
+        tree = parse_newick("('A b':1,'it''s');")
+        assert tree.labels == [None, 'A b', "it's"]
+        assert tree.newick() == "('A b':1.0,'it''s');"
+
+    def test_comments(self):
+        # comments can come before or after the branch length
+        tree = parse_newick(
+            "[&R] ((A:[&rate=0.1]1.5,B[&rate=0.2]:2):[&rate=0.3]3,C:4[&x]);"
+        )
+        assert tree.rooted is True
+        assert tree.comment == '[&R]'
+        assert tree.lengths.tolist()[1:] == [3.0, 1.5, 2.0, 4.0]
+        assert tree.comments == {
+            1: '[&rate=0.3]', 2: '[&rate=0.1]', 3: '[&rate=0.2]', 4: '[&x]'
+        }
+
+    def test_unrooted(self):
+        assert parse_newick("[&U] (A,B);").rooted is False
+        assert parse_newick("(A,B);").rooted is None
+
+    def test_empty_nodes(self):
+        tree = parse_newick("(,(,));")
+        assert len(tree) == 5
+        assert tree.labels == [None] * 5
+        assert tree.newick() == "(,(,));"
+
+    def test_missing_enclosing_brackets(self):
+        tree = parse_newick("(1:0.1,2:0.2):0.4,3:0.3;")
+        assert tree.parents.tolist() == [-1, 0, 1, 1, 0]
+        assert tree.labels == [None, None, '1', '2', '3']
+        assert tree.lengths[1] == 0.4
+
+    def test_whitespace(self):
+        tree = parse_newick(" ( A : 1 ,\n B : 2 ) ; ")
+        assert tree.labels == [None, 'A', 'B']
+        assert tree.lengths.tolist()[1:] == [1.0, 2.0]
+
+    def test_round_trip(self):
+        newick = "((A:1.0,B:2.0)90:0.5,(C[&x]:3.0,D:4.0):1.0);"
+        assert parse_newick(newick).newick() == newick
+        assert parse_newick(newick).newick(lengths=False, comments=False) == \
+            "((A,B)90,(C,D));"
+
+    def test_deep_tree(self):
+        # a caterpillar tree, which would overflow a recursive parser
+        n = 5000
+        newick = '(' * (n - 1) + 't0' + ''.join(
+            ',t%d)' % i for i in range(1, n)
+        ) + ';'
+        tree = parse_newick(newick)
+        assert tree.ntips == n
+        assert tree.newick() == newick
+
+    def test_add_node(self):
+        tree = Tree('t')
+        root = tree.add_node()
+        tree.add_node(root, 'A', 1.0)
+        tree.add_node(root, 'B')
+        assert tree.newick() == "(A:1.0,B);"
+        assert repr(tree) == "<Tree t: 3 nodes>"
+
+    def test_pickle(self):
+        tree = pickle.loads(pickle.dumps(parse_newick("((A,B),C);")))
+        assert tree.newick() == "((A,B),C);"
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            tree = parse_newick("[&R] ((A:1,B:2)[x]:1,C:3);")
+            tree.child_arrays()
+            copy = pickle.loads(pickle.dumps(tree, protocol))
+            assert copy.newick() == tree.newick()
+            assert copy.rooted is True
+            assert copy.children(0) == tree.children(0)
+
+    def test_errors(self):
+        for newick in (
+            "((A,B);", "(A,B));", "(A,B)(C);", "(A:,B);", "(A::1,B);",
+            "(A:x,B);", "(A,B)C D;", "(A,B[);",
+        ):
+            with self.assertRaises(NexusFormatException):
+                parse_newick(newick)
+
+
+class Test_parse_tree(unittest.TestCase):
+    def test_parse_tree(self):
+        tree = parse_tree("tree tree.0.1065 = ((A:1,B:2):3,C:4);")
+        assert tree.name == 'tree.0.1065'
+        assert tree.tip_labels == ['A', 'B', 'C']
+
+    def test_parse_tree_with_comments(self):
+        tree = parse_tree(
+            "tree STATE_0 [&lnP=-1.5,posterior=-2] = [&R] ((1:1,2:1):1,3:2);"
+        )
+        assert tree.name == 'STATE_0'
+        assert tree.rooted is True
+        assert tree.tip_labels == ['1', '2', '3']
+
+    def test_parse_tree_default_marker(self):
+        tree = parse_tree("  TREE * UNTITLED = [&R] ((t1:0.5,t2:0.5):1,t3:1);")
+        assert tree.name == 'UNTITLED'
+        assert tree.ntips == 3
+
+    def test_parse_tree_quoted_name(self):
+        tree = parse_tree("tree 'my tree' = (A,B);")
+        assert tree.name == 'my tree'
+
+    def test_parse_newick_only(self):
+        tree = parse_tree("(A,B);")
+        assert tree.name is None
+        assert tree.tip_labels == ['A', 'B']
@@ -0,0 +1,195 @@
+"""Tests for split counting and consensus trees"""
+import unittest
+from nexus.exceptions import NexusFormatException
+from nexus.trees.newick import parse_tree
+from nexus.trees.splits import (
+    SplitCounter, TopologyHash, build_tree, compatible, newick_splits,
+    split_taxa, topology_hash, tree_splits,
+)
+
+TAXA = ['A', 'B', 'C', 'D', 'E']
+INDEX = dict((taxon, i) for i, taxon in enumerate(TAXA))
+
+
+class Test_tree_splits(unittest.TestCase):
+    def test_splits(self):
+        tree = parse_tree("((A,B),(C,D),E);")
+        assert tree_splits(tree, INDEX) == [12, 28]
+        assert [split_taxa(s, TAXA) for s in [12, 28]] == \
+            [['C', 'D'], ['C', 'D', 'E']]
+
+    def test_rooting_doesnt_matter(self):
+        for newick in (
+            "((A,B),(C,D),E);", "(((A,B),E),(C,D));", "((C,D),(E,(B,A)));",
+        ):
+            assert tree_splits(parse_tree(newick), INDEX) == [12, 28]
+
+    def test_trivial_splits_left_out(self):
+        assert tree_splits(parse_tree("(A,B,C,D,E);"), INDEX) == []
+        assert tree_splits(parse_tree("(A,(B,C,D,E));"), INDEX) == []
+
+    def test_unknown_taxon(self):
+        with self.assertRaises(NexusFormatException):
+            tree_splits(parse_tree("((A,B),(C,X),E);"), INDEX)
+
+
+class Test_rooted(unittest.TestCase):
+    def test_clades(self):
+        assert tree_splits(parse_tree("((A,B),(C,D),E);"), INDEX, True) == \
+            [3, 12]
+        assert tree_splits(parse_tree("(((A,B),E),(C,D));"), INDEX, True) == \
+            [3, 12, 19]
+
+    def test_newick_clades(self):
+        for newick in ("((A,B),(C,D),E);", "(((A,B),E),(C,D));", "(A,(B,C));"):
+            assert newick_splits(newick, INDEX, True) == \
+                tree_splits(parse_tree(newick), INDEX, True)
+
+
+class Test_topology_hash(unittest.TestCase):
+    def test_rotation_and_lengths(self):
+        hashes = set(
+            TopologyHash(INDEX)(tree) for tree in (
+                "((A,B),(C,D),E);",
+                "tree x = (E:1,(D[&x]:2,C:1):1,(B,A):3);",
+                parse_tree("((B,A),E,(D,C));"),
+            )
+        )
+        assert len(hashes) == 1
+
+    def test_different_topologies(self):
+        assert TopologyHash(INDEX)("((A,B),(C,D),E);") != \
+            TopologyHash(INDEX)("((A,C),(B,D),E);")
+
+    def test_rooted(self):
+        trees = ("((A,B),(C,D),E);", "(((A,B),E),(C,D));")
+        assert TopologyHash(INDEX)(trees[0]) == TopologyHash(INDEX)(trees[1])
+        assert TopologyHash(INDEX, rooted=True)(trees[0]) != \
+            TopologyHash(INDEX, rooted=True)(trees[1])
+
+    def test_order_of_splits(self):
+        assert topology_hash([12, 28]) == topology_hash([28, 12])
+
+
+class Test_newick_splits(unittest.TestCase):
+    def test_same_as_tree_splits(self):
+        for newick in (
+            "((A,B),(C,D),E);",
+            "tree t [&lnP=-1] = [&R] ((A:1,B:[&r=0.1]1)90:2,(C,D[&x,y]),E);",
+            " ( ( A : 1 , B ) , ( C , D ) , E ) ; ",
+            "((A,B),(C,D)),E;",
+            "(('A',B),(C,D),E);",
+        ):
+            assert newick_splits(newick, INDEX) == \
+                tree_splits(parse_tree(newick), INDEX), newick
+
+    def test_errors(self):
+        for newick in ("((A,B),(C,D),E;", "((A,B)),(C,D),E);", "((A,X),C);"):
+            with self.assertRaises(NexusFormatException):
+                newick_splits(newick, INDEX)
+
+
+class Test_compatible(unittest.TestCase):
+    def test_compatible(self):
+        assert compatible(12, 28)  # nested
+        assert compatible(6, 24)  # disjoint
+        assert not compatible(12, 24)  # overlapping
+
+
+class Test_build_tree(unittest.TestCase):
+    def test_build_tree(self):
+        tree = build_tree([12, 28], TAXA, [0.5, 1.0])
+        assert tree.newick() == "(A,B,((C,D)0.5,E)1);"
+        assert tree.rooted is False
+        assert tree_splits(tree, INDEX) == [12, 28]
+
+    def test_star_tree(self):
+        assert build_tree([], TAXA).newick() == "(A,B,C,D,E);"
+
+
+class Test_SplitCounter(unittest.TestCase):
+    def setUp(self):
+        self.trees = [
+            "((A,B),(C,D),E);",
+            "((A,B),C,(D,E));",
+            "((A,B),(C,D),E);",
+            "((A,C),(B,D),E);",
+        ]
+
+    def test_counts(self):
+        counter = SplitCounter(TAXA)
+        counter.update(self.trees)
+        assert counter.ntrees == 4
+        assert counter.support(counter.split(['A', 'B'])) == 0.75
+        assert counter.support(counter.split(['C', 'D'])) == 0.5
+        assert counter.support(counter.split(['B', 'C'])) == 0.0
+        assert counter.most_common(1) == [(counter.split(['A', 'B']), 0.75)]
+
+    def test_split_of_either_side(self):
+        counter = SplitCounter(TAXA)
+        assert counter.split(['A', 'B']) == counter.split(['C', 'D', 'E'])
+
+    def test_trees_or_strings(self):
+        counter = SplitCounter(TAXA)
+        counter.update(parse_tree(tree) for tree in self.trees)
+        other = SplitCounter(TAXA)
+        other.update(self.trees)
+        assert counter.counts == other.counts
+
+    def test_taxa_from_first_tree(self):
+        counter = SplitCounter()
+        counter.add("((E,D),(C,B),A);")
+        assert counter.taxa == TAXA
+
+    def test_translated(self):
+        counter = SplitCounter(
+            TAXA, translators=dict(zip('12345', TAXA))
+        )
+        counter.update(["((1,2),(3,4),5);", "((A,B),(C,D),E);"])
+        assert counter.support(counter.split(['C', 'D'])) == 1.0
+
+    def test_majority_rule(self):
+        counter = SplitCounter(TAXA)
+        counter.update(self.trees)
+        assert counter.consensus().newick() == "(A,B,(C,D,E)0.75);"
+        assert counter.consensus(0.7).newick() == "(A,B,(C,D,E)0.75);"
+        assert counter.consensus(0.8).newick() == "(A,B,C,D,E);"
+
+    def test_greedy(self):
+        counter = SplitCounter(TAXA)
+        counter.update(self.trees)
+        assert counter.consensus(greedy=True).newick() == \
+            "(A,B,((C,D)0.5,E)0.75);"
+
+    def test_invalid_threshold(self):
+        counter = SplitCounter(TAXA)
+        counter.update(self.trees)
+        for threshold in (0.4, 1):
+            with self.assertRaises(ValueError):
+                counter.consensus(threshold)
+        with self.assertRaises(ValueError):
+            counter.consensus(-0.1, greedy=True)
+
+    def test_no_trees(self):
+        with self.assertRaises(ValueError):
+            SplitCounter(TAXA).consensus()
+
+    def test_lossy_counting(self):
+        counter = SplitCounter(TAXA, error=0.25)
+        exact = SplitCounter(TAXA)
+        # a frequent split, and rare ones that get pruned
+        trees = ["((A,B),(C,D),E);", "((A,B),(C,E),D);"] * 2 + \
+            ["((A,B),(C,D),E);", "((A,D),(B,C),E);", "((A,E),(B,D),C);"] * 10
+        counter.update(trees)
+        exact.update(trees)
+        assert len(counter.counts) < len(exact.counts)
+        for split, count in exact.counts.items():
+            assert exact.counts[split] - counter.counts.get(split, 0) <= \
+                0.25 * len(trees)
+            if count > 0.25 * len(trees):
+                assert split in counter.counts
+        assert counter.consensus().newick() == exact.consensus().newick()
+
+    def test_invalid_error(self):
+        with self.assertRaises(ValueError):
+            SplitCounter(TAXA, error=0)
@@ -0,0 +1,182 @@
+"""
+Tools for tokenizing a nexus file
+"""
+import re
+
+from nexus.exceptions import NexusFormatException
+
+# Event types emitted by NexusTokenizer
+BEGIN = 'begin'
+LINE = 'line'
+END = 'end'
+
+END_COMMANDS = ('end', 'endblock')
+
+# a comment without any nested comments inside it
+FLAT_COMMENT_PATTERN = re.compile(r"""\[[^\[\]]*\]""")
+# the characters that change state inside a line
+SPECIAL_PATTERN = re.compile(r"""[\[\]'"]""")
+# command separators outside of quoted tokens
+SEPARATOR_PATTERN = re.compile(r"""'(?:[^']|'')*'|"[^"]*"|;""")
+
+
+class NexusTokenizer(object):
+    """
+    A state machine which reads a nexus in a single pass and emits a
+    stream of block events.
+
+    Each line is stripped and checked once: nested `[...]` comments (which
+    may span several lines) and quoted tokens are tracked so that `;`,
+    `begin` and `end` inside them are never mistaken for commands, and
+    lines that only contain comments are dropped.
+
+    Most lines contain no comments, quotes or command separators and are
+    passed through after a few substring checks, which is much cheaper
+    than matching regular expressions against every line.
+
+    :param blocks: only emit events for these blocks (default: all blocks)
+    :type blocks: set
+    """
+    def __init__(self, blocks=None):
+        self.blocks = blocks
+        self.depth = 0  # comment nesting depth
+        self.block = None  # name of current block
+        self.command = None  # name of current (unterminated) command
+        self.skip = False  # skipping the current block?
+        self.seen = set()  # blocks found so far
+
+    def _strip_comments(self, line):
+        """
+        Returns `line` with all comments removed, keeping track of comments
+        that are left open at the end of the line.
+        """
+        if self.depth == 0:
+            if '[' not in line and ']' not in line:
+                return line
+            code = FLAT_COMMENT_PATTERN.sub('', line)
+            if '[' not in code and ']' not in code:
+                return code
+
+        # slow path: walk through the brackets and quotes one by one.
+        code, start, quote = [], 0, None
+        for match in SPECIAL_PATTERN.finditer(line):
+            char, pos = match.group(), match.start()
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char == '[':
+                if self.depth == 0:
+                    code.append(line[start:pos])
+                self.depth += 1
+            elif char == ']' and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    start = pos + 1
+            elif self.depth == 0 and char in ('"', "'"):
+                quote = char
+        if self.depth == 0:
+            code.append(line[start:])
+        return ''.join(code)
+
+    def _commands(self, code):
+        """
+        Yields the (lowercased) first two words of every command ended
+        in the comment-free string `code`.
+        """
+        if ';' not in code:
+            parts, tail = [], code
+        elif "'" in code or '"' in code:
+            parts, start = [], 0
+            for match in SEPARATOR_PATTERN.finditer(code):
+                if match.group() == ';':
+                    parts.append(code[start:match.start()])
+                    start = match.end()
+            tail = code[start:]
+        else:
+            parts = code.split(';')
+            tail = parts.pop()
+
+        for index, part in enumerate(parts):
+            words = part.split(None, 2)[:2]
+            if index == 0 and self.command is not None and \
+                    not (words and words[0].lower() in (BEGIN,) + END_COMMANDS):
+                # the line continues a command started on an earlier line
+                yield self.command
+            else:
+                yield [w.lower() for w in words]
+            self.command = None
+
+        if self.command is None and tail.strip():
+            self.command = [w.lower() for w in tail.split(None, 2)[:2]]
+
+    def tokenize(self, handle):
+        """
+        Reads lines from the iterable `handle` and yields a tuple of
+        (event, block name, line) for every line inside a nexus block.
+
+        `event` is BEGIN for the line that opens a block, END for the line
+        that closes it, and LINE for everything in between. If a block is
+        opened and closed on the same line, the END event has `None` as
+        its line.
+
+        The tokenizer's state is kept between calls, so a file can be
+        tokenized in several pieces.
+
+        :param handle: an iterable of lines (strings or utf-8 bytes)
+        :type handle: iterable
+
+        :return: A generator of (event, block, line) tuples.
+        :raises NexusFormatException: If a block is found twice
+        """
+        blocks = self.blocks
+        for line in handle:
+            if hasattr(line, 'decode'):
+                line = line.decode('utf-8')
+
+            # lines in unwanted blocks only matter if they can end the block
+            if self.skip and ';' not in line and '[' not in line and ']' not in line:
+                continue
+
+            line = line.strip()
+            if not line:
+                continue
+
+            code = self._strip_comments(line)
+            if not code.strip():
+                continue  # only comments.
+
+            if self.block is None:
+                # outside of blocks there are no multi-line commands.
+                self.command = None
+            elif ';' not in code and self.command is not None:
+                # fast path -- a line inside a command, e.g. a matrix row
+                if not self.skip:
+                    yield LINE, self.block, line
+                continue
+
+            emitted = False
+            for command in self._commands(code):
+                if not command:
+                    continue
+                elif command[0] == BEGIN and len(command) == 2:
+                    if self.block is not None and not self.skip and not emitted:
+                        yield LINE, self.block, line
+                    self.block = command[1]
+                    if self.block in self.seen:
+                        raise NexusFormatException(
+                            "Duplicate Block %s" % self.block
+                        )
+                    self.seen.add(self.block)
+                    self.skip = blocks is not None and self.block not in blocks
+                    if not self.skip:
+                        yield BEGIN, self.block, line
+                    emitted = True
+                elif command[0] in END_COMMANDS and len(command) == 1 and \
+                        self.block is not None:
+                    # (only on its own: `End 01;` is a matrix row)
+                    if not self.skip:
+                        yield END, self.block, None if emitted else line
+                    self.block, self.skip, emitted = None, False, True
+
+            if self.block is not None and not self.skip and not emitted:
+                yield LINE, self.block, line
@@ -1,5 +1,3 @@
-from collections import Counter
-
 from nexus.tools.check_for_valid_NexusReader import check_for_valid_NexusReader
 from nexus.tools.sites import new_nexus_without_sites
 
@@ -32,16 +30,13 @@ def check_zeros(nexus_obj, absences=None, missing=None):
     absences = absences if absences else ['0']
     missing = missing if missing else ['-', '?']
     
-    bad = []
-    for site_idx in range(0, nexus_obj.data.nchar):
-        states = Counter([nexus_obj.data.matrix[t][site_idx] for t in nexus_obj.data.matrix])
-        zeros = sum([
-            states[k] for k in states if k in absences or k in missing
-        ])
-        total = sum(states.values())
-        if zeros == total:
-            bad.append(site_idx)
-    return bad
+    empty = set(absences).union(missing)
+    patterns = nexus_obj.data.site_patterns()
+    bad = [
+        p for p, pattern in enumerate(patterns.patterns)
+        if empty.issuperset(pattern)
+    ]
+    return patterns.expand(bad)
 
 def remove_zeros(nexus_obj, absences=None, missing=None):
     """
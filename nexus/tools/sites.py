@@ -17,19 +17,14 @@ def find_constant_sites(nexus_obj):
     """
     check_for_valid_NexusReader(nexus_obj, required_blocks=['data'])
 
+    # check each distinct site pattern once, then expand back to the sites.
+    patterns = nexus_obj.data.site_patterns()
     const = []
-    for i in range(0, nexus_obj.data.nchar):
-        states = []
-        for taxa, data in nexus_obj.data:
-            c = data[i]
-            if c in ('?', '-'):
-                continue  # pragma: no cover
-            elif c not in states:
-                states.append(c)
-
+    for p, pattern in enumerate(patterns.patterns):
+        states = set(pattern).difference(('?', '-'))
         if len(states) == 1:
-            const.append(i)
-    return const
+            const.append(p)
+    return patterns.expand(const)
 
 
 def find_unique_sites(nexus_obj):
@@ -47,24 +42,24 @@ def find_unique_sites(nexus_obj):
     """
     check_for_valid_NexusReader(nexus_obj, required_blocks=['data'])
 
-    unique = []
-    for i in range(0, nexus_obj.data.nchar):
-        members = {}
-        missing = 0
-        for taxa, characters in nexus_obj.data:
-            c = characters[i]
-            if c in ('?', '-'):
-                missing += 1
-            else:
-                members[c] = members.get(c, 0) + 1
-
+    patterns = nexus_obj.data.site_patterns()
+    counts = []
+    for pattern in patterns.patterns:
+        members = Counter(c for c in pattern if c not in ('?', '-'))
         # a character is unique if there's only two states
         # AND there's a state with 1 member
         # AND the state with 1 member is NOT the 0 (absence) state
         if len(members) == 2:
-            for state, count in members.items():
-                if state != '0' and count == 1:
-                    unique.append(i)
+            counts.append(len([
+                state for state, count in members.items()
+                if state != '0' and count == 1
+            ]))
+        else:
+            counts.append(0)
+
+    unique = []
+    for site, p in enumerate(patterns.sites):
+        unique.extend([site] * counts[p])
     return unique
 
 
@@ -88,12 +83,12 @@ def count_site_values(nexus_obj, characters=('-', '?')):
 
     check_for_valid_NexusReader(nexus_obj, required_blocks=['data'])
 
-    tally = {}
-    for taxon, sites in nexus_obj.data:
-        tally[taxon] = tally.get(taxon, 0)
-        for site in sites:
+    patterns = nexus_obj.data.site_patterns()
+    tally = dict((taxon, 0) for taxon in patterns.taxa)
+    for pattern, weight in zip(patterns.patterns, patterns.weights):
+        for taxon, site in zip(patterns.taxa, pattern):
             if site in characters:
-                tally[taxon] += 1
+                tally[taxon] += weight
     return tally
 
 
@@ -151,12 +146,21 @@ def tally_by_site(nexus_obj):
     }
     """
     check_for_valid_NexusReader(nexus_obj, required_blocks=['data'])
+    patterns = nexus_obj.data.site_patterns()
+    by_pattern = []
+    for pattern in patterns.patterns:
+        states = {}
+        for taxon, state in zip(patterns.taxa, pattern):
+            states.setdefault(state, []).append(taxon)
+        by_pattern.append(states)
+
     tally = {}
-    for site, data in nexus_obj.data.characters.items():
-        tally[site] = tally.get(site, {})
-        for taxon, state in data.items():
-            tally[site][state] = tally[site].get(state, [])
-            tally[site][state].append(taxon)
+    for site, p in enumerate(patterns.sites):
+        label = nexus_obj.data.charlabels.get(site, site)
+        if label not in tally:
+            tally[label] = dict(
+                (state, list(taxa)) for state, taxa in by_pattern[p].items()
+            )
     return tally
 
 
@@ -212,8 +216,8 @@ def count_binary_set_size(nexus_obj):
     }
     """
     check_for_valid_NexusReader(nexus_obj, required_blocks=['data'])
+    patterns = nexus_obj.data.site_patterns()
     tally = Counter()
-    for char_id in nexus_obj.data.characters:
-        char = nexus_obj.data.characters[char_id]
-        tally[len([v for v in char.values() if v == '1'])] += 1
+    for pattern, weight in zip(patterns.patterns, patterns.weights):
+        tally[pattern.count('1')] += weight
     return tally
@@ -0,0 +1,158 @@
+"""
+Site/Character tools that work on whole columns of the matrix at once.
+
+These give the same answers as the tools in `nexus.tools.sites` and
+`nexus.tools.check_zeros`, but use `DataHandler.to_numpy()` to code the
+matrix as an integer array and replace the loops over taxa and sites with
+array operations, which is much faster for large matrices.
+
+Requires numpy.
+"""
+from collections import Counter
+
+try:  # pragma: no cover
+    from collections.abc import Iterable
+except ImportError:  # pragma: no cover
+    from collections import Iterable
+
+import numpy
+
+from nexus.tools.check_for_valid_NexusReader import check_for_valid_NexusReader
+
+MISSING_STATES = ('-', '?')
+
+
+def _to_numpy(nexus_obj):
+    """Returns the coded matrix and alphabet of the nexus' `data` block"""
+    check_for_valid_NexusReader(nexus_obj, required_blocks=['data'])
+    return nexus_obj.data.to_numpy()
+
+
+def _state_counts(codes, alphabet, states):
+    """
+    Returns an array of shape (len(states), nchar) holding the number of
+    taxa coded as each of `states` in each site.
+    """
+    counts = numpy.zeros((len(states), codes.shape[1]), dtype=numpy.intp)
+    for i, state in enumerate(states):
+        if state in alphabet:
+            counts[i] = (codes == alphabet.index(state)).sum(axis=0)
+    return counts
+
+
+def _isin(codes, alphabet, states):
+    """Returns a boolean array marking the cells coded as one of `states`"""
+    wanted = [code for code, state in enumerate(alphabet) if state in states]
+    return numpy.isin(codes, wanted)
+
+
+def find_constant_sites(nexus_obj):
+    """
+    Returns a list of the constant sites in a nexus
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :return: A list of constant site positions.
+    :raises AssertionError: if nexus_obj is not a nexus
+    :raises NexusFormatException: if nexus_obj does not have a `data` block
+    """
+    codes, alphabet = _to_numpy(nexus_obj)
+    states = [s for s in alphabet if s not in MISSING_STATES]
+    nstates = (_state_counts(codes, alphabet, states) > 0).sum(axis=0)
+    return numpy.flatnonzero(nstates == 1).tolist()
+
+
+def find_unique_sites(nexus_obj):
+    """
+    Returns a list of the unique sites in a binary nexus
+    i.e. sites with only one taxon belonging to them.
+        (this only really makes sense if the data is coded as presence/absence)
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :return: A list of unique site positions.
+    :raises AssertionError: if nexus_obj is not a nexus
+    :raises NexusFormatException: if nexus_obj does not have a `data` block
+    """
+    codes, alphabet = _to_numpy(nexus_obj)
+    states = [s for s in alphabet if s not in MISSING_STATES]
+    counts = _state_counts(codes, alphabet, states)
+    # a character is unique if there's only two states
+    # AND there's a state with 1 member
+    # AND the state with 1 member is NOT the 0 (absence) state
+    present = (counts > 0).sum(axis=0) == 2
+    singletons = [i for i, state in enumerate(states) if state != '0']
+    nsingletons = (counts[singletons] == 1).sum(axis=0)
+    # (like `sites.find_unique_sites` a site is listed once per such state)
+    sites = numpy.flatnonzero(present)
+    return numpy.repeat(sites, nsingletons[sites]).tolist()
+
+
+def count_site_values(nexus_obj, characters=MISSING_STATES):
+    """
+    Counts the number of sites with values in `characters` in a nexus
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :param characters: An iterable of the characters to count
+    :type characters: tuple
+
+    :return: A dictionary of taxa and missing counts
+    :raises AssertionError: if nexus_obj is not a nexus
+    :raises NexusFormatException: if nexus_obj does not have a `data` block
+    """
+    if not isinstance(characters, Iterable):
+        raise TypeError("characters should be iterable")
+
+    codes, alphabet = _to_numpy(nexus_obj)
+    counts = _isin(codes, alphabet, characters).sum(axis=1)
+    return dict(zip(nexus_obj.data.taxa, counts.tolist()))
+
+
+def count_binary_set_size(nexus_obj):
+    """
+    Counts the number of sites by their size (i.e. how many sites have two
+    members, etc)
+
+    Returns a dictionary of the set size and count
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :return: A Dictionary
+    :raises AssertionError: if nexus_obj is not a nexus
+    :raises NexusFormatException: if nexus_obj does not have a `data` block
+    """
+    codes, alphabet = _to_numpy(nexus_obj)
+    return Counter(_state_counts(codes, alphabet, ['1'])[0].tolist())
+
+
+def check_zeros(nexus_obj, absences=None, missing=None):
+    """
+    Checks for sites in the nexus that are coded as all empty.
+
+    Returns a list of sites that are completely empty. Note that
+    this is zero-indexed (i.e. the first site is site 0 not 1)
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :param absences: A list of values to be marked as absent.
+        Default = ["0"]
+    :type char: list
+
+    :param missing: A list of values to be marked as missing.
+        Default = ["-", "?"]
+    :type char: list
+
+    :return: A list of site indexes
+    """
+    absences = absences if absences else ['0']
+    missing = missing if missing else list(MISSING_STATES)
+
+    codes, alphabet = _to_numpy(nexus_obj)
+    empty = _isin(codes, alphabet, list(absences) + list(missing))
+    return numpy.flatnonzero(empty.all(axis=0)).tolist()
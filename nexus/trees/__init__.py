@@ -0,0 +1,12 @@
+"""
+Tools for working with the trees in nexus `trees` blocks
+"""
+from nexus.trees.newick import Tree, parse_newick, parse_tree
+from nexus.trees.splits import (
+    SplitCounter, build_tree, newick_splits, tree_splits,
+)
+
+__all__ = [
+    "Tree", "parse_newick", "parse_tree",
+    "SplitCounter", "build_tree", "newick_splits", "tree_splits",
+]
@@ -0,0 +1,155 @@
+"""
+Robinson-Foulds distances between trees, computed from their splits (see
+`nexus.trees.splits`).
+
+The Robinson-Foulds (RF) distance between two trees is the number of splits
+that are in one tree but not the other, i.e. `|A| + |B| - 2 * |A & B|` for
+split sets `A` and `B`. Rather than comparing each pair of trees in turn, each
+distinct split is given a column number, the trees become rows of a 0/1
+matrix, and the number of splits shared by every pair of trees is found with
+matrix products, a block of columns at a time.
+
+Requires numpy.
+"""
+try:  # pragma: no cover
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# the largest dense block of the tree x split matrix (in cells) built at once
+BLOCK_SIZE = 1 << 22
+
+
+class SplitIndex(object):
+    """
+    The splits of a set of reference trees, stored by split: each distinct
+    split has a column number in `ids`, and the trees that have column `c`
+    are `trees[starts[c]:starts[c + 1]]`.
+
+    >>> index = SplitIndex([[12, 28], [24, 28], [12, 28]])
+    >>> index.distances([[12, 28]]).tolist()
+    [[0, 2, 0]]
+
+    :param splits: the splits of each tree, e.g. from `tree_splits`
+    :type splits: iterable of lists
+
+    :raises ImportError: If numpy is not installed.
+    """
+    def __init__(self, splits):
+        if numpy is None:  # pragma: no cover
+            raise ImportError("nexus.trees.distance needs numpy")
+        self.ids = {}
+        rows, cols, sizes = self._columns(splits, self.ids, add=True)
+        self.sizes = sizes
+        order = numpy.argsort(cols, kind='mergesort')
+        self.trees = rows[order]
+        self.starts = numpy.zeros(len(self.ids) + 1, dtype=numpy.intp)
+        numpy.cumsum(
+            numpy.bincount(cols, minlength=len(self.ids)), out=self.starts[1:]
+        )
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @staticmethod
+    def _columns(splits, ids, add=False):
+        """
+        Returns the (tree, column) pairs of the known splits in `splits` as
+        two arrays, and the number of splits in each tree. If `add` is
+        True, new splits are added to `ids`.
+        """
+        rows, cols, sizes = [], [], []
+        for tree, tree_splits in enumerate(splits):
+            sizes.append(len(tree_splits))
+            for split in tree_splits:
+                col = ids.setdefault(split, len(ids)) if add else ids.get(split)
+                if col is not None:
+                    rows.append(tree)
+                    cols.append(col)
+        return (
+            numpy.array(rows, dtype=numpy.intp),
+            numpy.array(cols, dtype=numpy.intp),
+            numpy.array(sizes, dtype=numpy.intp),
+        )
+
+    def _dense(self, columns):
+        """Returns the (tree x split) 0/1 matrix of `columns`"""
+        starts = self.starts[columns]
+        lengths = self.starts[columns + 1] - starts
+        ends = numpy.cumsum(lengths)
+        cells = numpy.repeat(starts - (ends - lengths), lengths) + \
+            numpy.arange(ends[-1] if len(ends) else 0)
+        dense = numpy.zeros((len(self), len(columns)), dtype=numpy.float32)
+        dense[self.trees[cells], numpy.repeat(numpy.arange(len(columns)), lengths)] = 1
+        return dense
+
+    def shared(self, rows, cols, nrows, columns=None):
+        """
+        Returns the number of splits each query tree shares with each
+        reference tree, as an array of shape (nrows, len(self)).
+
+        :param rows: the query tree of each (tree, column) pair
+        :param cols: the column of each (tree, column) pair
+        :param nrows: the number of query trees
+        :param columns: the columns to count (default: all in `cols`)
+        """
+        if columns is None:
+            columns = numpy.unique(cols)
+        shared = numpy.zeros((nrows, len(self)), dtype=numpy.float32)
+        if not len(columns):
+            return shared
+        # the position of each pair's column in `columns` (or -1)
+        position = numpy.full(len(self.ids), -1, dtype=numpy.intp)
+        position[columns] = numpy.arange(len(columns))
+        pairs = position[cols]
+        rows, pairs = rows[pairs >= 0], pairs[pairs >= 0]
+
+        step = max(1, BLOCK_SIZE // max(len(self), nrows))
+        for start in range(0, len(columns), step):
+            block = columns[start:start + step]
+            wanted = (pairs >= start) & (pairs < start + len(block))
+            query = numpy.zeros((nrows, len(block)), dtype=numpy.float32)
+            query[rows[wanted], pairs[wanted] - start] = 1
+            shared += query.dot(self._dense(block).T)
+        return shared
+
+    def distances(self, splits):
+        """
+        Returns the RF distances from each tree in `splits` to each of the
+        reference trees.
+
+        :param splits: the splits of each query tree
+        :type splits: list of lists
+
+        :return: An integer array of shape (len(splits), len(self))
+        """
+        rows, cols, sizes = self._columns(splits, self.ids)
+        shared = self.shared(rows, cols, len(sizes))
+        return sizes[:, None] + self.sizes[None, :] - \
+            2 * shared.round().astype(numpy.intp)
+
+
+def rf_matrix(splits):
+    """
+    Returns the RF distances between every pair of trees.
+
+    >>> rf_matrix([[12, 28], [24, 28], [12, 28]]).tolist()
+    [[0, 2, 0], [2, 0, 2], [0, 2, 0]]
+
+    :param splits: the splits of each tree, e.g. from `tree_splits`
+    :type splits: list of lists
+
+    :return: A symmetric integer array of shape (len(splits), len(splits))
+    :raises ImportError: If numpy is not installed.
+    """
+    index = SplitIndex(splits)
+    rows = index.trees
+    cols = numpy.repeat(numpy.arange(len(index.ids)), numpy.diff(index.starts))
+    # a split that only one tree has is only shared by that tree with
+    # itself, so leave those out and set the diagonal to zero afterwards.
+    common = numpy.flatnonzero(numpy.diff(index.starts) > 1)
+    shared = index.shared(rows, cols, len(index), common)
+    distances = index.sizes[:, None] + index.sizes[None, :] - \
+        2 * shared.round().astype(numpy.intp)
+    numpy.fill_diagonal(distances, 0)
+    return distances
@@ -0,0 +1,330 @@
+"""
+A compact, array-based representation of newick trees, and a parser for it.
+"""
+import re
+from array import array
+
+from nexus.exceptions import NexusFormatException
+
+NOLENGTH = float('nan')
+
+# the `tree <name> [comments] =` header of a nexus tree line
+TREE_HEADER = re.compile(r"""
+    ^\s*tree\s+
+    (?:\*\s*)?                          # optional default tree marker
+    ('(?:[^']|'')*'|[^\s=\[]+)          # tree name
+    \s*((?:\[[^\]]*\]\s*)*)             # optional comments
+    =\s*
+""", re.IGNORECASE + re.VERBOSE)
+
+# a single newick token, one group per kind of token
+TOKEN = re.compile(r"""
+    \s*(?:
+        ([(),;:])                       # punctuation
+        |(\[[^\]]*\])                   # comment
+        |'((?:[^']|'')*)'               # quoted label
+        |([^\s(),;:\[\]']+)             # label or branch length
+    )
+""", re.VERBOSE)
+
+# labels that can be written without quotes
+PLAIN_LABEL = re.compile(r"""^[^\s(),;:\[\]']+$""")
+
+
+class Tree(object):
+    """
+    A tree stored as flat arrays rather than as linked node objects.
+
+    Nodes are numbered in preorder, i.e. in the order they open in the
+    newick string, so the root is node 0 and every node comes after its
+    parent (`parents[i] < i`). Iterating from the last node to the first
+    therefore visits children before their parents.
+
+    - `parents`: the parent of each node (-1 for the root)
+    - `lengths`: the branch length of each node (`nan` if none is given)
+    - `labels`: the label of each node (None if it has none)
+    - `comments`: node -> comment, for the nodes that have comments
+    - `name`, `comment` and `rooted` (True for `[&R]`, False for `[&U]`
+      and otherwise None) describe the tree itself.
+
+    :param name: the name of the tree
+    :type name: string
+    """
+    __slots__ = (
+        'name', 'parents', 'lengths', 'labels', 'comments', 'comment',
+        'rooted', '_children'
+    )
+
+    def __init__(self, name=None):
+        self.name = name
+        self.parents = array('l')
+        self.lengths = array('d')
+        self.labels = []
+        self.comments = {}
+        self.comment = None
+        self.rooted = None
+        self._children = None  # cache for (starts, children)
+
+    def __getstate__(self):
+        # (python 2 can't pickle objects with __slots__ by itself)
+        return dict(
+            (slot, getattr(self, slot)) for slot in self.__slots__
+            if slot != '_children'
+        )
+
+    def __setstate__(self, state):
+        self._children = None
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def add_node(self, parent=-1, label=None, length=NOLENGTH):
+        """
+        Adds a node under `parent`, which must already be in the tree.
+
+        :return: the index of the new node
+        """
+        self.parents.append(parent)
+        self.lengths.append(length)
+        self.labels.append(label)
+        self._children = None
+        return len(self.labels) - 1
+
+    def __len__(self):
+        return len(self.parents)
+
+    def child_arrays(self):
+        """
+        Returns the children of every node in two arrays, `starts` and
+        `children`, such that the children of node `i` are
+        `children[starts[i]:starts[i + 1]]`, in newick order.
+
+        :return: A tuple of (starts, children)
+        """
+        if self._children is None:
+            starts = array('l', [0] * (len(self) + 1))
+            for parent in self.parents[1:]:
+                starts[parent + 1] += 1
+            for node in range(len(self)):
+                starts[node + 1] += starts[node]
+            children = array('l', [0] * (len(self) - 1 if len(self) else 0))
+            filled = array('l', starts)
+            for node in range(1, len(self)):
+                parent = self.parents[node]
+                children[filled[parent]] = node
+                filled[parent] += 1
+            self._children = (starts, children)
+        return self._children
+
+    def children(self, node):
+        """Returns the children of `node`"""
+        starts, children = self.child_arrays()
+        return children[starts[node]:starts[node + 1]].tolist()
+
+    @property
+    def tips(self):
+        """The tip (leaf) nodes, in newick order"""
+        starts = self.child_arrays()[0]
+        return [
+            node for node in range(len(self))
+            if starts[node] == starts[node + 1]
+        ]
+
+    @property
+    def ntips(self):
+        return len(self.tips)
+
+    @property
+    def tip_labels(self):
+        """The labels of the tips, in newick order"""
+        return [self.labels[node] for node in self.tips]
+
+    def newick(self, lengths=True, comments=True):
+        """
+        Returns the tree as a newick string (without the `tree name =`).
+
+        :param lengths: include the branch lengths
+        :type lengths: Boolean
+
+        :param comments: include the node comments
+        :type comments: Boolean
+
+        :return: String
+        """
+        starts, children = self.child_arrays()
+        out = []
+        stack = [0] if len(self) else []  # nodes to open, ~nodes to close
+        while stack:
+            node = stack.pop()
+            if node is None:
+                out.append(',')
+                continue
+            elif node >= 0 and starts[node] < starts[node + 1]:
+                out.append('(')
+                stack.append(~node)
+                kids = children[starts[node]:starts[node + 1]]
+                for kid in reversed(kids[1:]):
+                    stack.extend((kid, None))
+                stack.append(kids[0])
+                continue
+            elif node < 0:
+                out.append(')')
+                node = ~node
+            out.append(self._suffix(node, lengths, comments))
+        return ''.join(out) + ';'
+
+    def _suffix(self, node, lengths, comments):
+        """Returns the label, comment and branch length of `node`"""
+        label = self.labels[node]
+        if label is None:
+            label = ''
+        elif not PLAIN_LABEL.match(label):
+            label = "'%s'" % label.replace("'", "''")
+        if comments and node in self.comments:
+            label += self.comments[node]
+        length = self.lengths[node]
+        if lengths and length == length:  # i.e. not nan
+            label += ':%r' % length
+        return label
+
+    def __repr__(self):
+        return "<Tree %s: %d nodes>" % (self.name, len(self))
+
+
+def parse_newick(newick, name=None):
+    """
+    Parses a newick string into a `Tree` in a single pass over its tokens.
+
+    Branch lengths can be given as integers, decimals or in scientific
+    notation, and comments (e.g. `[&rate=0.1]`) can appear before or after
+    the branch length of any node. Labels can be quoted.
+
+    >>> tree = parse_newick("((A:1,B:2)90:0.5,'C d');")
+    >>> tree.labels
+    [None, '90', 'A', 'B', 'C d']
+    >>> tree.parents.tolist()
+    [-1, 0, 1, 1, 0]
+    >>> tree.newick()
+    "((A:1.0,B:2.0)90:0.5,'C d');"
+
+    :param newick: the newick string
+    :type newick: string
+
+    :param name: the name of the tree
+    :type name: string
+
+    :return: A `Tree`
+    :raises NexusFormatException: If the newick string is malformed.
+    """
+    tree = Tree(name)
+    parents, lengths, labels = tree.parents, tree.lengths, tree.labels
+    comments = tree.comments
+    roots = []  # nodes without parents
+    stack = []  # open internal nodes
+    current = None  # the node that labels, lengths and comments belong to
+    expect_node = True  # i.e. at the start of a node
+    is_length = False  # i.e. after a colon
+
+    def add(parent):
+        parents.append(parent)
+        lengths.append(NOLENGTH)
+        labels.append(None)
+        node = len(labels) - 1
+        if parent == -1:
+            roots.append(node)
+        return node
+
+    match = TOKEN.match
+    pos, end = 0, len(newick)
+    while pos < end:
+        token = match(newick, pos)
+        if token is None:
+            if newick[pos:].strip():
+                raise NexusFormatException(
+                    "Unexpected character %r in tree" % newick[pos]
+                )
+            break
+        pos = token.end()
+        punctuation, comment, quoted, text = token.groups()
+        if punctuation == ':':
+            if current is None or is_length:
+                raise NexusFormatException("Unexpected ':' in tree")
+            is_length = True
+        elif text is not None and is_length:
+            try:
+                lengths[current] = float(text)
+            except ValueError:
+                raise NexusFormatException("Invalid branch length %r" % text)
+            is_length = False
+        elif comment is not None:
+            if current is None:
+                if comment.upper() in ('[&R]', '[&U]'):
+                    tree.rooted = comment.upper() == '[&R]'
+                tree.comment = (tree.comment or '') + comment
+            else:
+                comments[current] = comments.get(current, '') + comment
+        elif is_length:
+            raise NexusFormatException("Missing branch length in tree")
+        elif punctuation == '(':
+            if not expect_node:
+                raise NexusFormatException("Unexpected '(' in tree")
+            current = add(stack[-1] if stack else -1)
+            stack.append(current)
+        elif punctuation in (',', ')', ';'):
+            if expect_node and (punctuation != ';' or stack):
+                current = add(stack[-1] if stack else -1)  # an empty node
+            if punctuation == ')':
+                if not stack:
+                    raise NexusFormatException("Unmatched ')' in tree")
+                current = stack.pop()
+                expect_node = False
+            elif punctuation == ',':
+                current, expect_node = None, True
+            else:
+                break
+        else:  # a label
+            label = text if quoted is None else quoted.replace("''", "'")
+            if expect_node:
+                current = add(stack[-1] if stack else -1)
+                expect_node = False
+            elif labels[current] is not None:
+                raise NexusFormatException("Unexpected label %r" % label)
+            labels[current] = label
+
+    if stack:
+        raise NexusFormatException("Unmatched '(' in tree")
+    if is_length:
+        raise NexusFormatException("Missing branch length in tree")
+    if len(roots) > 1:
+        _add_root(tree)
+    return tree
+
+
+def _add_root(tree):
+    """
+    Puts the top level nodes of a tree like `(A,B),C;` (i.e. one without
+    enclosing brackets) under a new root node.
+    """
+    tree.parents = array('l', [-1] + [p + 1 for p in tree.parents])
+    tree.lengths.insert(0, NOLENGTH)
+    tree.labels.insert(0, None)
+    tree.comments = dict((n + 1, c) for n, c in tree.comments.items())
+    tree._children = None
+
+
+def parse_tree(line):
+    """
+    Parses a nexus tree line, i.e. `tree <name> = <newick>;`, into a `Tree`.
+
+    :param line: the tree line (or just a newick string)
+    :type line: string
+
+    :return: A `Tree`
+    :raises NexusFormatException: If the tree is malformed.
+    """
+    header = TREE_HEADER.match(line)
+    if header is None:
+        return parse_newick(line)
+    name = header.group(1)
+    if name.startswith("'"):
+        name = name[1:-1].replace("''", "'")
+    return parse_newick(line[header.end():], name)
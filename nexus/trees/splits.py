@@ -0,0 +1,465 @@
+"""
+Bipartitions (splits) of trees stored as integer bitsets, and consensus trees
+built from how often each split occurs in a set of trees.
+
+A split divides the taxa into the two sets either side of a branch. It is
+stored as an integer with bit `i` set for each taxon `i` on one side, and
+always as the side that does *not* contain taxon 0, so the same split has the
+same integer whichever way the tree is rooted or drawn. Splits of one taxon
+(i.e. tip branches) are left out, as every tree has them.
+"""
+import re
+import hashlib
+from collections import Counter
+
+from nexus.exceptions import NexusFormatException
+from nexus.trees.newick import Tree, TREE_HEADER, parse_tree
+
+# the parts of a newick string that don't affect its splits
+COMMENT = re.compile(r"\[[^\]]*\]")
+LENGTH_OR_SPACE = re.compile(r":[^(),;]*|\s+")
+STRUCTURE = re.compile(r"([(),;])")
+
+
+def popcount(split):
+    """Returns the number of taxa in `split`"""
+    return bin(split).count('1')
+
+
+if hasattr(int, 'bit_count'):  # pragma: no cover
+    popcount = int.bit_count  # noqa: F811
+
+
+def split_taxa(split, taxa):
+    """
+    Returns the labels of the taxa in `split`
+
+    >>> split_taxa(6, ['A', 'B', 'C', 'D'])
+    ['B', 'C']
+
+    :param split: the split
+    :type split: int
+
+    :param taxa: the taxa, in bit order
+    :type taxa: list
+
+    :return: A list of taxa
+    """
+    return [taxon for i, taxon in enumerate(taxa) if split >> i & 1]
+
+
+def compatible(split1, split2):
+    """
+    Returns True if the two splits can be in the same tree, i.e. if one
+    contains the other or they don't overlap.
+
+    (As neither split contains taxon 0, the fourth case, that the two
+    splits cover all the taxa between them, can't happen)
+    """
+    overlap = split1 & split2
+    return not overlap or overlap == split1 or overlap == split2
+
+
+def taxa_index(taxa, translators=None):
+    """
+    Returns a mapping of tip label -> taxon number for `taxa`, which also
+    maps the ids in `translators` (taxa id -> taxon) to their taxon's
+    number.
+
+    :param taxa: the taxa, in bit order
+    :type taxa: list
+
+    :param translators: mapping of taxa id -> taxon name
+    :type translators: dict
+
+    :return: A dictionary
+    """
+    index = dict((taxon, i) for i, taxon in enumerate(taxa))
+    for taxon_id, taxon in (translators or {}).items():
+        if taxon in index:
+            index[taxon_id] = index[taxon]
+    return index
+
+
+def _nontrivial(clades, everything, rooted=False):
+    """
+    Returns the sorted non-trivial splits (or, if `rooted`, clades) from
+    the taxa under each node in `clades`.
+    """
+    ntaxa = popcount(everything)
+    splits = set()
+    if rooted:
+        for clade in clades:
+            if 1 < popcount(clade) < ntaxa:
+                splits.add(clade)
+        return sorted(splits)
+    for split in clades:
+        if split & 1:
+            split ^= everything
+        if 1 < popcount(split) < ntaxa - 1:
+            splits.add(split)
+    return sorted(splits)
+
+
+def tree_splits(tree, index, rooted=False):
+    """
+    Returns the non-trivial splits in `tree`.
+
+    If `rooted` is True, the clades of the tree are returned instead: for
+    each node other than the tips and the root, the taxa under it (which
+    may include taxon 0). Clades tell apart trees that only differ in
+    where they are rooted.
+
+    >>> tree_splits(parse_tree("((A,B),(C,D),E);"), {'A': 0, 'B': 1, 'C': 2, 'D': 3, 'E': 4})
+    [12, 28]
+
+    :param tree: the tree
+    :type tree: `Tree`
+
+    :param index: a mapping of tip label -> taxon number
+    :type index: dict
+
+    :param rooted: return clades rather than splits
+    :type rooted: Boolean
+
+    :return: A list of splits
+    :raises NexusFormatException: If a tip label isn't in `index`.
+    """
+    parents = tree.parents
+    bits = [0] * len(tree)
+    for node in tree.tips:
+        label = tree.labels[node]
+        try:
+            bits[node] = 1 << index[label]
+        except KeyError:
+            raise NexusFormatException("Unknown taxon %r in tree" % label)
+    # nodes come after their parents, so this sees each node's descendants
+    # before the node itself.
+    for node in range(len(tree) - 1, 0, -1):
+        bits[parents[node]] |= bits[node]
+
+    return _nontrivial(bits[1:], bits[0] if bits else 0, rooted)
+
+
+def newick_splits(newick, index, rooted=False):
+    """
+    Returns the non-trivial splits (or, if `rooted`, clades) in a tree
+    string, without parsing it into a `Tree` first.
+
+    >>> newick_splits("tree one = ((A:1,B:1)[&x]:2,(C,D),E);", {'A': 0, 'B': 1, 'C': 2, 'D': 3, 'E': 4})
+    [12, 28]
+
+    :param newick: the tree, as a newick string or a nexus tree line
+    :type newick: string
+
+    :param index: a mapping of tip label -> taxon number
+    :type index: dict
+
+    :param rooted: return clades rather than splits (see `tree_splits`)
+    :type rooted: Boolean
+
+    :return: A list of splits
+    :raises NexusFormatException: If the tree is malformed, or a tip label
+        isn't in `index`.
+    """
+    header = TREE_HEADER.match(newick)
+    if header is not None:
+        newick = newick[header.end():]
+    newick = COMMENT.sub('', newick)
+    if "'" in newick:  # quoted labels can hold brackets and commas
+        return tree_splits(parse_tree(newick), index, rooted)
+
+    # `parts` alternates between the brackets and commas and the text
+    # between them: tip labels follow `(` and `,`, internal labels `)`.
+    parts = STRUCTURE.split(LENGTH_OR_SPACE.sub('', newick))
+    clades = []
+    stack = []
+    push, pop = stack.append, stack.pop
+    clade = 0
+    try:
+        for mark, text in zip(parts[1::2], parts[2::2]):
+            if mark == ')':
+                clades.append(clade)
+                clade |= pop()
+                continue
+            elif mark == '(':
+                push(clade)
+                clade = 0
+            elif mark == ';':
+                break
+            if text:
+                clade |= 1 << index[text]
+    except KeyError as e:
+        raise NexusFormatException("Unknown taxon %r in tree" % e.args[0])
+    except IndexError:
+        raise NexusFormatException("Unmatched ')' in tree")
+    if stack:
+        raise NexusFormatException("Unmatched '(' in tree")
+    return _nontrivial(clades, clade, rooted)
+
+
+def topology_hash(splits):
+    """
+    Returns a hash of a tree's topology from its splits (or clades), which
+    is the same for any two trees with the same splits, whatever the order
+    of their nodes or their branch lengths. (Hashes can only be compared
+    if the splits number the taxa in the same way)
+
+    >>> index = {'A': 0, 'B': 1, 'C': 2, 'D': 3, 'E': 4}
+    >>> tree1 = topology_hash(newick_splits("((A,B),(C,D),E);", index))
+    >>> tree1 == topology_hash(newick_splits("(E:1,(D:2,C:1),(B,A):3);", index))
+    True
+
+    :param splits: the splits
+    :type splits: list
+
+    :return: A string
+    """
+    key = ','.join(map(hex, sorted(splits)))
+    return hashlib.md5(key.encode('ascii')).hexdigest()
+
+
+class TreeSplits(object):
+    """
+    A function returning the splits of a tree (a `Tree` or a tree string)
+    that, unlike a closure, can be sent to other processes, e.g. with
+    `TreeHandler.map`.
+
+    :param index: a mapping of tip label -> taxon number
+    :type index: dict
+
+    :param rooted: return clades rather than splits (see `tree_splits`)
+    :type rooted: Boolean
+    """
+    def __init__(self, index, rooted=False):
+        self.index = index
+        self.rooted = rooted
+
+    def __call__(self, tree, translators=None):
+        if isinstance(tree, Tree):
+            return tree_splits(tree, self.index, self.rooted)
+        return newick_splits(tree, self.index, self.rooted)
+
+
+class TopologyHash(TreeSplits):
+    """
+    Like `TreeSplits`, but returns the `topology_hash` of the tree.
+    """
+    def __call__(self, tree, translators=None):
+        return topology_hash(super(TopologyHash, self).__call__(tree))
+
+
+class SplitCounter(object):
+    """
+    Counts how many trees each split occurs in, one tree at a time, so that
+    a posterior of any size can be summarised in a single pass without
+    holding the trees in memory.
+
+    Memory then depends on the number of *different* splits seen. If
+    `error` is given, splits are counted with lossy counting (Manku &
+    Motwani 2002): the counter is pruned every `1 / error` trees, so it
+    holds a bounded number of splits however many trees are added, at the
+    cost of each count being up to `error * ntrees` too low. Any split in
+    more than `error` of the trees is kept.
+
+    >>> counter = SplitCounter(['A', 'B', 'C', 'D', 'E'])
+    >>> counter.update(["((A,B),(C,D),E);", "((A,B),C,(D,E));"])
+    >>> counter.support(counter.split(['A', 'B']))
+    1.0
+    >>> counter.consensus().newick()
+    '(A,B,(C,D,E)1);'
+    >>> counter.consensus(greedy=True).newick()
+    '(A,B,((C,D)0.5,E)1);'
+
+    :param taxa: the taxa, in bit order (default: the tip labels of the
+        first tree, sorted)
+    :type taxa: list
+
+    :param translators: mapping of taxa id -> taxon name for trees that
+        still use the ids of a translate block
+    :type translators: dict
+
+    :param error: the largest undercount allowed, as a fraction of the
+        number of trees (default: count exactly)
+    :type error: float
+    """
+    def __init__(self, taxa=None, translators=None, error=None):
+        if error is not None and not 0 < error < 1:
+            raise ValueError("error should be between 0 and 1")
+        self.taxa = None
+        self.index = {}
+        self.translators = translators or {}
+        self.error = error
+        self.counts = Counter()
+        self.ntrees = 0
+        self._deltas = {}
+        if taxa is not None:
+            self._set_taxa(taxa)
+
+    def _set_taxa(self, taxa):
+        self.taxa = list(taxa)
+        self.index = taxa_index(self.taxa, self.translators)
+
+    def split(self, taxa):
+        """Returns the split of the taxa (or taxa ids) in `taxa`"""
+        split = 0
+        for taxon in taxa:
+            split |= 1 << self.index[taxon]
+        if split & 1:
+            split ^= (1 << len(self.taxa)) - 1
+        return split
+
+    def add(self, tree):
+        """
+        Counts the splits in `tree`
+
+        :param tree: the tree, as a `Tree` or a tree string
+        :type tree: `Tree` or string
+
+        :raises NexusFormatException: If the tree is malformed or has a
+            taxon that isn't in `taxa`.
+        """
+        if self.taxa is None:
+            labels = (tree if isinstance(tree, Tree) else parse_tree(tree)).tip_labels
+            self._set_taxa(sorted(
+                self.translators.get(label, label) for label in labels
+            ))
+        if isinstance(tree, Tree):
+            splits = tree_splits(tree, self.index)
+        else:
+            splits = newick_splits(tree, self.index)
+        self.ntrees += 1
+        if self.error is None:
+            self.counts.update(splits)
+            return
+
+        width = int(1.0 / self.error + 0.5)
+        bucket = (self.ntrees - 1) // width + 1
+        counts, deltas = self.counts, self._deltas
+        for split in splits:
+            if split in counts:
+                counts[split] += 1
+            else:
+                counts[split] = 1
+                deltas[split] = bucket - 1
+        if self.ntrees % width == 0:
+            for split in [s for s, n in counts.items() if n + deltas[s] <= bucket]:
+                del counts[split]
+                del deltas[split]
+
+    def update(self, trees):
+        """Counts the splits in each of `trees`"""
+        for tree in trees:
+            self.add(tree)
+
+    def support(self, split):
+        """Returns the fraction of the trees that have `split`"""
+        if not self.ntrees:
+            return 0.0
+        return float(self.counts.get(split, 0)) / self.ntrees
+
+    def most_common(self, n=None):
+        """
+        Returns a list of the `n` most common splits and their support,
+        from most to least common.
+        """
+        ordered = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return [(split, self.support(split)) for split, _ in ordered[:n]]
+
+    def consensus(self, threshold=None, greedy=False):
+        """
+        Builds a consensus tree from the counted splits. The support of
+        each split is given as the label of its node.
+
+        A majority-rule consensus (the default) has every split that is in
+        more than `threshold` of the trees; with `threshold` >= 0.5 these
+        splits always fit in one tree. A greedy consensus (`greedy=True`)
+        then goes on to add the remaining splits, most common first,
+        skipping any that conflict with those already in the tree (here
+        `threshold` can be anything from 0).
+
+        :param threshold: the support a split needs to be included
+            (default: 0.5, or 0 for a greedy consensus)
+        :type threshold: float
+
+        :param greedy: build a greedy consensus
+        :type greedy: Boolean
+
+        :return: A `Tree`
+        :raises ValueError: If there are no trees, or `threshold` is out
+            of range.
+        """
+        if not self.ntrees:
+            raise ValueError("No trees to build a consensus from")
+        lowest = 0 if greedy else 0.5
+        threshold = lowest if threshold is None else threshold
+        if not lowest <= threshold < 1:
+            raise ValueError("Invalid consensus threshold %r" % threshold)
+
+        chosen = []
+        for split, support in self.most_common():
+            if support <= threshold:
+                break
+            if greedy and not all(compatible(split, other) for other in chosen):
+                continue
+            chosen.append(split)
+        return build_tree(
+            chosen, self.taxa, [self.support(split) for split in chosen]
+        )
+
+
+def build_tree(splits, taxa, support=None):
+    """
+    Builds an (unrooted) tree from compatible splits.
+
+    >>> build_tree([12, 28], ['A', 'B', 'C', 'D', 'E']).newick()
+    '(A,B,((C,D),E));'
+
+    :param splits: the splits
+    :type splits: list
+
+    :param taxa: the taxa, in bit order
+    :type taxa: list
+
+    :param support: the support of each split, used as its node's label
+    :type support: list
+
+    :return: A `Tree`
+    """
+    support = support if support is not None else [None] * len(splits)
+    # add the splits from largest to smallest: a split's parent is then the
+    # last split added that holds any one of its taxa.
+    order = sorted(range(len(splits)), key=lambda i: -popcount(splits[i]))
+    deepest = [0] * len(taxa)  # the smallest clade each taxon is in so far
+    children = [[] for _ in range(len(splits) + 1)]  # 0 is the root
+    for clade, i in enumerate(order, 1):
+        members = split_taxa(splits[i], range(len(taxa)))
+        children[deepest[members[0]]].append(clade)
+        for taxon in members:
+            deepest[taxon] = clade
+    for taxon, clade in enumerate(deepest):
+        children[clade].append(~taxon)  # tips as ~taxon
+
+    def first_taxon(kid):
+        if kid < 0:
+            return ~kid
+        split = splits[order[kid - 1]]
+        return popcount((split & -split) - 1)
+
+    # number the nodes in preorder, with each node's children in the order
+    # of their first taxon
+    tree = Tree()
+    tree.rooted = False
+    stack = [(0, -1)]
+    while stack:
+        clade, parent = stack.pop()
+        if clade < 0:
+            tree.add_node(parent, taxa[~clade])
+            continue
+        label = None
+        if clade and support[order[clade - 1]] is not None:
+            label = '%g' % support[order[clade - 1]]
+        node = tree.add_node(parent, label)
+        kids = sorted(children[clade], key=first_taxon)
+        stack.extend((kid, node) for kid in reversed(kids))
+    return tree
@@ -4,6 +4,8 @@ Tools for writing a nexus file
 
 import collections
 
+from nexus.compression import open_file
+
 TEMPLATE = """
 #NEXUS
 %(comments)s
@@ -168,7 +170,7 @@ class NexusWriter(object):
         }
 
     def write_to_file(self, filename="output.nex", interleave=False,
-                      charblock=False):
+                      charblock=False, compression=None):
         """
         Generates a string representation of the nexus
         
@@ -178,12 +180,19 @@ class NexusWriter(object):
         :type interleave: Boolean
         :param charblock: Include a characters block or not
         :type charblock: Boolean
+        :param compression: compress the file with `gzip`, `bz2`, `xz` or
+            `zstd` (default: guessed from the extension of `filename`,
+            e.g. `.gz`), or False to never compress.
+        :type compression: String
         
         :return: None
         """
         nexus = self.make_nexus(interleave, charblock)
-        with open(filename, 'w+') as handle:
+        handle = open_file(filename, 'w', compression)
+        try:
             handle.write(nexus)
+        finally:
+            handle.close()
 
     def write_as_table(self):
         """